@@ -0,0 +1,356 @@
+from contextlib import contextmanager
+import random
+import re
+import threading
+import time
+
+# Reemplazos en memoria de Google Sheets, Drive, Notion y Slack, para medir el
+# código de la API sin red ni cuota. Imitan solo la parte de cada cliente que usa
+# el repositorio. Opcionalmente simulan la latencia y los errores de cada servicio
+# (ver `UpstreamFaults`).
+
+
+def _column_index(letters: str):
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+class FakeUpstreamError(Exception):
+    """
+    Error simulado de un servicio externo, con el código HTTP en `resp.status` y en
+    `status`, como `HttpError` de googleapiclient y `APIResponseError` de Notion.
+    """
+
+    def __init__(self, upstream: str, status: int = 503):
+        super().__init__(f"{upstream}: error simulado {status}")
+        self.status = status
+        self.resp = type("FakeResponse", (), {"status": status})()
+
+
+class UpstreamFaults:
+    """
+    Latencia y errores simulados para los servicios falsos.
+
+    Args:
+        latency (float): Segundos de espera fijos por llamada.
+        jitter (float): Segundos de espera aleatorios adicionales, entre 0 y `jitter`.
+        error_rate (float): Fracción de llamadas que fallan con `FakeUpstreamError`.
+        upstreams (list, opcional): Servicios afectados. Por defecto, todos.
+        status (int): Código HTTP de los errores simulados.
+        seed (int): Semilla para que la secuencia de errores sea reproducible.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        upstreams=None,
+        status: int = 503,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.upstreams = set(upstreams) if upstreams else None
+        self.status = status
+        self.calls = {}
+        self.errors = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, upstream: str):
+        """
+        Aplica la latencia y, según `error_rate`, lanza un error. Se llama antes de
+        responder cada petición al servicio falso.
+        """
+        if self.upstreams is not None and upstream not in self.upstreams:
+            return
+        with self._lock:
+            delay = self.latency + self._random.random() * self.jitter
+            failed = self._random.random() < self.error_rate
+            self.calls[upstream] = self.calls.get(upstream, 0) + 1
+            if failed:
+                self.errors[upstream] = self.errors.get(upstream, 0) + 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise FakeUpstreamError(upstream, self.status)
+
+
+def _no_faults(upstream: str):
+    return None
+
+
+class FakeRequest:
+    """
+    Petición diferida, como las de googleapiclient: no hace nada hasta `execute()`.
+    """
+
+    def __init__(self, func, faults=_no_faults, upstream: str = "sheets"):
+        self._func = func
+        self._faults = faults
+        self._upstream = upstream
+
+    def execute(self):
+        self._faults(self._upstream)
+        return self._func()
+
+
+class FakeSheetsService:
+    """
+    Imita el recurso `spreadsheets()` de la API de Google Sheets sobre grillas en memoria.
+
+    Args:
+        tabs (dict): Nombre de la hoja -> lista de filas (la primera es el encabezado).
+        hidden (list, opcional): Hojas que se reportan como ocultas.
+        faults (UpstreamFaults, opcional): Latencia y errores simulados.
+    """
+
+    def __init__(self, tabs: dict, hidden=None, faults=_no_faults):
+        self.tabs = tabs
+        self.hidden = set(hidden or [])
+        self.faults = faults
+        self.calls = []
+
+    def _resolve(self, range_name: str):
+        match = re.match(r"^(?:'((?:[^']|'')*)'|([^!]+))(?:!(.*))?$", range_name)
+        if match.group(1) is not None:
+            tab = match.group(1).replace("''", "'")
+        else:
+            tab = match.group(2)
+        grid = self.tabs[tab]
+        cells = match.group(3)
+        if not cells:
+            rows = grid
+        else:
+            bounds = re.match(r"^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$", cells)
+            col_1, row_1, col_2, row_2 = bounds.groups()
+            if col_2 is None and row_2 is None:
+                col_2, row_2 = col_1, row_1
+            first_row = int(row_1) if row_1 else 1
+            last_row = int(row_2) if row_2 else len(grid)
+            first_col = _column_index(col_1) if col_1 else 1
+            last_col = _column_index(col_2) if col_2 else None
+            rows = [
+                row[first_col - 1 : last_col] for row in grid[first_row - 1 : last_row]
+            ]
+
+        # La API no devuelve celdas vacías al final de cada fila ni filas vacías al final
+        values = []
+        for row in rows:
+            row = list(row)
+            while row and row[-1] == "":
+                row.pop()
+            values.append(row)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    @staticmethod
+    def _transpose(values):
+        width = max((len(row) for row in values), default=0)
+        columns = [
+            [row[i] if i < len(row) else "" for row in values] for i in range(width)
+        ]
+        for column in columns:
+            while column and column[-1] == "":
+                column.pop()
+        return columns
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, range=None, fields=None, **kwargs):
+        self.calls.append(("get", spreadsheetId, range))
+        if range is None:
+            # Propiedades del documento (spreadsheets().get)
+            return FakeRequest(
+                lambda: {
+                    "sheets": [
+                        {
+                            "properties": {
+                                "title": title,
+                                "hidden": title in self.hidden,
+                                "gridProperties": {"rowCount": len(grid)},
+                            }
+                        }
+                        for title, grid in self.tabs.items()
+                    ]
+                },
+                self.faults,
+            )
+
+        def run():
+            values = self._resolve(range)
+            if kwargs.get("majorDimension") == "COLUMNS":
+                values = self._transpose(values)
+            return {"range": range, "values": values} if values else {"range": range}
+
+        return FakeRequest(run, self.faults)
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension="ROWS", **kwargs):
+        self.calls.append(("batchGet", spreadsheetId, tuple(ranges)))
+
+        def run():
+            value_ranges = []
+            for range_name in ranges:
+                values = self._resolve(range_name)
+                if majorDimension == "COLUMNS":
+                    values = self._transpose(values)
+                value_ranges.append(
+                    {"range": range_name, "values": values}
+                    if values
+                    else {"range": range_name}
+                )
+            return {"valueRanges": value_ranges}
+
+        return FakeRequest(run, self.faults)
+
+
+class FakeDriveService:
+    """
+    Imita el recurso `files()` de la API de Google Drive (solo la versión del documento).
+    """
+
+    def __init__(self, faults=_no_faults):
+        self.version = 1
+        self.faults = faults
+
+    def get(self, fileId, fields=None):
+        return FakeRequest(
+            lambda: {
+                "version": str(self.version),
+                "modifiedTime": "2024-01-01T00:00:00Z",
+            },
+            self.faults,
+            "drive",
+        )
+
+
+class _FakeNotionDatabases:
+    def __init__(self, parent):
+        self._parent = parent
+
+    def query(self, database_id, start_cursor=None):
+        return self._parent._query(database_id, start_cursor)
+
+
+class FakeNotionClient:
+    """
+    Imita `notion_client.Client` con una base de datos paginada de 100 en 100.
+
+    Args:
+        links (list): Lista de diccionarios con 'ID' y 'Link'.
+        faults (UpstreamFaults, opcional): Latencia y errores simulados.
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(self, links, faults=_no_faults):
+        self.links = links
+        self.faults = faults
+        self.databases = _FakeNotionDatabases(self)
+
+    def search(self, filter=None):
+        self.faults("notion")
+        return {
+            "results": [{"id": "db-creativos", "title": [{"plain_text": "CREATIVOS"}]}]
+        }
+
+    def _query(self, database_id, start_cursor=None):
+        self.faults("notion")
+        start = int(start_cursor or 0)
+        page = self.links[start : start + self.PAGE_SIZE]
+        results = [
+            {
+                "properties": {
+                    "ID": {"rich_text": [{"text": {"content": item["ID"]}}]},
+                    "Link": {"url": item["Link"]},
+                }
+            }
+            for item in page
+        ]
+        has_more = start + self.PAGE_SIZE < len(self.links)
+        return {
+            "results": results,
+            "has_more": has_more,
+            "next_cursor": str(start + self.PAGE_SIZE) if has_more else None,
+        }
+
+
+class FakeSlackClient:
+    """
+    Imita `slack.WebClient` guardando los mensajes en lugar de enviarlos.
+
+    Args:
+        faults (UpstreamFaults, opcional): Latencia y errores simulados.
+    """
+
+    def __init__(self, faults=_no_faults):
+        self.messages = []
+        self.faults = faults
+
+    def chat_postMessage(self, channel, text):
+        self.faults("slack")
+        self.messages.append((channel, text))
+        return {"ok": True}
+
+
+@contextmanager
+def install_fakes(tabs: dict, links: list, faults=None):
+    """
+    Reemplaza los clientes de Sheets, Drive, Notion y Slack por los falsos mientras dure el bloque.
+    La caché compartida se desactiva para medir el trabajo real de cada escenario, y el
+    regulador de cuota también: los servicios falsos no tienen cuota.
+
+    Args:
+        tabs (dict): Nombre de la hoja -> lista de filas (la primera es el encabezado).
+        links (list): Catálogo de Notion, lista de diccionarios con 'ID' y 'Link'.
+        faults (UpstreamFaults, opcional): Latencia y errores simulados de los servicios.
+
+    Yields:
+        dict: Los servicios falsos instalados ('sheets', 'drive', 'notion', 'slack').
+    """
+    import config.bot_slack
+    import config.data
+    import config.data_notion
+    import config.quota
+    import config.shared_cache
+
+    faults = faults or _no_faults
+    fakes = {
+        "sheets": FakeSheetsService(tabs, faults=faults),
+        "drive": FakeDriveService(faults),
+        "notion": FakeNotionClient(links, faults),
+        "slack": FakeSlackClient(faults),
+    }
+    originals = (
+        config.data.get_sheets_service,
+        config.data.get_drive_service,
+        config.data_notion.notion,
+        config.bot_slack.client,
+        config.shared_cache.SHARED_CACHE_ENABLED,
+        config.quota.QUOTA_ENABLED,
+    )
+    config.data.get_sheets_service = lambda: fakes["sheets"]
+    config.data.get_drive_service = lambda: fakes["drive"]
+    config.data_notion.notion = fakes["notion"]
+    config.bot_slack.client = fakes["slack"]
+    config.shared_cache.SHARED_CACHE_ENABLED = False
+    config.quota.QUOTA_ENABLED = False
+    config.data._header_cache.clear()
+    try:
+        yield fakes
+    finally:
+        (
+            config.data.get_sheets_service,
+            config.data.get_drive_service,
+            config.data_notion.notion,
+            config.bot_slack.client,
+            config.shared_cache.SHARED_CACHE_ENABLED,
+            config.quota.QUOTA_ENABLED,
+        ) = originals
+        config.data._header_cache.clear()
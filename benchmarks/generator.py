@@ -0,0 +1,193 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+# Columnas que tiene una hoja de leads del CRM
+LEAD_COLUMNS = [
+    "Name",
+    "Email",
+    "Phone",
+    "UTM Source",
+    "UTM Campaign",
+    "UTM Content",
+    "Stage",
+    "Created at (fecha)",
+    "Dia de cita",
+]
+
+# Distribución aproximada de etapas observada en las hojas de los clientes
+STAGES = {
+    "NEW LEAD": 0.38,
+    "CONTACTED": 0.17,
+    "NOT INTERESTED": 0.12,
+    "APPOINTMENT BOOKED": 0.08,
+    "APPOINTMENT CANCEL": 0.04,
+    "NO SHOW (RE-SCHEDULE)": 0.05,
+    "SHOWED (NOT CLOSED)": 0.06,
+    "SHOWED (NOT QUALIFIED)": 0.03,
+    "CLOSED": 0.04,
+    "INSTALLED": 0.02,
+    "": 0.01,
+}
+
+# Etapas que tienen 'Dia de cita'
+STAGES_WITH_APPOINTMENT = {
+    "APPOINTMENT BOOKED",
+    "APPOINTMENT CANCEL",
+    "NO SHOW (RE-SCHEDULE)",
+    "SHOWED (NOT CLOSED)",
+    "SHOWED (NOT QUALIFIED)",
+    "CLOSED",
+    "INSTALLED",
+}
+
+VIDEO_PREFIXES = ["CS", "CA", "CV", "AC", "PA", "CC"]
+LEYENDAS = ["Florida Solar", "Volt Solar 01", "Techos", "Ventanas CA", "Agua Pura"]
+
+
+def generate_video_ids(n_videos: int = 300, seed: int = 0):
+    """
+    Genera matrículas de video con el formato de los creativos (por ejemplo 'CS05-2').
+
+    Args:
+        n_videos (int): Cantidad de videos distintos.
+        seed (int): Semilla para que los datos sean reproducibles.
+
+    Returns:
+        list: Las matrículas generadas.
+    """
+    rng = np.random.default_rng(seed)
+    ids = set()
+    while len(ids) < n_videos:
+        prefix = VIDEO_PREFIXES[rng.integers(len(VIDEO_PREFIXES))]
+        ids.add(f"{prefix}{rng.integers(1, 13):02d}-{rng.integers(1, 40)}")
+    return sorted(ids)
+
+
+def generate_utm_content(video_ids, n_rows: int, rng):
+    """
+    Genera la columna 'UTM Content' con los formatos que llegan desde las campañas:
+    con leyenda separada por '|', con leyenda por espacio, en minúsculas, vacía o basura.
+    """
+    # Pocos videos concentran la mayoría de los leads (distribución tipo Zipf)
+    weights = 1.0 / np.arange(1, len(video_ids) + 1) ** 1.1
+    weights /= weights.sum()
+    videos = np.asarray(video_ids)[rng.choice(len(video_ids), n_rows, p=weights)]
+    leyendas = np.asarray(LEYENDAS)[rng.integers(len(LEYENDAS), size=n_rows)]
+
+    formats = rng.choice(5, n_rows, p=[0.55, 0.2, 0.1, 0.1, 0.05])
+    content = np.where(
+        formats == 0,
+        np.char.add(np.char.add(videos, " | "), leyendas),
+        np.where(
+            formats == 1,
+            np.char.add(np.char.add(videos, " "), leyendas),
+            np.where(
+                formats == 2,
+                np.char.lower(np.char.add(np.char.add(videos, " | "), leyendas)),
+                np.where(formats == 3, "", np.char.add("{{ad.name}} ", leyendas)),
+            ),
+        ),
+    )
+    return content
+
+
+def generate_leads(
+    n_rows: int,
+    seed: int = 0,
+    end_date: datetime = None,
+    days: int = 365,
+    video_ids=None,
+):
+    """
+    Genera un DataFrame de leads sintéticos con distribuciones realistas de
+    'UTM Content', 'Stage', 'Created at (fecha)' y 'Dia de cita'.
+
+    Las filas salen ordenadas por fecha de creación, como en las hojas reales.
+
+    Args:
+        n_rows (int): Cantidad de leads a generar (de 1k a 1M).
+        seed (int): Semilla para que los datos sean reproducibles.
+        end_date (datetime, opcional): Fecha del lead más reciente. Por defecto, hoy.
+        days (int): Cantidad de días de historial.
+        video_ids (list, opcional): Matrículas de video a usar.
+
+    Returns:
+        pd.DataFrame: Un DataFrame con las columnas de `LEAD_COLUMNS`, todas como texto.
+    """
+    rng = np.random.default_rng(seed)
+    if end_date is None:
+        end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    if video_ids is None:
+        video_ids = generate_video_ids(seed=seed)
+
+    # Más leads en los días recientes (las cuentas crecen mes a mes)
+    offsets = np.sort(days - 1 - (rng.power(1.6, n_rows) * days).astype(int))
+    offsets = np.clip(offsets, 0, days - 1)[::-1]
+    created = pd.to_datetime(end_date) - pd.to_timedelta(offsets, unit="D")
+
+    stages = rng.choice(list(STAGES), n_rows, p=list(STAGES.values()))
+    has_appointment = np.isin(stages, list(STAGES_WITH_APPOINTMENT))
+    appointment = created + pd.to_timedelta(rng.integers(0, 10, n_rows), unit="D")
+    dia_de_cita = np.where(
+        has_appointment, appointment.strftime("%B %d, %Y").to_numpy(), ""
+    )
+
+    ids = np.arange(n_rows).astype(str)
+    return pd.DataFrame(
+        {
+            "Name": np.char.add("Lead ", ids),
+            "Email": np.char.add(np.char.add("lead", ids), "@example.com"),
+            "Phone": np.char.add("+1305", np.char.zfill(ids, 7)),
+            "UTM Source": "facebook",
+            "UTM Campaign": np.asarray(["Solar FL", "Roofing CA", "HVAC TX"])[
+                rng.integers(3, size=n_rows)
+            ],
+            "UTM Content": generate_utm_content(video_ids, n_rows, rng),
+            "Stage": stages,
+            "Created at (fecha)": created.strftime("%Y-%m-%d").to_numpy(),
+            "Dia de cita": dia_de_cita,
+        },
+        columns=LEAD_COLUMNS,
+    ).astype(object)
+
+
+def generate_tabs(n_clients: int, rows_per_client: int, seed: int = 0):
+    """
+    Genera las hojas de varios clientes en el formato que devuelve la API de Sheets
+    (lista de filas, con el encabezado en la primera).
+
+    Args:
+        n_clients (int): Cantidad de clientes (hojas).
+        rows_per_client (int): Cantidad de leads por cliente.
+        seed (int): Semilla para que los datos sean reproducibles.
+
+    Returns:
+        dict: Un diccionario con el nombre del cliente como clave y la grilla de valores como valor.
+    """
+    video_ids = generate_video_ids(seed=seed)
+    tabs = {}
+    for i in range(n_clients):
+        df = generate_leads(rows_per_client, seed=seed + i, video_ids=video_ids)
+        tabs[f"Cliente {i + 1}"] = [list(df.columns)] + df.values.tolist()
+    return tabs
+
+
+def generate_notion_links(video_ids, coverage: float = 0.8, seed: int = 0):
+    """
+    Genera el catálogo de Notion (ID y Link) para una parte de los videos.
+
+    Args:
+        video_ids (list): Las matrículas de video.
+        coverage (float): Proporción de videos que tienen enlace.
+        seed (int): Semilla para que los datos sean reproducibles.
+
+    Returns:
+        list: Una lista de diccionarios con 'ID' y 'Link', como `get_notion_data`.
+    """
+    rng = np.random.default_rng(seed)
+    return [
+        {"ID": video_id, "Link": f"https://drive.google.com/file/d/{video_id}/view"}
+        for video_id in video_ids
+        if rng.random() < coverage
+    ]
@@ -0,0 +1,313 @@
+"""
+Prueba de carga de la API completa (main.py) contra los servicios falsos.
+
+Levanta la API con uvicorn en este mismo proceso, con Sheets, Drive, Notion y Slack
+reemplazados por los falsos de `benchmarks.fakes` (con latencia y errores simulados),
+y le envía tráfico mixto con concurrencia creciente. Por cada nivel reporta el
+rendimiento (peticiones por segundo), las latencias p50/p95/p99 y los errores.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.loadtest --concurrency 1,8,32,64 --duration 10
+    python -m benchmarks.loadtest --latency-ms 300 --jitter-ms 200 --error-rate 0.02
+    python -m benchmarks.loadtest --threads 80 --by-endpoint --save /tmp/carga.json
+
+Si el rendimiento deja de crecer con la concurrencia mientras p99 sube, el límite es
+el pool de hilos de los endpoints síncronos (`--threads`, 40 por defecto en Starlette)
+o la latencia de los servicios externos.
+"""
+
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import shutil
+import sys
+import threading
+import time
+
+# Tráfico mixto: nombre -> (peso, método, ruta, parámetros, cuerpo JSON)
+TRAFFIC = {
+    "client_data": (2, "GET", "/data/{client}", None, None),
+    "closed": (4, "GET", "/data/closed/{client}", None, None),
+    "appointments": (3, "GET", "/data/appointments/{client}", None, None),
+    "quality": (3, "GET", "/data/quality/{client}", None, None),
+    "general": (2, "GET", "/data/general/video-performance", {"limit": 50}, None),
+    "alert": (
+        1,
+        "POST",
+        "/bot/alert/",
+        {"message": "Prueba de carga"},
+        {"channels": ["C-LOADTEST"]},
+    ),
+}
+
+
+def percentiles(samples: list):
+    """
+    Calcula p50, p95 y p99 de una lista de latencias.
+
+    Returns:
+        dict: Los percentiles en segundos; vacío si no hay muestras.
+    """
+    if not samples:
+        return {}
+    if len(samples) == 1:
+        return {"p50_s": samples[0], "p95_s": samples[0], "p99_s": samples[0]}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50_s": cuts[49], "p95_s": cuts[94], "p99_s": cuts[98]}
+
+
+def summarize(records: list, elapsed: float):
+    """
+    Resume las peticiones de un nivel de concurrencia.
+
+    Args:
+        records (list): Tuplas (endpoint, código HTTP, latencia en segundos); el código
+                        es 0 si la petición no obtuvo respuesta.
+        elapsed (float): Duración del nivel en segundos.
+
+    Returns:
+        dict: Peticiones, rendimiento, percentiles, errores y códigos por endpoint.
+    """
+    latencies = [latency for _, _, latency in records]
+    errors = sum(1 for _, status, _ in records if status == 0 or status >= 500)
+    summary = {
+        "requests": len(records),
+        "throughput_rps": len(records) / elapsed if elapsed else 0.0,
+        "error_rate": errors / len(records) if records else 0.0,
+        **percentiles(latencies),
+        "endpoints": {},
+    }
+    for name in TRAFFIC:
+        own = [
+            (status, latency)
+            for endpoint, status, latency in records
+            if endpoint == name
+        ]
+        if not own:
+            continue
+        statuses = {}
+        for status, _ in own:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        summary["endpoints"][name] = {
+            "requests": len(own),
+            "statuses": statuses,
+            **percentiles([latency for _, latency in own]),
+        }
+    return summary
+
+
+def start_server(app, threads: int = None):
+    """
+    Levanta la API con uvicorn en un hilo, en un puerto libre de 127.0.0.1.
+
+    Args:
+        app (FastAPI): La aplicación.
+        threads (int, opcional): Tamaño del pool de hilos de los endpoints síncronos.
+
+    Returns:
+        tuple: El servidor, su hilo y la URL base.
+    """
+    import uvicorn
+
+    if threads:
+
+        async def set_thread_limit():
+            import anyio.to_thread
+
+            anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+
+        app.router.on_startup.insert(0, set_thread_limit)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, log_level="warning", access_log=False, lifespan="on")
+    )
+    thread = threading.Thread(
+        target=server.run, kwargs={"sockets": [sock]}, name="loadtest-api", daemon=True
+    )
+    thread.start()
+    deadline = time.monotonic() + 60
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("La API no arrancó")
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def drive_traffic(
+    base_url: str, clients: list, concurrency: int, duration: float, seed: int = 0
+):
+    """
+    Envía tráfico mixto con `concurrency` usuarios simultáneos durante `duration` segundos.
+    Cada usuario espera la respuesta antes de enviar la siguiente petición.
+
+    Returns:
+        tuple: Las peticiones (endpoint, código HTTP, latencia) y la duración real.
+    """
+    import httpx
+
+    names = list(TRAFFIC)
+    weights = [TRAFFIC[name][0] for name in names]
+    records = []
+
+    async def user(http, number: int, deadline: float):
+        rng = random.Random(seed * 1000 + number)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            _, method, path, params, body = TRAFFIC[name]
+            url = path.format(client=rng.choice(clients))
+            start = time.perf_counter()
+            try:
+                response = await http.request(method, url, params=params, json=body)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            records.append((name, status, time.perf_counter() - start))
+
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as http:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(user(http, i, deadline) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return records, elapsed
+
+
+def print_level(concurrency: int, summary: dict, by_endpoint: bool):
+    line = (
+        f"c={concurrency:<4d} {summary['requests']:7d} pet. "
+        f"{summary['throughput_rps']:8.1f} pet/s"
+    )
+    if summary["requests"]:
+        line += (
+            f"   p50 {summary['p50_s'] * 1000:8.1f} ms"
+            f"   p95 {summary['p95_s'] * 1000:8.1f} ms"
+            f"   p99 {summary['p99_s'] * 1000:8.1f} ms"
+            f"   errores {summary['error_rate'] * 100:5.1f} %"
+        )
+    print(line)
+    if by_endpoint:
+        for name, endpoint in summary["endpoints"].items():
+            print(
+                f"    {name:15s} {endpoint['requests']:6d} pet."
+                f"   p50 {endpoint['p50_s'] * 1000:8.1f} ms"
+                f"   p99 {endpoint['p99_s'] * 1000:8.1f} ms"
+                f"   {endpoint['statuses']}"
+            )
+
+
+def main(argv=None):
+    from benchmarks.fakes import UpstreamFaults, install_fakes
+    from benchmarks.scenarios import build_context
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000, help="Leads en total")
+    parser.add_argument(
+        "--concurrency",
+        default="1,8,32,64",
+        help="Usuarios simultáneos, separados por coma",
+    )
+    parser.add_argument("--duration", type=float, default=10, help="Segundos por nivel")
+    parser.add_argument(
+        "--latency-ms", type=float, default=100, help="Latencia fija simulada"
+    )
+    parser.add_argument(
+        "--jitter-ms", type=float, default=100, help="Latencia aleatoria adicional"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fracción de llamadas que fallan"
+    )
+    parser.add_argument(
+        "--fault-upstreams",
+        default="",
+        help="Servicios con latencia y errores (sheets,drive,notion,slack). Por defecto, todos",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=0, help="Hilos para los endpoints síncronos"
+    )
+    parser.add_argument(
+        "--shared-cache",
+        action="store_true",
+        help="Activar la caché compartida, como en producción (en un directorio temporal)",
+    )
+    parser.add_argument(
+        "--by-endpoint", action="store_true", help="Detalle por endpoint"
+    )
+    parser.add_argument("--save", default="", help="Guardar los resultados en JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    faults = UpstreamFaults(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        upstreams=[name for name in args.fault_upstreams.split(",") if name],
+        seed=args.seed,
+    )
+
+    ctx = build_context(args.rows, seed=args.seed)
+    clients = list(ctx["tabs"])
+    results = {}
+    try:
+        with install_fakes(ctx["tabs"], ctx["links"], faults):
+            import config.shared_cache
+
+            if args.shared_cache:
+                config.shared_cache.SHARED_CACHE_DIR = os.path.join(
+                    ctx["workdir"], "shared-cache"
+                )
+                config.shared_cache.SHARED_CACHE_ENABLED = True
+
+            from main import app
+
+            server, thread, base_url = start_server(app, args.threads)
+            try:
+                for level in levels:
+                    records, elapsed = asyncio.run(
+                        drive_traffic(
+                            base_url, clients, level, args.duration, args.seed
+                        )
+                    )
+                    results[str(level)] = summarize(records, elapsed)
+                    print_level(level, results[str(level)], args.by_endpoint)
+            finally:
+                server.should_exit = True
+                thread.join(timeout=30)
+    finally:
+        shutil.rmtree(ctx["workdir"], ignore_errors=True)
+
+    print(f"Llamadas a los servicios falsos: {faults.calls}   errores: {faults.errors}")
+
+    if args.save:
+        saved = {
+            "results": results,
+            "meta": {
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "args": vars(args),
+            },
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Ejecuta los escenarios de rendimiento contra los servicios falsos y compara con una línea base.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.run --sizes 1000,10000
+    python -m benchmarks.run --sizes 1000,10000 --save benchmarks/baseline.json
+    python -m benchmarks.run --only preprocess_data,analyze_closed_data --sizes 1000000
+
+Termina con código 1 si algún escenario es más lento que la línea base por encima
+del umbral (`--threshold`, 25 % por defecto).
+
+La línea base guarda tiempos absolutos de la máquina donde se generó, junto con el
+tiempo de una carga fija de calibración. Al comparar, los tiempos de la línea base se
+escalan por la relación entre la calibración actual y la guardada, para que una máquina
+más lenta no reporte regresiones en todos los escenarios. La escala es aproximada: para
+decisiones finas conviene generar una línea base local con `--save` antes del cambio.
+"""
+
+from datetime import datetime
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import time
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def time_scenario(func, ctx, repeat: int, warmup: int = 1):
+    """
+    Mide un escenario varias veces.
+
+    Args:
+        func (callable): El escenario.
+        ctx (dict): El contexto con los datos generados.
+        repeat (int): Cantidad de mediciones.
+        warmup (int): Ejecuciones previas que no se miden.
+
+    Returns:
+        dict: Mediana, mínimo y máximo en segundos.
+    """
+    for _ in range(warmup):
+        func(ctx)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(ctx)
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "repeat": repeat,
+    }
+
+
+def calibrate(repeat: int = 5):
+    """
+    Mide una carga fija de pandas (agrupación y normalización de textos, como los
+    análisis) para comparar la velocidad de esta máquina con la de la línea base.
+
+    Returns:
+        float: La mediana en segundos.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "key": rng.integers(0, 1000, 200_000).astype(str),
+            "value": rng.random(200_000),
+        }
+    )
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df["key"].str.upper().str.strip()
+        df.groupby("key")["value"].sum()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def compare(results: dict, baseline: dict, threshold: float, scale: float = 1.0):
+    """
+    Compara los resultados con la línea base por la mediana.
+
+    Args:
+        results (dict): Los resultados actuales.
+        baseline (dict): Los resultados de la línea base.
+        threshold (float): Fracción de lentitud tolerada, por ejemplo 0.25.
+        scale (float): Relación entre la calibración actual y la de la línea base.
+
+    Returns:
+        list: Las regresiones, como tuplas (escenario, mediana base escalada, mediana actual).
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        expected = previous["median_s"] * scale
+        if current["median_s"] > expected * (1 + threshold):
+            regressions.append((key, expected, current["median_s"]))
+    return regressions
+
+
+def main(argv=None):
+    from benchmarks.fakes import install_fakes
+    from benchmarks.scenarios import SCENARIOS, build_context
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000", help="Filas por escenario")
+    parser.add_argument(
+        "--only", default="", help="Escenarios a ejecutar, separados por coma"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save", default="", help="Guardar los resultados como línea base"
+    )
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    names = [name for name in args.only.split(",") if name] or list(SCENARIOS)
+
+    calibration = calibrate()
+    results = {}
+    for size in sizes:
+        ctx = build_context(size)
+        try:
+            with install_fakes(ctx["tabs"], ctx["links"]):
+                for name in names:
+                    key = f"{name}@{size}"
+                    results[key] = time_scenario(SCENARIOS[name], ctx, args.repeat)
+                    print(
+                        f"{key:45s} mediana {results[key]['median_s'] * 1000:10.1f} ms"
+                        f"   mín {results[key]['min_s'] * 1000:10.1f} ms"
+                    )
+        finally:
+            shutil.rmtree(ctx["workdir"], ignore_errors=True)
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            saved_baseline = json.load(f)
+    except FileNotFoundError:
+        saved_baseline = {}
+    baseline = saved_baseline.get("results", {})
+
+    base_calibration = saved_baseline.get("meta", {}).get("calibration_s")
+    scale = calibration / base_calibration if base_calibration else 1.0
+    if baseline and not base_calibration:
+        print("La línea base no tiene calibración: solo es comparable en su máquina")
+    elif baseline:
+        print(f"Calibración: {scale:.2f}x el tiempo de la máquina de la línea base")
+
+    regressions = compare(results, baseline, args.threshold, scale)
+    for key, before, after in regressions:
+        print(f"REGRESIÓN {key}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+
+    if args.save:
+        # Los tiempos guardados deben corresponder a una sola calibración
+        saved = {"results": baseline if base_calibration == calibration else {}}
+        saved["results"].update(results)
+        saved["meta"] = {
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "calibration_s": calibration,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+import os
+import tempfile
+from benchmarks.generator import (
+    generate_leads,
+    generate_notion_links,
+    generate_tabs,
+    generate_video_ids,
+)
+
+# Cantidad de clientes (hojas) en los escenarios que recorren todos los clientes
+CLIENTS = 4
+
+SCENARIOS = {}
+
+
+def scenario(name: str):
+    """
+    Registra un escenario. La función recibe el contexto preparado por `build_context`
+    y ejecuta una vez la operación a medir.
+
+    Args:
+        name (str): El nombre del escenario en los resultados.
+    """
+
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+
+    return decorator
+
+
+def build_context(n_rows: int, seed: int = 0):
+    """
+    Genera los datos de un tamaño dado: un cliente con `n_rows` leads para los análisis
+    por cliente, y `CLIENTS` hojas que suman `n_rows` para los escenarios globales.
+
+    Args:
+        n_rows (int): Cantidad total de leads.
+        seed (int): Semilla para que los datos sean reproducibles.
+
+    Returns:
+        dict: El contexto con 'leads', 'tabs', 'links', 'video_links' y 'workdir', un
+        directorio temporal que quien llama debe borrar al terminar.
+    """
+    video_ids = generate_video_ids(seed=seed)
+    links = generate_notion_links(video_ids, seed=seed)
+    return {
+        "n_rows": n_rows,
+        "leads": generate_leads(n_rows, seed=seed, video_ids=video_ids),
+        "tabs": generate_tabs(CLIENTS, max(n_rows // CLIENTS, 1), seed=seed),
+        "links": links,
+        "video_links": {item["ID"]: item["Link"] for item in links},
+        "workdir": tempfile.mkdtemp(prefix="sunboost-bench-"),
+    }
+
+
+@scenario("sheet_fetch")
+def bench_sheet_fetch(ctx):
+    from config.data import get_google_sheets_data
+
+    get_google_sheets_data("Cliente 1")
+
+
+@scenario("sheet_fetch_shared_cache")
+def bench_sheet_fetch_shared_cache(ctx):
+    import config.shared_cache
+    from config.data import get_google_sheets_data
+
+    # Lectura de una hoja ya publicada en la caché compartida (por ejemplo, por otro worker)
+    previous_dir = config.shared_cache.SHARED_CACHE_DIR
+    config.shared_cache.SHARED_CACHE_DIR = os.path.join(ctx["workdir"], "shared-cache")
+    config.shared_cache.SHARED_CACHE_ENABLED = True
+    try:
+        get_google_sheets_data("Cliente 1")
+    finally:
+        # El pool de procesos sigue usando el directorio con el que se inició, y
+        # el directorio de trabajo se borra al terminar cada tamaño
+        config.shared_cache.SHARED_CACHE_ENABLED = False
+        config.shared_cache.SHARED_CACHE_DIR = previous_dir
+
+
+@scenario("preprocess_data")
+def bench_preprocess(ctx):
+    from config.data import preprocess_data
+
+    preprocess_data(ctx["leads"], ctx["video_links"])
+
+
+@scenario("analyze_closed_data")
+def bench_closed(ctx):
+    from config.data import analyze_closed_data
+
+    analyze_closed_data(ctx["leads"], ctx["video_links"])
+
+
+@scenario("analyze_appointments_data")
+def bench_appointments(ctx):
+    from config.data import analyze_appointments_data
+
+    analyze_appointments_data(ctx["leads"], ctx["video_links"])
+
+
+@scenario("analyze_quality_distribution")
+def bench_quality(ctx):
+    from config.data import analyze_quality_distribution
+
+    analyze_quality_distribution(ctx["leads"])
+
+
+@scenario("analyze_general_video_performance")
+def bench_general(ctx):
+    from config.data import analyze_general_video_performance
+
+    analyze_general_video_performance()
+
+
+@scenario("general_video_performance_process_pool")
+def bench_general_process_pool(ctx):
+    import config.process_pool
+    from config.data import analyze_general_video_performance
+
+    # El procesamiento por cliente en un proceso por CPU (el pool queda iniciado entre
+    # repeticiones, como en la API)
+    config.process_pool.ANALYSIS_PROCESS_POOL = os.cpu_count()
+    config.process_pool.ANALYSIS_POOL_MIN_ROWS = 0
+    try:
+        analyze_general_video_performance()
+    finally:
+        config.process_pool.ANALYSIS_PROCESS_POOL = 0
+
+
+@scenario("closed_chunked")
+def bench_closed_chunked(ctx):
+    from config.streaming import aggregate_sheet
+
+    # Cierres de una hoja leída por bloques, sin cargarla entera
+    aggregate_sheet("Cliente 1", chunk_rows=1000).closed()
+
+
+@scenario("closed_counts_sql")
+def bench_closed_sql(ctx):
+    from config.sql_engine import closed_counts_sql
+
+    # Los mismos conteos que analyze_closed_data, con DuckDB en lugar de pandas
+    closed_counts_sql(ctx["leads"])
+
+
+@scenario("sql_query_all_clients")
+def bench_sql_all_clients(ctx):
+    from config.sql_engine import execute_sql
+
+    execute_sql(
+        'SELECT client, "Stage", count(*) AS leads FROM leads '
+        'WHERE "Stage" <> $stage GROUP BY ALL ORDER BY leads DESC',
+        {"stage": ""},
+    )
+
+
+# Ventanas del dashboard, terminando en el último día con leads de los datos generados
+DASHBOARD_WINDOWS = "1d,7d,30d,mtd,prev_7d"
+
+
+def _latest_date(ctx):
+    if "latest_date" not in ctx:
+        rows = ctx["tabs"]["Cliente 1"]
+        column = rows[0].index("Created at (fecha)")
+        ctx["latest_date"] = max(row[column] for row in rows[1:] if row[column])
+    return ctx["latest_date"]
+
+
+@scenario("closed_windows")
+def bench_closed_windows(ctx):
+    from config.windows import client_windows
+
+    # Cinco ventanas en una sola pasada sobre conteos diarios
+    client_windows("closed", "Cliente 1", DASHBOARD_WINDOWS, _latest_date(ctx))
+
+
+@scenario("closed_per_window")
+def bench_closed_per_window(ctx):
+    from config.data import analyze_closed_data, filter_by_date, get_google_sheets_data
+    from config.windows import parse_windows
+
+    # Las mismas ventanas como consultas separadas, como las pedía el dashboard
+    for start, end in parse_windows(DASHBOARD_WINDOWS, _latest_date(ctx)).values():
+        start, end = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+        df = get_google_sheets_data("Cliente 1", since=start)
+        analyze_closed_data(filter_by_date(df, start, end))
+
+
+def _use_watermarks(ctx, fresh: bool):
+    import config.row_index
+    import config.watermarks
+
+    config.watermarks.WATERMARK_FILE = os.path.join(ctx["workdir"], "watermarks.json")
+    config.row_index.ROW_INDEX_FILE = os.path.join(ctx["workdir"], "row_index.json")
+    if fresh and os.path.exists(config.watermarks.WATERMARK_FILE):
+        os.remove(config.watermarks.WATERMARK_FILE)
+
+
+@scenario("daily_alerts_full_sync")
+def bench_daily_full(ctx):
+    from controllers.bot_slack import send_daily_alerts
+
+    # Sin marcas de agua: primera corrida, se procesa todo el historial
+    _use_watermarks(ctx, fresh=True)
+    send_daily_alerts()
+
+
+@scenario("daily_appointments_alert")
+def bench_daily_appointments(ctx):
+    from controllers.bot_slack import send_daily_appointments_alert
+
+    _use_watermarks(ctx, fresh=False)
+    send_daily_appointments_alert()
+
+
+@scenario("daily_closed_alert")
+def bench_daily_closed(ctx):
+    from controllers.bot_slack import send_daily_closed_alert
+
+    _use_watermarks(ctx, fresh=False)
+    send_daily_closed_alert()
+
+
+@scenario("weekly_alerts")
+def bench_weekly(ctx):
+    from controllers.bot_slack import send_weekly_alerts
+
+    _use_watermarks(ctx, fresh=False)
+    send_weekly_alerts()
+
+
+@scenario("monthly_alerts")
+def bench_monthly(ctx):
+    from controllers.bot_slack import send_monthly_alerts
+
+    _use_watermarks(ctx, fresh=False)
+    send_monthly_alerts()
@@ -0,0 +1,105 @@
+from functools import partial
+import pandas as pd
+from config.data import (
+    analyze_appointments_data,
+    analyze_closed_data,
+    analyze_quality_distribution,
+    filter_by_date,
+    get_google_sheets_data,
+    iter_parallel,
+    preprocess_data,
+    required_columns,
+    window_start,
+)
+
+# Consulta en bloque: varios clientes, análisis y rangos de fechas en una sola petición.
+# Cada hoja se descarga y se procesa una sola vez, y todos los análisis pedidos se
+# calculan sobre ese mismo DataFrame.
+BATCH_ANALYSES = {
+    "closed": analyze_closed_data,
+    "appointments": analyze_appointments_data,
+    "quality": analyze_quality_distribution,
+}
+
+
+def batch_since(ranges: list):
+    """
+    Devuelve la fecha más antigua que necesitan todos los rangos, o None si alguno
+    abarca todo el historial.
+
+    Args:
+        ranges (list): Pares (fecha de inicio, fecha de fin), con None si no hay filtro.
+
+    Returns:
+        str: La fecha, o None si hay que leer la hoja completa.
+    """
+    starts = [window_start(start_date, end_date) for start_date, end_date in ranges]
+    if not starts or None in starts:
+        return None
+    return min(starts, key=pd.to_datetime)
+
+
+def analyze_client_batch(client: str, analyses: list, ranges: list):
+    """
+    Calcula varios análisis de un cliente, en varios rangos de fechas, con una sola
+    descarga y un solo preprocesamiento de su hoja.
+
+    Args:
+        client (str): El nombre del cliente.
+        analyses (list): Los análisis: 'closed', 'appointments' y/o 'quality'.
+        ranges (list): Pares (fecha de inicio, fecha de fin), con None si no hay filtro.
+
+    Returns:
+        dict: {'client', 'results'}, con un elemento de 'results' por rango que incluye
+              las fechas y una lista de registros por análisis. Si falla, {'client', 'error'}.
+    """
+    try:
+        columns = required_columns(
+            filter_by_date, *(BATCH_ANALYSES[analysis] for analysis in analyses)
+        )
+        df = get_google_sheets_data(client, columns=columns, since=batch_since(ranges))
+        df = preprocess_data(df)
+
+        results = []
+        for start_date, end_date in ranges:
+            window_df = filter_by_date(df, start_date, end_date)
+            entry = {"start_date": start_date, "end_date": end_date}
+            for analysis in analyses:
+                analysis_df = BATCH_ANALYSES[analysis](window_df, preprocessed=True)
+                entry[analysis] = analysis_df.to_dict(orient="records")
+            results.append(entry)
+        return {"client": client, "results": results}
+    except Exception as e:
+        print(f"Error en la consulta en bloque del cliente {client}: {e}")
+        return {"client": client, "error": str(e)}
+
+
+def iter_batch(clients: list, analyses: list, ranges: list):
+    """
+    Calcula la consulta en bloque de varios clientes en paralelo (ver `iter_parallel`)
+    y entrega cada cliente apenas termina.
+
+    Args:
+        clients (list): Los nombres de los clientes.
+        analyses (list): Los análisis a calcular para cada cliente.
+        ranges (list): Pares (fecha de inicio, fecha de fin).
+
+    Yields:
+        dict: El resultado de cada cliente (ver `analyze_client_batch`), en orden de finalización.
+    """
+    # En el pool de hilos compartido, como las demás lecturas en paralelo
+    clients = list(dict.fromkeys(clients))
+    yield from iter_parallel(
+        partial(analyze_client_batch, analyses=analyses, ranges=ranges), clients
+    )
+
+
+def run_batch(clients: list, analyses: list, ranges: list):
+    """
+    Calcula la consulta en bloque completa.
+
+    Returns:
+        list: El resultado de cada cliente, en el orden en que se pidieron.
+    """
+    results = {item["client"]: item for item in iter_batch(clients, analyses, ranges)}
+    return [results[client] for client in dict.fromkeys(clients)]
@@ -1,12 +1,27 @@
-import slack
 from os import getenv
 from dotenv import load_dotenv
 from schemas.bot_slack import ChannelList, SlackResponseAlerts
+from config.metrics import track_upstream
+from config.resilience import guarded
 
 # Cargar variables de entorno desde el archivo .env
 load_dotenv(".env")
 
-client = slack.WebClient(token=getenv("SLACK_TOKEN"))
+# Cliente de Slack; se construye en el primer uso (ver `get_slack_client`)
+client = None
+
+
+def get_slack_client():
+    """
+    Devuelve el cliente de Slack, construyéndolo la primera vez. La librería se
+    importa aquí para no cargarla al arrancar la API.
+    """
+    global client
+    if client is None:
+        import slack
+
+        client = slack.WebClient(token=getenv("SLACK_TOKEN"))
+    return client
 
 
 def send_slack_notifications(channels_data: ChannelList, message: str):
@@ -24,7 +39,11 @@ def send_slack_notifications(channels_data: ChannelList, message: str):
     responses = []
     for channel in channels_data:
         try:
-            response = client.chat_postMessage(channel=channel, text=message)
+            # Con Slack caído (circuito abierto) el envío falla de inmediato
+            with guarded("slack"), track_upstream("slack", "chat.postMessage"):
+                response = get_slack_client().chat_postMessage(
+                    channel=channel, text=message
+                )
             responses.append(
                 SlackResponseAlerts(channel=channel, message=message, success=True)
             )
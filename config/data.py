@@ -1,65 +1,763 @@
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
 import pandas as pd
 import numpy as np
 import re
 import os
-from config.data_notion import get_notion_data
+import threading
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from functools import partial
+from config.registry import load_client_registry
+from config.row_index import tail_start_row
+from config.video_links import get_csv_links, get_video_links, lookup_links
+from config.metrics import ANALYSIS_ROWS, record_cache, track_upstream
+from config.process_pool import map_frames, use_process_pool
+from config.quota import acquire
+from config.resilience import get_or_compute_stale, guarded
+from config.shared_cache import SHARED_CACHE_TTL
+from config.timing import fan_out, record_fetched_data, timed_phase
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive.metadata.readonly"]
 KEY = "key.json"
 # Escribe aquí el ID de tu documento:
 SPREADSHEET_ID = "1edfM96ge_NasWsH16WpGihBeCj0g-Rj2T6zmxZMycp4"
 
+# Etapas que cuentan como cierre y como cita en todos los análisis
+CLOSED_STAGES = ["CLOSED", "INSTALLED"]
+APPOINTMENT_STAGES = [
+    "CLOSED",
+    "INSTALLED",
+    "SHOWED (NOT CLOSED)",
+    "SHOWED (NOT QUALIFIED)",
+    "NO SHOW (RE-SCHEDULE)",
+    "APPOINTMENT BOOKED",
+    "APPOINTMENT CANCEL",
+]
 
-def get_google_sheets_data(range_name: str):
+# Los objetos de googleapiclient no son seguros entre hilos, se guarda uno por hilo
+_thread_local = threading.local()
+
+# Encabezados (fila 1) de cada hoja, para ubicar columnas por nombre
+_header_cache = {}
+
+# Ubicación (documento y hoja) de cada cliente según el registro
+CLIENT_LOCATIONS_TTL = int(os.getenv("CLIENT_LOCATIONS_TTL", "300"))
+_client_locations = {"expires_at": 0.0, "locations": {}}
+_locations_lock = threading.Lock()
+
+# Máximo de lecturas a Google Sheets en paralelo (hilos del pool compartido)
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "8"))
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_sheets_service():
+    """
+    Devuelve el servicio de Google Sheets del hilo actual, construyéndolo la primera vez.
+
+    Returns:
+        Resource: El recurso `spreadsheets()` de la API de Google Sheets.
+    """
+    service = getattr(_thread_local, "sheets_service", None)
+    if service is None:
+        # Importación diferida: googleapiclient no se carga hasta la primera consulta
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
+        creds = service_account.Credentials.from_service_account_file(
+            KEY, scopes=SCOPES
+        )
+        service = build("sheets", "v4", credentials=creds).spreadsheets()
+        _thread_local.sheets_service = service
+    return service
+
+
+def execute_request(request, operation: str, upstream: str = "sheets"):
+    """
+    Ejecuta una petición de googleapiclient registrando su latencia y errores, después
+    de esperar cupo en el regulador de cuota. Si el servicio está caído (circuito
+    abierto) falla de inmediato con `UpstreamUnavailable`.
+
+    Args:
+        request (HttpRequest): La petición ya construida, sin ejecutar.
+        operation (str): El nombre de la operación para las métricas, por ejemplo 'values.get'.
+        upstream (str): El servicio llamado ('sheets' o 'drive').
+
+    Returns:
+        dict: La respuesta de la API.
+    """
+    # Con el circuito abierto no se espera cupo ni se llama al servicio
+    with guarded(upstream):
+        # Esperar cupo antes de medir: la espera no es latencia del servicio
+        acquire(upstream)
+        with track_upstream(upstream, operation):
+            return request.execute()
+
+
+def get_drive_service():
+    """
+    Devuelve el servicio de Google Drive del hilo actual, construyéndolo la primera vez.
+    Solo se usa para consultar metadatos baratos (versión) del documento.
+
+    Returns:
+        Resource: El recurso `files()` de la API de Google Drive.
+    """
+    service = getattr(_thread_local, "drive_service", None)
+    if service is None:
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
+        creds = service_account.Credentials.from_service_account_file(
+            KEY, scopes=DRIVE_SCOPES
+        )
+        service = build("drive", "v3", credentials=creds).files()
+        _thread_local.drive_service = service
+    return service
+
+
+def _mark_pool_thread():
+    _thread_local.pool_thread = True
+
+
+def get_executor():
+    """
+    Devuelve el pool de hilos compartido para las lecturas en paralelo, creándolo la
+    primera vez. Sus hilos viven todo el proceso, así que cada uno construye su
+    servicio de Google Sheets una sola vez (ver `get_sheets_service`).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=SHEETS_MAX_WORKERS,
+                thread_name_prefix="sheets",
+                initializer=_mark_pool_thread,
+            )
+        return _executor
+
+
+def run_parallel(func, items):
+    """
+    Ejecuta `func` sobre cada elemento en el pool de hilos compartido, conservando el orden.
+    Cada tarea hereda el contexto de la petición (métricas de Server-Timing, perfilado);
+    el tiempo de sus fases se cuenta una sola vez, escalado al tiempo real del reparto.
+    Dentro de un hilo del pool se ejecuta en serie, para que las tareas no esperen
+    a otras encoladas detrás de ellas.
+
+    Args:
+        func (callable): La función a aplicar.
+        items (iterable): Los elementos.
+
+    Returns:
+        list: Los resultados en el mismo orden que `items`.
+    """
+    items = list(items)
+    if _run_serially(items):
+        return [func(item) for item in items]
+    executor = get_executor()
+    with fan_out() as tasks:
+        futures = [
+            executor.submit(copy_context().run, tasks.run, func, item) for item in items
+        ]
+        return [future.result() for future in futures]
+
+
+def iter_parallel(func, items):
+    """
+    Como `run_parallel`, pero entrega cada resultado apenas termina, en orden de
+    finalización, para responder por partes.
+
+    Args:
+        func (callable): La función a aplicar.
+        items (iterable): Los elementos.
+
+    Yields:
+        El resultado de cada elemento.
+    """
+    items = list(items)
+    if _run_serially(items):
+        for item in items:
+            yield func(item)
+        return
+    executor = get_executor()
+    with fan_out() as tasks:
+        futures = [
+            executor.submit(copy_context().run, tasks.run, func, item) for item in items
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _run_serially(items: list):
+    return (
+        len(items) <= 1
+        or SHEETS_MAX_WORKERS <= 1
+        or getattr(_thread_local, "pool_thread", False)
+    )
+
+
+def list_visible_tabs(spreadsheet_id: str):
+    """
+    Recupera los nombres de las hojas visibles de un documento.
+
+    Args:
+        spreadsheet_id (str): El ID del documento.
+
+    Returns:
+        list: Los nombres de las hojas que no están ocultas.
+    """
+    sheet = get_sheets_service()
+    # Llamada a la API para obtener las propiedades del documento
+    result = execute_request(sheet.get(spreadsheetId=spreadsheet_id), "get")
+    # Filtrar hojas que no están ocultas
+    return [
+        sheet["properties"]["title"]
+        for sheet in result["sheets"]
+        if not sheet["properties"].get("hidden", False)
+    ]
+
+
+def get_client_locations(refresh: bool = False):
+    """
+    Arma el mapa cliente -> documento y hoja a partir del registro de clientes,
+    listando en paralelo las hojas visibles de todos los documentos registrados.
+
+    Args:
+        refresh (bool): Si es True, vuelve a listar las hojas aunque el mapa siga vigente.
+
+    Returns:
+        dict: Un diccionario con el nombre del cliente como clave y
+              {'spreadsheet_id', 'tab'} como valor.
+    """
+    with _locations_lock:
+        if not refresh and time.monotonic() < _client_locations["expires_at"]:
+            return _client_locations["locations"]
+
+    registry = load_client_registry(SPREADSHEET_ID)
+    tabs_by_spreadsheet = run_parallel(list_visible_tabs, registry["spreadsheets"])
+
+    # Las hojas asignadas explícitamente a un cliente no se registran con su nombre
+    claimed = {(c["spreadsheet_id"], c["tab"]) for c in registry["clients"].values()}
+    locations = {}
+    for spreadsheet_id, tabs in zip(registry["spreadsheets"], tabs_by_spreadsheet):
+        for tab in tabs:
+            if (spreadsheet_id, tab) in claimed:
+                continue
+            if tab in locations:
+                print(f"Hoja duplicada '{tab}' en {spreadsheet_id}, se usa la primera")
+                continue
+            locations[tab] = {"spreadsheet_id": spreadsheet_id, "tab": tab}
+    locations.update(registry["clients"])
+
+    with _locations_lock:
+        _client_locations["locations"] = locations
+        _client_locations["expires_at"] = time.monotonic() + CLIENT_LOCATIONS_TTL
+    return locations
+
+
+def resolve_client(client_name: str):
+    """
+    Indica en qué documento y hoja están los leads de un cliente.
+
+    Args:
+        client_name (str): El nombre del cliente.
+
+    Returns:
+        tuple: El ID del documento y el nombre de la hoja.
+    """
+    registry = load_client_registry(SPREADSHEET_ID)
+    if client_name in registry["clients"]:
+        location = registry["clients"][client_name]
+        return location["spreadsheet_id"], location["tab"]
+    # Con un solo documento no hace falta listar sus hojas
+    if len(registry["spreadsheets"]) == 1:
+        return registry["spreadsheets"][0], client_name
+
+    location = get_client_locations().get(client_name)
+    if location is None:
+        return SPREADSHEET_ID, client_name
+    return location["spreadsheet_id"], location["tab"]
+
+
+def group_by_spreadsheet(client_names: list):
+    """
+    Agrupa clientes por documento, para pedir varias hojas del mismo documento en un batchGet.
+
+    Args:
+        client_names (list): Los nombres de los clientes.
+
+    Returns:
+        dict: El ID del documento como clave y una lista de (cliente, hoja) como valor.
+    """
+    groups = {}
+    for name in client_names:
+        spreadsheet_id, tab = resolve_client(name)
+        groups.setdefault(spreadsheet_id, []).append((name, tab))
+    return groups
+
+
+def get_spreadsheet_version(spreadsheet_id: str = SPREADSHEET_ID):
+    """
+    Consulta la versión del documento en Drive. Cambia cada vez que se edita cualquier hoja,
+    y cuesta mucho menos cuota que leer los valores.
+
+    Args:
+        spreadsheet_id (str): El ID del documento.
+
+    Returns:
+        str: La versión actual del documento.
+    """
+    result = execute_request(
+        get_drive_service().get(fileId=spreadsheet_id, fields="version,modifiedTime"),
+        "files.get",
+        upstream="drive",
+    )
+    return result["version"]
+
+
+def get_spreadsheet_versions():
+    """
+    Consulta en paralelo la versión de todos los documentos del registro de clientes.
+
+    Returns:
+        dict: El ID del documento como clave y su versión como valor.
+    """
+    registry = load_client_registry(SPREADSHEET_ID)
+    spreadsheet_ids = list(
+        dict.fromkeys(
+            registry["spreadsheets"]
+            + [c["spreadsheet_id"] for c in registry["clients"].values()]
+        )
+    )
+    return dict(
+        zip(spreadsheet_ids, run_parallel(get_spreadsheet_version, spreadsheet_ids))
+    )
+
+
+def get_sheet_headers(sheet_names: list, refresh: bool = False):
+    """
+    Obtiene el encabezado (fila 1) de varias hojas con una sola llamada batchGet,
+    usando los encabezados ya conocidos cuando es posible.
+
+    Args:
+        sheet_names (list): Los nombres de las hojas a consultar.
+        refresh (bool): Si es True, vuelve a leer todos los encabezados.
+
+    Returns:
+        dict: Un diccionario con el nombre de la hoja como clave y la lista de columnas como valor.
+    """
+    missing = [name for name in sheet_names if refresh or name not in _header_cache]
+    for name in sheet_names:
+        record_cache("sheet_headers", name not in missing)
+
+    def fetch_headers(group):
+        spreadsheet_id, entries = group
+        result = execute_request(
+            get_sheets_service()
+            .values()
+            .batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=[f"{quote_sheet_name(tab)}!1:1" for _, tab in entries],
+            ),
+            "values.batchGet",
+        )
+        for (name, _), value_range in zip(entries, result.get("valueRanges", [])):
+            values = value_range.get("values", [[]])
+            _header_cache[name] = values[0] if values else []
+
+    if missing:
+        run_parallel(fetch_headers, group_by_spreadsheet(missing).items())
+    return {name: _header_cache.get(name, []) for name in sheet_names}
+
+
+def get_column_fingerprints(sheet_names: list, column: str = "Stage"):
+    """
+    Calcula una huella de una columna de cada hoja con una sola llamada batchGet.
+    La huella cambia cuando se agregan filas o se edita algún valor de la columna.
+
+    Args:
+        sheet_names (list): Los nombres de las hojas a revisar.
+        column (str): El nombre de la columna a usar como huella (por defecto 'Stage').
+
+    Returns:
+        dict: Un diccionario con el nombre de la hoja como clave y la huella (str) como valor.
+              Las hojas sin esa columna no se incluyen.
+    """
+    headers = get_sheet_headers(sheet_names)
+    names = [name for name in sheet_names if column in headers[name]]
+
+    def fetch_fingerprints(group):
+        spreadsheet_id, entries = group
+        ranges = []
+        for name, tab in entries:
+            letter = column_letter(headers[name].index(column) + 1)
+            ranges.append(f"{quote_sheet_name(tab)}!{letter}:{letter}")
+        result = execute_request(
+            get_sheets_service()
+            .values()
+            .batchGet(spreadsheetId=spreadsheet_id, ranges=ranges),
+            "values.batchGet",
+        )
+        fingerprints = {}
+        for (name, _), value_range in zip(entries, result.get("valueRanges", [])):
+            payload = json.dumps(value_range.get("values", [])).encode("utf-8")
+            fingerprints[name] = hashlib.md5(payload).hexdigest()
+        return fingerprints
+
+    fingerprints = {}
+    for group_fingerprints in run_parallel(
+        fetch_fingerprints, group_by_spreadsheet(names).items()
+    ):
+        fingerprints.update(group_fingerprints)
+    return fingerprints
+
+
+def column_letter(index: int):
+    """
+    Convierte un índice de columna (empezando en 1) a su letra en notación A1.
+
+    Args:
+        index (int): Índice de la columna, 1 corresponde a la columna A.
+
+    Returns:
+        str: La letra (o letras) de la columna, por ejemplo "A", "Z" o "AB".
+    """
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def quote_sheet_name(sheet_name: str):
+    """
+    Escapa el nombre de una hoja para usarlo dentro de un rango en notación A1.
+
+    Args:
+        sheet_name (str): El nombre de la hoja (pestaña).
+
+    Returns:
+        str: El nombre entre comillas simples, por ejemplo "'Cliente A'".
+    """
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+
+def uses_columns(*columns):
+    """
+    Decorador para declarar las columnas de la hoja que usa un análisis, para que las
+    rutas puedan pedir solo esas columnas a Google Sheets.
+
+    Args:
+        *columns (str): Los nombres de las columnas (encabezados de la fila 1).
+    """
+
+    def decorator(func):
+        func.required_columns = list(columns)
+        return func
+
+    return decorator
+
+
+def required_columns(*funcs):
+    """
+    Une las columnas declaradas con `uses_columns` por varias funciones.
+
+    Args:
+        *funcs (callable): Las funciones que se van a aplicar a los datos.
+
+    Returns:
+        list: Los nombres de las columnas, sin repetir y en orden de aparición.
+    """
+    columns = []
+    for func in funcs:
+        for column in getattr(func, "required_columns", []):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def get_projected_columns(sheet_name: str, columns: list, start_row: int = 2):
+    """
+    Descarga solo algunas columnas de una hoja, con una llamada batchGet por columnas.
+    Las posiciones salen del encabezado en caché; si la hoja cambió de orden, el
+    encabezado se vuelve a leer una vez.
+
+    Args:
+        sheet_name (str): El nombre de la hoja (cliente).
+        columns (list): Los nombres de las columnas a descargar.
+        start_row (int): Primera fila de datos a recuperar (la fila 1 es el encabezado).
+
+    Returns:
+        pd.DataFrame: Las columnas encontradas en la hoja, o None si no se pudo proyectar.
+    """
+    spreadsheet_id, tab = resolve_client(sheet_name)
+    quoted = quote_sheet_name(tab)
+
+    for refresh in (False, True):
+        header = get_sheet_headers([sheet_name], refresh=refresh)[sheet_name]
+        present = [column for column in columns if column in header]
+        if not present:
+            return None
+
+        # Por cada columna, su celda de encabezado (para confirmar que no se movió) y sus datos
+        letters = [column_letter(header.index(column) + 1) for column in present]
+        ranges = [f"{quoted}!{letter}1" for letter in letters] + [
+            f"{quoted}!{letter}{start_row}:{letter}" for letter in letters
+        ]
+        result = execute_request(
+            get_sheets_service()
+            .values()
+            .batchGet(
+                spreadsheetId=spreadsheet_id, ranges=ranges, majorDimension="COLUMNS"
+            ),
+            "values.batchGet",
+        )
+        series = [
+            (value_range.get("values") or [[]])[0]
+            for value_range in result.get("valueRanges", [])
+        ]
+        found = [values[0] if values else None for values in series[: len(present)]]
+        if found == present:
+            break
+    else:
+        return None
+
+    return frame_from_columns(series[len(present) :], present)
+
+
+def frame_from_columns(columns: list, header: list, skip: int = 0):
+    """
+    Arma un DataFrame a partir de una respuesta por columnas (majorDimension=COLUMNS).
+    La API omite las celdas vacías del final de cada columna: solo las columnas más
+    cortas se completan con "", sin copiar fila por fila.
+
+    Args:
+        columns (list): Los valores de cada columna, en el orden del encabezado.
+        header (list): Los nombres de las columnas; las columnas de más se descartan.
+        skip (int): Cantidad de celdas a omitir al inicio de cada columna (el encabezado).
+
+    Returns:
+        pd.DataFrame: Un DataFrame con una columna por nombre del encabezado.
+    """
+    columns = columns[: len(header)]
+    n_rows = max((len(values) - skip for values in columns), default=0)
+    data = {}
+    for position in range(len(header)):
+        values = columns[position] if position < len(columns) else []
+        array = np.full(max(n_rows, 0), "", dtype=object)
+        if len(values) > skip:
+            array[: len(values) - skip] = values[skip:]
+        data[position] = array
+    df = pd.DataFrame(data)
+    df.columns = header
+    return df
+
+
+@timed_phase("sheet_fetch")
+def get_google_sheets_data(range_name: str, columns: list = None, since=None):
     """
     Obtiene datos de un rango específico en una hoja de cálculo de Google Sheets.
 
     Args:
-        range_name (str): El rango dentro de Google Sheets del cual se van a recuperar los datos.
+        range_name (str): El nombre del cliente; se busca su documento y hoja en el registro.
+                          No acepta rangos A1 (por ejemplo "Hoja!A1:D10"): el nombre se
+                          cita completo como nombre de hoja.
+        columns (list, opcional): Descargar solo estas columnas (ver `required_columns`).
+                                  Por defecto, todas.
+        since (str, opcional): Fecha (YYYY-MM-DD) más antigua que se necesita. Si el índice
+                               de filas lo permite, solo se descarga la cola de la hoja;
+                               pueden venir filas anteriores, que se deben filtrar igual.
 
     Returns:
         pd.DataFrame: Un DataFrame de pandas que contiene los datos del rango especificado.
                       Retorna un DataFrame vacío si no se encuentran datos.
     """
-    creds = service_account.Credentials.from_service_account_file(KEY, scopes=SCOPES)
-    service = build("sheets", "v4", credentials=creds)
-    sheet = service.spreadsheets()
+    start_row = tail_start_row(range_name, since) if since else None
+
+    # Los workers comparten lo descargado durante SHARED_CACHE_TTL (o hasta que el
+    # watcher detecte cambios en el documento). Después, o si Sheets falla, se sirve
+    # el último dato bueno mientras se refresca (ver `config.resilience`). La respuesta
+    # informa la antigüedad de lo descargado en el header `Age`.
+    key = json.dumps([range_name, columns or [], start_row or 2])
+    df, created_at = get_or_compute_stale(
+        "sheets",
+        key,
+        lambda: fetch_sheet_data(range_name, columns, start_row),
+        SHARED_CACHE_TTL,
+    )
+    record_fetched_data(created_at)
+    return df
+
+
+def fetch_sheet_data(range_name: str, columns: list = None, start_row: int = None):
+    """
+    Descarga una hoja de Google Sheets, sin pasar por la caché compartida.
+
+    Args:
+        range_name (str): El nombre del cliente.
+        columns (list, opcional): Descargar solo estas columnas. Por defecto, todas.
+        start_row (int, opcional): Primera fila de datos a descargar. Por defecto, la 2.
+
+    Returns:
+        pd.DataFrame: Los datos de la hoja; un DataFrame vacío si no hay datos.
+    """
+    if columns:
+        df = get_projected_columns(range_name, columns, start_row or 2)
+        if df is not None:
+            return df
+
+    if start_row:
+        return get_google_sheets_rows(range_name, start_row).reset_index(drop=True)
+
+    spreadsheet_id, tab = resolve_client(range_name)
+    sheet = get_sheets_service()
     # Llamada a la API para obtener los datos de la hoja especificada
-    result = (
-        sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=range_name).execute()
+    # Por columnas: cada columna llega como una sola lista y no hay que completar cada fila
+    result = execute_request(
+        sheet.values().get(
+            spreadsheetId=spreadsheet_id,
+            range=quote_sheet_name(tab),
+            majorDimension="COLUMNS",
+        ),
+        "values.get",
     )
-    values = result.get("values", [])
+    columns = result.get("values", [])
+    # El encabezado es la fila 1, sin las celdas vacías del final
+    header = [values[0] if values else "" for values in columns]
+    while header and header[-1] == "":
+        header.pop()
     # Verifica si hay datos
-    if not values:
+    if not header:
         return pd.DataFrame()
-    max_columns = len(values[0])
-    normalized_values = [row + [""] * (max_columns - len(row)) for row in values]
-    df = pd.DataFrame(normalized_values[1:], columns=normalized_values[0])
+    return frame_from_columns(columns, header, skip=1)
+
+
+@timed_phase("sheet_fetch")
+def get_google_sheets_rows(sheet_name: str, start_row: int = 2):
+    """
+    Obtiene las filas de una hoja a partir de una fila dada, usando la fila 1 como encabezado.
+
+    Args:
+        sheet_name (str): El nombre de la hoja (cliente) a consultar.
+        start_row (int): Primera fila de datos a recuperar (la fila 1 es el encabezado).
+
+    Returns:
+        pd.DataFrame: Un DataFrame cuyo índice es el número de fila en la hoja.
+                      Retorna un DataFrame vacío si no hay encabezado o filas nuevas.
+    """
+    spreadsheet_id, tab = resolve_client(sheet_name)
+    sheet = get_sheets_service()
+    quoted = quote_sheet_name(tab)
+
+    # Primero el encabezado, para saber hasta qué columna pedir
+    header = execute_request(
+        sheet.values().get(spreadsheetId=spreadsheet_id, range=f"{quoted}!1:1"),
+        "values.get",
+    ).get("values", [[]])[0]
+    _header_cache[sheet_name] = header
+    if not header:
+        return pd.DataFrame()
+
+    last_column = column_letter(len(header))
+    result = execute_request(
+        sheet.values().get(
+            spreadsheetId=spreadsheet_id,
+            range=f"{quoted}!A{start_row}:{last_column}",
+            majorDimension="COLUMNS",
+        ),
+        "values.get",
+    )
+    df = frame_from_columns(result.get("values", []), header)
+    df.index = pd.RangeIndex(start_row, start_row + len(df))
+    return df
+
+
+@timed_phase("sheet_fetch")
+def get_sheet_chunk(
+    sheet_name: str, header: list, columns: list, first_row: int, last_row: int
+):
+    """
+    Descarga un bloque de filas de una hoja, por columnas.
+
+    Args:
+        sheet_name (str): El nombre de la hoja (cliente).
+        header (list): El encabezado de la hoja, para ubicar las columnas.
+        columns (list): Las columnas a descargar (todas las del encabezado o algunas).
+        first_row (int): Primera fila del bloque.
+        last_row (int): Última fila del bloque.
+
+    Returns:
+        pd.DataFrame: El bloque, con el número de fila en la hoja como índice; vacío si
+                      no hay datos en esas filas.
+    """
+    spreadsheet_id, tab = resolve_client(sheet_name)
+    quoted = quote_sheet_name(tab)
+
+    if list(columns) == list(header):
+        # Todas las columnas: un solo rango
+        result = execute_request(
+            get_sheets_service()
+            .values()
+            .get(
+                spreadsheetId=spreadsheet_id,
+                range=f"{quoted}!A{first_row}:{column_letter(len(header))}{last_row}",
+                majorDimension="COLUMNS",
+            ),
+            "values.get",
+        )
+        df = frame_from_columns(result.get("values", []), header)
+    else:
+        letters = [column_letter(header.index(column) + 1) for column in columns]
+        result = execute_request(
+            get_sheets_service()
+            .values()
+            .batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=[
+                    f"{quoted}!{letter}{first_row}:{letter}{last_row}"
+                    for letter in letters
+                ],
+                majorDimension="COLUMNS",
+            ),
+            "values.batchGet",
+        )
+        series = [
+            (value_range.get("values") or [[]])[0]
+            for value_range in result.get("valueRanges", [])
+        ]
+        df = frame_from_columns(series, columns)
+    df.index = pd.RangeIndex(first_row, first_row + len(df))
     return df
 
 
 def get_sheet_names():
     """
-    Recupera los nombres de todas las hojas (pestañas) visibles dentro de un documento de Google Sheets.
+    Recupera los nombres de todos los clientes: las hojas (pestañas) visibles de todos los
+    documentos del registro, más los clientes registrados de forma explícita. El listado
+    se reutiliza durante CLIENT_LOCATIONS_TTL segundos.
 
     Returns:
         list: Una lista de cadenas, cada una representando el nombre de una hoja visible (típicamente clientes).
     """
-    creds = service_account.Credentials.from_service_account_file(KEY, scopes=SCOPES)
-    service = build("sheets", "v4", credentials=creds)
-    sheet = service.spreadsheets()
-    # Llamada a la API para obtener las propiedades del documento
-    result = sheet.get(spreadsheetId=SPREADSHEET_ID).execute()
-    # Filtrar hojas que no están ocultas
-    sheet_names = [
-        sheet["properties"]["title"]
-        for sheet in result["sheets"]
-        if not sheet["properties"].get("hidden", False)
-    ]
-    return sheet_names
+    return list(get_client_locations())
+
+
+def get_clients_data(clients: list, fetch=None):
+    """
+    Descarga en paralelo las hojas de varios clientes.
+
+    Args:
+        clients (list): Los nombres de los clientes.
+        fetch (callable, opcional): La función de descarga. Por defecto `get_google_sheets_data`.
+
+    Returns:
+        dict: Un diccionario con el nombre del cliente como clave y su DataFrame como valor.
+    """
+    fetch = fetch or get_google_sheets_data
+    return dict(zip(clients, run_parallel(fetch, clients)))
 
 
 def load_video_links():
@@ -69,28 +767,23 @@ def load_video_links():
     Returns:
         dict: Un diccionario donde las claves son los IDs de video y los valores son los enlaces correspondientes.
     """
-    folder_path = "dataLinksVideos"  # Asegúrate de que esta ruta es correcta
-    video_links = {}
+    return get_csv_links().to_dict()
 
-    # Iterar sobre todos los archivos CSV en la carpeta
-    for file_name in os.listdir(folder_path):
-        if file_name.endswith(".csv"):
-            file_path = os.path.join(folder_path, file_name)
-            df = pd.read_csv(file_path)
 
-            # Recorrer cada fila del DataFrame y obtener el ID del video y su enlace
-            for _, row in df.iterrows():
-                # Convertir el valor de ID a string antes de aplicar strip()
-                video_id = str(row.get("ID", "")).strip()  # Convertir a string
-                # Convertir el valor de Link a string antes de aplicar strip()
-                link = str(row.get("Link", "")).strip()  # Convertir a string
+def get_video_links_dict():
+    """
+    Obtiene los enlaces de video de las exportaciones CSV y de Notion como un diccionario.
+    Para columnas completas de IDs es mejor `lookup_links`, que solo consulta Notion
+    si algún ID no está en los CSV.
 
-                # Guardar el enlace si el ID no es vacío
-                if video_id:
-                    video_links[video_id] = link
-    return video_links
+    Returns:
+        dict: Un diccionario con el 'ID' del video como clave y el 'Link' como valor.
+    """
+    return get_video_links()
 
 
+@uses_columns("UTM Content", "Stage")
+@timed_phase("preprocess")
 def preprocess_data(df, video_links=None):
     """
     Normaliza el contenido UTM, la etapa, extrae el ID del video y la leyenda del contenido UTM,
@@ -137,18 +830,11 @@ def preprocess_data(df, video_links=None):
         )
     )
 
-    # Cargar los links si no se pasan como argumento
+    # Asignar links basados en el Video ID; sin diccionario se buscan en bloque en el índice
     if video_links is None:
-        video_links = get_notion_data()
-        # Convertir la lista de diccionarios en un diccionario con el 'ID' como clave y el 'Link' como valor
-        video_links_dict = {
-            item["ID"]: item["Link"] for item in video_links if item["ID"]
-        }
+        df["Link"] = lookup_links(df["Video ID"])
     else:
-        video_links_dict = video_links
-
-    # Asignar links basados en el Video ID
-    df["Link"] = df["Video ID"].map(video_links_dict)
+        df["Link"] = df["Video ID"].map(video_links)
 
     # Reemplazar NaN o valores nulos en los links con "Sin enlace"
     df["Link"] = df["Link"].fillna("Sin enlace")
@@ -156,8 +842,10 @@ def preprocess_data(df, video_links=None):
     return df
 
 
+@uses_columns("UTM Content", "Stage")
+@timed_phase("aggregation")
 def analyze_closed_data(
-    df, video_links=None, stages_to_analyze=["CLOSED", "INSTALLED"]
+    df, video_links=None, stages_to_analyze=CLOSED_STAGES, preprocessed=False
 ):
     """
     Analiza los datos de cierres, contando los leads y cierres basados en las etapas especificadas.
@@ -166,11 +854,14 @@ def analyze_closed_data(
         df (pd.DataFrame): Un DataFrame que contiene el contenido UTM y datos de etapa.
         video_links (dict, opcional): Un diccionario de enlaces de video con el 'ID' como clave y el 'Link' como valor.
         stages_to_analyze (list): Una lista de etapas a analizar para los cierres (por defecto ["CLOSED", "INSTALLED"]).
+        preprocessed (bool): Si es True, `df` ya pasó por `preprocess_data` y no se vuelve a procesar.
 
     Returns:
         pd.DataFrame: Un DataFrame que contiene leads, cierres y las tasas de cierre calculadas.
     """
-    df = preprocess_data(df, video_links)
+    ANALYSIS_ROWS.labels("closed").observe(len(df))
+    if not preprocessed:
+        df = preprocess_data(df, video_links)
     df = df.copy()
 
     # Contar los leads
@@ -183,7 +874,20 @@ def analyze_closed_data(
         .size()
         .reset_index(name="Cierres")
     )
+    return summarize_closed(leads, cierres)
+
 
+def summarize_closed(leads, cierres):
+    """
+    Calcula las tasas de cierre a partir de los conteos por video.
+
+    Args:
+        leads (pd.DataFrame): 'Video ID', 'Leyenda', 'Link' y 'Leads'.
+        cierres (pd.DataFrame): 'Video ID', 'Leyenda', 'Link' y 'Cierres' (solo los videos con cierres).
+
+    Returns:
+        pd.DataFrame: Un DataFrame que contiene leads, cierres y las tasas de cierre calculadas.
+    """
     # Unir los leads y cierres en un solo DataFrame
     analysis_df = pd.merge(
         leads, cierres, on=["Video ID", "Leyenda", "Link"], how="left"
@@ -211,18 +915,13 @@ def analyze_closed_data(
     return analysis_df
 
 
+@uses_columns("UTM Content", "Stage")
+@timed_phase("aggregation")
 def analyze_appointments_data(
     df,
     video_links=None,
-    stages_to_analyze=[
-        "CLOSED",
-        "INSTALLED",
-        "SHOWED (NOT CLOSED)",
-        "SHOWED (NOT QUALIFIED)",
-        "NO SHOW (RE-SCHEDULE)",
-        "APPOINTMENT BOOKED",
-        "APPOINTMENT CANCEL",
-    ],
+    stages_to_analyze=APPOINTMENT_STAGES,
+    preprocessed=False,
 ):
     """
     Analiza los datos de citas, contando leads y citas basadas en las etapas especificadas.
@@ -231,11 +930,14 @@ def analyze_appointments_data(
         df (pd.DataFrame): Un DataFrame que contiene el contenido UTM y los datos de etapa.
         video_links (dict, opcional): Un diccionario de enlaces de video con el 'ID' como clave y el 'Link' como valor.
         stages_to_analyze (list): Una lista de etapas a analizar para las citas (por defecto incluye varias etapas).
+        preprocessed (bool): Si es True, `df` ya pasó por `preprocess_data` y no se vuelve a procesar.
 
     Returns:
         pd.DataFrame: Un DataFrame que contiene leads, citas y las tasas de citas calculadas.
     """
-    df = preprocess_data(df, video_links)
+    ANALYSIS_ROWS.labels("appointments").observe(len(df))
+    if not preprocessed:
+        df = preprocess_data(df, video_links)
     df = df.copy()
 
     # Contar los leads
@@ -248,7 +950,20 @@ def analyze_appointments_data(
         .size()
         .reset_index(name="Citas")
     )
+    return summarize_appointments(leads, citas)
+
+
+def summarize_appointments(leads, citas):
+    """
+    Calcula las tasas de citas a partir de los conteos por video.
+
+    Args:
+        leads (pd.DataFrame): 'Video ID', 'Leyenda', 'Link' y 'Leads'.
+        citas (pd.DataFrame): 'Video ID', 'Leyenda', 'Link' y 'Citas' (solo los videos con citas).
 
+    Returns:
+        pd.DataFrame: Un DataFrame que contiene leads, citas y las tasas de citas calculadas.
+    """
     # Unir los leads y citas en un solo DataFrame
     analysis_df = pd.merge(leads, citas, on=["Video ID", "Leyenda", "Link"], how="left")
     analysis_df["Citas"] = analysis_df["Citas"].fillna(0)
@@ -272,23 +987,41 @@ def analyze_appointments_data(
     return analysis_df
 
 
-def analyze_quality_distribution(df):
+@uses_columns("UTM Content", "Stage")
+@timed_phase("aggregation")
+def analyze_quality_distribution(df, preprocessed=False):
     """
     Analiza la distribución de calidad por etapa para todos los videos de un cliente.
 
     Args:
         df (pd.DataFrame): Un DataFrame que contiene el contenido UTM, la etapa y el ID del video.
+        preprocessed (bool): Si es True, `df` ya pasó por `preprocess_data` y no se vuelve a procesar.
 
     Returns:
         pd.DataFrame: Un DataFrame que muestra la distribución de calidad para cada Video ID,
                       con todas las etapas posibles y sus respectivos valores en el formato "Numero de Leads, Porcentaje".
     """
-    df = preprocess_data(df)
+    ANALYSIS_ROWS.labels("quality").observe(len(df))
+    if not preprocessed:
+        df = preprocess_data(df)
 
     # Contar el número de leads por Video ID y Stage
     leads_by_stage = (
         df.groupby(["Video ID", "Stage"]).size().reset_index(name="Numero de Leads")
     )
+    return summarize_quality(leads_by_stage)
+
+
+def summarize_quality(leads_by_stage):
+    """
+    Arma la distribución de calidad a partir de los conteos por video y etapa.
+
+    Args:
+        leads_by_stage (pd.DataFrame): 'Video ID', 'Stage' y 'Numero de Leads'.
+
+    Returns:
+        pd.DataFrame: La distribución de calidad para cada Video ID (ver `analyze_quality_distribution`).
+    """
 
     # Calcular el porcentaje de leads por Stage dentro de cada Video ID
     total_leads_by_video = (
@@ -323,6 +1056,7 @@ def analyze_quality_distribution(df):
     return pivot_df
 
 
+@timed_phase("aggregation")
 def analyze_general_video_performance(start_date=None, end_date=None):
     """
     Analiza el rendimiento general de los videos de todos los clientes con un filtro opcional por rango de fechas.
@@ -337,19 +1071,33 @@ def analyze_general_video_performance(start_date=None, end_date=None):
     clients = get_sheet_names()
     final_df = pd.DataFrame()
 
-    # Cargar los enlaces de video solo una vez
-    video_links = get_notion_data()
-    video_links_dict = {item["ID"]: item["Link"] for item in video_links if item["ID"]}
+    # Solo las columnas que usan el filtro y los análisis
+    columns = required_columns(
+        filter_by_date, analyze_closed_data, analyze_appointments_data
+    )
+    fetch = partial(
+        get_google_sheets_data,
+        columns=columns,
+        since=window_start(start_date, end_date),
+    )
+
+    clients_data = get_clients_data(clients, fetch)
 
-    for client in clients:
-        df = get_google_sheets_data(client)
+    # Hojas grandes: el procesamiento por cliente corre en el pool de procesos
+    frames = [df for df in clients_data.values() if not df.empty]
+    if use_process_pool(sum(len(df) for df in frames)):
+        counts = map_frames(video_counts, frames, start_date, end_date)
+        return _general_from_counts(counts)
+
+    for client, df in clients_data.items():
         if not df.empty:
             # Aplicar el filtro de fechas
             df = filter_by_date(df, start_date, end_date)
 
-            # Analizar los cierres y citas, pasando los links
-            closed_df = analyze_closed_data(df, video_links_dict)
-            appointments_df = analyze_appointments_data(df, video_links_dict)
+            # Analizar los cierres y citas sobre la misma hoja ya procesada
+            df = preprocess_data(df)
+            closed_df = analyze_closed_data(df, preprocessed=True)
+            appointments_df = analyze_appointments_data(df, preprocessed=True)
 
             # Unir los leads, cierres y citas en un solo DataFrame por cliente
             combined_df = pd.merge(
@@ -378,6 +1126,72 @@ def analyze_general_video_performance(start_date=None, end_date=None):
     return sorted_df
 
 
+@uses_columns("UTM Content", "Stage", "Created at (fecha)")
+def video_counts(df, start_date=None, end_date=None):
+    """
+    Cuenta los leads, citas y cierres de un cliente por video y leyenda, sin buscar los
+    enlaces. Corre en los procesos del pool (ver `config.process_pool`).
+
+    Args:
+        df (pd.DataFrame): Los leads de un cliente.
+        start_date (str, opcional): Fecha de inicio en formato YYYY-MM-DD.
+        end_date (str, opcional): Fecha de fin en formato YYYY-MM-DD.
+
+    Returns:
+        pd.DataFrame: 'Leads', 'Citas' y 'Cierres' indexados por ('Video ID', 'Leyenda').
+    """
+    df = preprocess_data(filter_by_date(df, start_date, end_date), video_links={})
+    counts = pd.DataFrame(
+        {
+            "Video ID": df["Video ID"],
+            "Leyenda": df["Leyenda"],
+            "Leads": 1,
+            "Citas": df["Stage"].isin(APPOINTMENT_STAGES).astype(int),
+            "Cierres": df["Stage"].isin(CLOSED_STAGES).astype(int),
+        }
+    )
+    return counts.groupby(["Video ID", "Leyenda"]).sum()
+
+
+def _general_from_counts(counts_list: list):
+    """
+    Suma los conteos por cliente de `video_counts` y agrega los enlaces, con el mismo
+    resultado que `analyze_general_video_performance`.
+    """
+    totals = pd.concat(counts_list).groupby(level=["Video ID", "Leyenda"]).sum()
+    totals = totals.reset_index()
+    totals.insert(2, "Link", lookup_links(totals["Video ID"]).fillna("Sin enlace"))
+    grouped_df = pd.DataFrame(
+        {
+            "Video ID": totals["Video ID"],
+            "Leyenda": totals["Leyenda"],
+            "Link": totals["Link"],
+            "Leads_Totales": totals["Leads"],
+            # Como en el cálculo por cliente, citas y cierres quedan como float
+            "Citas_Totales": totals["Citas"].astype(float),
+            "Cierres_Totales": totals["Cierres"].astype(float),
+        }
+    )
+    return grouped_df.sort_values(by="Leads_Totales", ascending=False)
+
+
+def window_start(start_date=None, end_date=None):
+    """
+    Devuelve la fecha más antigua que puede dejar pasar `filter_by_date`.
+
+    Args:
+        start_date (str, opcional): Fecha de inicio del filtro. Formato YYYY-MM-DD.
+        end_date (str, opcional): Fecha de fin del filtro. Formato YYYY-MM-DD.
+
+    Returns:
+        str: La fecha, o None si no hay filtro (se necesitan todas las filas).
+    """
+    dates = [date for date in (start_date, end_date) if date]
+    return min(dates, key=pd.to_datetime) if dates else None
+
+
+@uses_columns("Created at (fecha)")
+@timed_phase("date_filter")
 def filter_by_date(df, start_date=None, end_date=None):
     """
     Filtra el DataFrame por un rango de fechas opcional.
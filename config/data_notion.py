@@ -1,11 +1,25 @@
-from notion_client import Client
+from config.metrics import track_upstream
+from config.quota import acquire
+from config.resilience import guarded
 import os
 import json
 
-NOTION_TOKEN = os.getenv("NOTION_TOKEN")
+# Cliente de Notion; se construye en el primer uso (ver `get_notion_client`)
+notion = None
 
-# Inicializa el cliente de Notion
-notion = Client(auth=NOTION_TOKEN)
+
+def get_notion_client():
+    """
+    Devuelve el cliente de Notion, construyéndolo la primera vez. La librería se
+    importa aquí para no cargarla al arrancar la API, y el token se lee en ese momento
+    para tomar también el definido en el archivo .env.
+    """
+    global notion
+    if notion is None:
+        from notion_client import Client
+
+        notion = Client(auth=os.getenv("NOTION_TOKEN"))
+    return notion
 
 
 def list_databases():
@@ -15,18 +29,26 @@ def list_databases():
     """
     databases_list = []
     try:
-        databases = notion.search(filter={"property": "object", "value": "database"})
+        with guarded("notion"):
+            acquire("notion")
+            with track_upstream("notion", "search"):
+                databases = get_notion_client().search(
+                    filter={"property": "object", "value": "database"}
+                )
         for result in databases["results"]:
             title = result["title"][0]["plain_text"]
             databases_list.append((title, result["id"]))
     except Exception as e:
+        # Se propaga: un catálogo incompleto reemplazaría al último bueno
         print(f"Error buscando databases: {e}")
+        raise
     return databases_list
 
 
 def get_notion_data():
     """
     Función para obtener los campos ID y Link de todas las bases de datos de Notion.
+    Si alguna consulta falla se lanza la excepción en vez de devolver datos parciales.
     """
     data = []
     databases = list_databases()
@@ -38,9 +60,12 @@ def get_notion_data():
         while has_more:
             try:
                 # Realiza la consulta con el cursor si es necesario
-                response = notion.databases.query(
-                    database_id=database_id, start_cursor=next_cursor
-                )
+                with guarded("notion"):
+                    acquire("notion")
+                    with track_upstream("notion", "databases.query"):
+                        response = get_notion_client().databases.query(
+                            database_id=database_id, start_cursor=next_cursor
+                        )
 
                 # Extraer los resultados
                 for item in response.get("results", []):
@@ -73,7 +98,7 @@ def get_notion_data():
 
             except Exception as e:
                 print(f"Error consultando Notion para la base de datos {title}: {e}")
-                has_more = False
+                raise
 
     return data
 
@@ -0,0 +1,180 @@
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from contextlib import contextmanager
+from functools import wraps
+import importlib
+import os
+import time
+
+# Métricas de Prometheus de la API. Con varios workers de uvicorn se debe definir
+# PROMETHEUS_MULTIPROC_DIR para que /metrics sume los valores de todos los procesos.
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta y estado",
+    ["method", "route", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latencia de las llamadas a servicios externos (Sheets, Drive, Notion, Slack)",
+    ["upstream", "operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total",
+    "Errores en las llamadas a servicios externos",
+    ["upstream", "operation"],
+)
+ANALYSIS_ROWS = Histogram(
+    "analysis_rows_processed",
+    "Filas procesadas por cada ejecución de un análisis",
+    ["analysis"],
+    buckets=(10, 100, 1_000, 10_000, 100_000, 1_000_000),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Consultas a las cachés internas por resultado (hit/miss)",
+    ["cache", "result"],
+)
+JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Duración de los trabajos programados",
+    ["job"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+JOB_FAILURES = Counter(
+    "scheduler_job_failures_total",
+    "Trabajos programados que terminaron con error",
+    ["job"],
+)
+QUOTA_WAIT = Histogram(
+    "upstream_quota_wait_seconds",
+    "Tiempo de espera por cupo antes de llamar a un servicio externo",
+    ["upstream", "priority"],
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30),
+)
+QUOTA_TIMEOUTS = Counter(
+    "upstream_quota_timeouts_total",
+    "Llamadas que salieron sin cupo tras la espera máxima",
+    ["upstream", "priority"],
+)
+CIRCUIT_STATE = Gauge(
+    "upstream_circuit_state",
+    "Estado del circuit breaker de cada servicio externo (0 cerrado, 1 semiabierto, 2 abierto)",
+    ["upstream"],
+    multiprocess_mode="max",
+)
+STALE_SERVED = Counter(
+    "stale_data_served_total",
+    "Datos vencidos servidos desde la caché compartida, por motivo (revalidate/fallback)",
+    ["cache", "reason"],
+)
+STARTUP_SECONDS = Gauge(
+    "startup_phase_duration_seconds",
+    "Duración de las fases de arranque del worker (importación y precalentamiento)",
+    ["phase"],
+    multiprocess_mode="max",
+)
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Mide la latencia de una llamada a un servicio externo y cuenta sus errores.
+
+    Args:
+        upstream (str): El servicio externo ('sheets', 'drive', 'notion' o 'slack').
+        operation (str): La operación llamada, por ejemplo 'values.get'.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(upstream, operation).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream, operation).observe(
+            time.perf_counter() - start
+        )
+
+
+def record_cache(cache: str, hit: bool):
+    """
+    Registra una consulta a una caché interna para calcular su tasa de aciertos.
+
+    Args:
+        cache (str): El nombre de la caché.
+        hit (bool): True si el valor estaba en caché.
+    """
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def timed_job(name: str, func):
+    """
+    Envuelve un trabajo programado para medir su duración y contar sus fallos. Sus
+    llamadas externas tienen prioridad de segundo plano (ver `config.quota`).
+
+    Args:
+        name (str): El nombre del trabajo en las métricas.
+        func (callable | str): La función del trabajo, o su referencia "modulo:funcion";
+            con una referencia el módulo se importa recién en la primera ejecución.
+
+    Returns:
+        callable: La función envuelta.
+    """
+    if isinstance(func, str):
+        reference = func
+
+        def func(*args, **kwargs):
+            module_name, _, attribute = reference.partition(":")
+            job = getattr(importlib.import_module(module_name), attribute)
+            return job(*args, **kwargs)
+
+        func.__name__ = reference.partition(":")[2]
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # Importación diferida: config.quota importa este módulo
+        from config.quota import background_priority
+
+        start = time.perf_counter()
+        try:
+            # Los trabajos programados usan la cuota externa con prioridad baja
+            with background_priority():
+                return func(*args, **kwargs)
+        except Exception:
+            JOB_FAILURES.labels(name).inc()
+            raise
+        finally:
+            JOB_DURATION.labels(name).observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def render_metrics():
+    """
+    Genera el texto de exposición de Prometheus con todas las métricas.
+
+    Returns:
+        tuple: El contenido (bytes) y su tipo de contenido.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
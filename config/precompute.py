@@ -0,0 +1,216 @@
+from datetime import date, datetime, timedelta, timezone
+import json
+import os
+import time
+import pandas as pd
+from config.data import (
+    analyze_appointments_data,
+    analyze_closed_data,
+    analyze_quality_distribution,
+    filter_by_date,
+    get_google_sheets_data,
+    get_sheet_names,
+    preprocess_data,
+    required_columns,
+    run_parallel,
+)
+from config.ranking import get_video_performance_page
+from config.shared_cache import get, put, try_exclusive
+
+# Precálculo de las consultas más comunes del dashboard: cierres, citas y calidad de
+# cada cliente, y el rendimiento general de los videos, para ayer y los últimos 7 y
+# 30 días. Los resultados se guardan ya serializados en la caché compartida y las
+# rutas los sirven si la consulta coincide exactamente con una de estas ventanas.
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "0") == "1"
+PRECOMPUTE_INTERVAL_MINUTES = int(os.getenv("PRECOMPUTE_INTERVAL_MINUTES", "15"))
+# Antigüedad máxima de un resultado precalculado, en segundos
+PRECOMPUTE_TTL = int(os.getenv("PRECOMPUTE_TTL", "3600"))
+
+# Días que abarca cada ventana, terminando ayer
+PRECOMPUTE_WINDOWS = {"yesterday": 1, "last_7_days": 7, "last_30_days": 30}
+
+# Análisis por cliente, con el nombre que usan las llaves de la caché
+CLIENT_ANALYSES = {
+    "closed": analyze_closed_data,
+    "appointments": analyze_appointments_data,
+    "quality": analyze_quality_distribution,
+}
+
+NAMESPACE = "precomputed"
+
+
+def window_ranges(today: date = None):
+    """
+    Calcula las fechas de inicio y fin de cada ventana precalculada.
+
+    Args:
+        today (date, opcional): El día de referencia. Por defecto, hoy.
+
+    Returns:
+        dict: Nombre de la ventana -> (fecha de inicio, fecha de fin) en formato YYYY-MM-DD.
+    """
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    return {
+        name: ((today - timedelta(days=days)).isoformat(), yesterday.isoformat())
+        for name, days in PRECOMPUTE_WINDOWS.items()
+    }
+
+
+def normalize_range(start_date=None, end_date=None):
+    """
+    Lleva un rango de fechas de una consulta a la forma en que se guardan los precálculos,
+    con la misma interpretación que `filter_by_date`.
+
+    Returns:
+        tuple: (inicio, fin) en formato YYYY-MM-DD, o None si la consulta no tiene fechas.
+    """
+    dates = [
+        pd.to_datetime(value).strftime("%Y-%m-%d")
+        for value in (start_date, end_date)
+        if value
+    ]
+    if not dates:
+        return None
+    return min(dates), max(dates)
+
+
+def _key(analysis: str, client: str, date_range: tuple):
+    return json.dumps([analysis, client, *date_range])
+
+
+def render_json(records):
+    """
+    Serializa igual que `JSONResponse`, para servir el resultado sin volver a convertirlo.
+    """
+    return json.dumps(
+        records, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def store_result(analysis: str, client: str, date_range: tuple, result_df):
+    """
+    Guarda un resultado ya serializado en la caché compartida.
+    """
+    records = result_df.to_dict(orient="records")
+    put(
+        NAMESPACE,
+        _key(analysis, client, date_range),
+        {"body": render_json(records), "rows": len(records)},
+    )
+
+
+def get_precomputed(analysis: str, client: str, start_date=None, end_date=None):
+    """
+    Busca el resultado precalculado de una consulta.
+
+    Args:
+        analysis (str): 'closed', 'appointments', 'quality' o 'general'.
+        client (str): El nombre del cliente ('*' para el rendimiento general).
+        start_date (str, opcional): Fecha de inicio de la consulta.
+        end_date (str, opcional): Fecha de fin de la consulta.
+
+    Returns:
+        tuple: El resultado ({'body': bytes JSON, 'rows': int}) y el momento en que se
+               calculó, o None si la consulta no coincide con un precálculo vigente.
+    """
+    if not PRECOMPUTE_ENABLED:
+        return None
+    date_range = normalize_range(start_date, end_date)
+    if date_range is None:
+        return None
+    return get(NAMESPACE, _key(analysis, client, date_range), PRECOMPUTE_TTL)
+
+
+def freshness_headers(computed_at: float):
+    """
+    Headers que indican cuándo se calculó un resultado servido desde el precálculo.
+
+    Args:
+        computed_at (float): El momento del cálculo (epoch en segundos).
+
+    Returns:
+        dict: 'X-Computed-At' (ISO 8601, UTC) y 'Age' (segundos desde el cálculo).
+    """
+    return {
+        "X-Computed-At": datetime.fromtimestamp(computed_at, timezone.utc).isoformat(),
+        "Age": str(max(0, int(time.time() - computed_at))),
+    }
+
+
+def precompute_client(client: str, today: date = None):
+    """
+    Precalcula los análisis de un cliente para todas las ventanas, con una sola descarga
+    de la hoja (la de la ventana más larga).
+
+    Args:
+        client (str): El nombre del cliente.
+        today (date, opcional): El día de referencia. Por defecto, hoy.
+    """
+    ranges = window_ranges(today)
+    columns = required_columns(filter_by_date, *CLIENT_ANALYSES.values())
+    oldest = min(start for start, _ in ranges.values())
+    df = get_google_sheets_data(client, columns=columns, since=oldest)
+    if df.empty:
+        return
+
+    # Se procesa una sola vez la hoja completa; las ventanas solo la filtran
+    df = preprocess_data(df)
+    for date_range in ranges.values():
+        window_df = filter_by_date(df, *date_range)
+        for analysis, func in CLIENT_ANALYSES.items():
+            store_result(
+                analysis, client, date_range, func(window_df, preprocessed=True)
+            )
+
+
+def precompute_general(today: date = None):
+    """
+    Precalcula el rendimiento general de los videos para todas las ventanas, con el
+    orden por defecto de la ruta (por leads) y sin paginar.
+
+    Args:
+        today (date, opcional): El día de referencia. Por defecto, hoy.
+    """
+    for date_range in window_ranges(today).values():
+        page_df, _ = get_video_performance_page(*date_range)
+        store_result("general", "*", date_range, page_df)
+
+
+def precompute_clients(clients: list, today: date = None):
+    """
+    Precalcula los análisis de varios clientes y el rendimiento general. Los errores
+    de un cliente no detienen a los demás.
+
+    Args:
+        clients (list): Los nombres de los clientes.
+        today (date, opcional): El día de referencia. Por defecto, hoy.
+    """
+
+    def run(client):
+        try:
+            precompute_client(client, today)
+        except Exception as e:
+            print(f"Error precalculando el cliente {client}: {e}")
+
+    run_parallel(run, clients)
+    try:
+        precompute_general(today)
+    except Exception as e:
+        print(f"Error precalculando el rendimiento general: {e}")
+
+
+def precompute_all():
+    """
+    Trabajo programado: precalcula las consultas de todos los clientes. Si otro worker
+    ya lo está haciendo, o lo hizo hace menos de medio intervalo, no hace nada.
+    """
+    with try_exclusive("precompute") as acquired:
+        if not acquired:
+            return
+        last_run = get(NAMESPACE, "last_run", ttl=PRECOMPUTE_INTERVAL_MINUTES * 30)
+        if last_run is not None:
+            return
+        start = time.perf_counter()
+        precompute_clients(get_sheet_names())
+        put(NAMESPACE, "last_run", time.perf_counter() - start)
@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import config.shared_cache
+from config.shared_cache import cache_dir_ready, publish, read, remove
+
+# Ejecución opcional en un pool de procesos del trabajo de pandas por cliente
+# (normalización de textos, expresiones regulares y groupby sobre columnas de texto),
+# que con hilos queda limitado por el GIL. Con ANALYSIS_PROCESS_POOL=N se usan N
+# procesos; con 0 (por defecto) todo sigue corriendo en el proceso de la API.
+#
+# Entrega de los datos: el DataFrame de cada cliente se publica en la caché compartida
+# (memoria en /dev/shm) con sus columnas de texto codificadas como diccionario
+# (categorías + códigos enteros). Los códigos viajan como buffers binarios que el
+# proceso lee con mmap sin copiarlos ni deserializarlos; solo las categorías (los
+# valores distintos) pasan por pickle. El proceso devuelve agregados compactos.
+ANALYSIS_PROCESS_POOL = int(os.getenv("ANALYSIS_PROCESS_POOL", "0"))
+# Filas mínimas para usar el pool: con menos, el envío cuesta más que lo que se gana
+ANALYSIS_POOL_MIN_ROWS = int(os.getenv("ANALYSIS_POOL_MIN_ROWS", "20000"))
+
+HANDOFF_NAMESPACE = "handoff"
+# Segundos que un proceso acepta un DataFrame publicado para él
+HANDOFF_TTL = 600
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(shared_cache_dir: str):
+    # Los procesos nuevos (spawn) leen la caché del mismo directorio que la API
+    config.shared_cache.SHARED_CACHE_DIR = shared_cache_dir
+
+
+def get_pool():
+    """
+    Devuelve el pool de procesos, creándolo la primera vez. Los procesos se inician con
+    'spawn': no heredan los hilos, bloqueos ni clientes HTTP del proceso de la API.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=ANALYSIS_PROCESS_POOL,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(config.shared_cache.SHARED_CACHE_DIR,),
+            )
+        return _pool
+
+
+def warm_pool():
+    """
+    Inicia los procesos del pool (y sus importaciones) antes de la primera petición.
+    """
+    if ANALYSIS_PROCESS_POOL:
+        pool = get_pool()
+        for future in [pool.submit(os.getpid) for _ in range(ANALYSIS_PROCESS_POOL)]:
+            future.result()
+
+
+def shutdown_pool():
+    """
+    Detiene el pool de procesos, si se creó.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def use_process_pool(rows: int):
+    """
+    Indica si conviene enviar `rows` filas al pool de procesos. Los datos se entregan por
+    la caché compartida, así que su directorio debe poder usarse.
+    """
+    return (
+        ANALYSIS_PROCESS_POOL > 0
+        and rows >= ANALYSIS_POOL_MIN_ROWS
+        and cache_dir_ready()
+    )
+
+
+def encode_frame(df):
+    """
+    Codifica como categorías las columnas de texto, para que viajen como enteros.
+    """
+    return df.astype(
+        {column: "category" for column in df.columns if df[column].dtype == object}
+    )
+
+
+def decode_frame(df):
+    """
+    Devuelve las columnas categóricas a texto, como las entrega `fetch_sheet_data`.
+    """
+    return df.astype(
+        {
+            column: object
+            for column in df.columns
+            if isinstance(df[column].dtype, pd.CategoricalDtype)
+        }
+    )
+
+
+def _run_handoff(func, key: str, args: tuple):
+    """
+    Corre en un proceso del pool: lee el DataFrame publicado y le aplica `func`.
+    """
+    handoff = read(HANDOFF_NAMESPACE, key, HANDOFF_TTL)
+    if handoff is None:
+        raise RuntimeError(f"No se encontró el DataFrame entregado al pool ({key})")
+    return func(decode_frame(handoff[0]), *args)
+
+
+def map_frames(func, frames: list, *args):
+    """
+    Aplica `func(df, *args)` a cada DataFrame en los procesos del pool.
+
+    Args:
+        func (callable): Una función de nivel de módulo (se referencia por nombre).
+        frames (list): Los DataFrames, uno por tarea.
+        *args: Argumentos adicionales de `func`; deben poder serializarse con pickle.
+
+    Returns:
+        list: Los resultados, en el mismo orden que `frames`.
+    """
+    pool = get_pool()
+    keys = []
+    try:
+        futures = []
+        for df in frames:
+            key = uuid.uuid4().hex
+            publish(HANDOFF_NAMESPACE, key, encode_frame(df))
+            keys.append(key)
+            futures.append(pool.submit(_run_handoff, func, key, args))
+        return [future.result() for future in futures]
+    finally:
+        for key in keys:
+            remove(HANDOFF_NAMESPACE, key)
+
+
+def run_in_pool(func, df, *args):
+    """
+    Aplica `func(df, *args)` en un proceso del pool y espera el resultado.
+    """
+    return map_frames(func, [df], *args)[0]
@@ -0,0 +1,185 @@
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pyinstrument import Profiler
+import itertools
+import json
+import os
+import re
+import secrets
+
+# Perfilado bajo demanda de los endpoints de análisis.
+# - `?profile=1` perfila una petición si PROFILING_ENABLED=1 o si el header
+#   X-Profile-Token coincide con PROFILING_TOKEN.
+# - PROFILE_SAMPLE_RATE=N perfila además 1 de cada N peticiones (0 = desactivado).
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Perfiles que se conservan en PROFILE_DIR; al guardar uno nuevo se borran los más viejos
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+# Intervalo de muestreo del perfilador en segundos
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+_profile_request = ContextVar("profile_request", default=None)
+_request_counter = itertools.count(1)
+
+
+def is_profiling_authorized(headers):
+    """
+    Indica si la petición puede pedir o consultar perfiles.
+
+    Args:
+        headers (Mapping): Los headers de la petición.
+
+    Returns:
+        bool: True si el perfilado está habilitado o el token de administrador es correcto.
+    """
+    if PROFILING_ENABLED:
+        return True
+    token = headers.get("x-profile-token")
+    return bool(PROFILING_TOKEN and token) and secrets.compare_digest(
+        token, PROFILING_TOKEN
+    )
+
+
+def start_profile_request(request):
+    """
+    Decide si la petición se va a perfilar y, si es así, lo marca para el handler.
+
+    Args:
+        request (Request): La petición entrante.
+
+    Returns:
+        dict: La información del perfil ('mode', 'path', 'id'), o None si no se perfila.
+    """
+    mode = None
+    if request.query_params.get("profile") == "1" and is_profiling_authorized(
+        request.headers
+    ):
+        mode = "on_demand"
+    elif PROFILE_SAMPLE_RATE and next(_request_counter) % PROFILE_SAMPLE_RATE == 0:
+        mode = "sampled"
+    if mode is None:
+        return None
+
+    info = {
+        "mode": mode,
+        "path": request.url.path,
+        "query": str(request.query_params),
+        "id": None,
+    }
+    _profile_request.set(info)
+    return info
+
+
+def save_profile(profiler, info):
+    """
+    Guarda el árbol de llamadas (texto) y la gráfica interactiva (HTML) de un perfil.
+
+    Args:
+        profiler (Profiler): El perfilador ya detenido.
+        info (dict): La información de la petición perfilada.
+
+    Returns:
+        str: El identificador del perfil.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = f"{datetime.now():%Y%m%dT%H%M%S}-{secrets.token_hex(4)}"
+    base = os.path.join(PROFILE_DIR, profile_id)
+
+    with open(f"{base}.html", "w", encoding="utf-8") as f:
+        f.write(profiler.output_html())
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write(profiler.output_text(unicode=True, color=False, show_all=False))
+
+    session = profiler.last_session
+    metadata = dict(
+        info,
+        id=profile_id,
+        duration_s=session.duration,
+        samples=session.sample_count,
+    )
+    with open(f"{base}.json", "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    prune_profiles()
+    return profile_id
+
+
+def prune_profiles(max_profiles: int = None):
+    """
+    Borra los perfiles más viejos de PROFILE_DIR hasta dejar `max_profiles`. Los
+    identificadores empiezan con la fecha, así que su orden es el de creación.
+
+    Args:
+        max_profiles (int, opcional): Perfiles a conservar. Por defecto, `PROFILE_MAX_FILES`.
+    """
+    if max_profiles is None:
+        max_profiles = PROFILE_MAX_FILES
+    names = {}
+    for entry in os.scandir(PROFILE_DIR):
+        profile_id = entry.name.rpartition(".")[0]
+        if PROFILE_ID_PATTERN.match(profile_id):
+            names.setdefault(profile_id, []).append(entry.path)
+
+    old_ids = sorted(names)[: max(len(names) - max_profiles, 0)]
+    for profile_id in old_ids:
+        for path in names[profile_id]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Otro worker lo borró al mismo tiempo
+                pass
+
+
+def profiled(func):
+    """
+    Decorador para los handlers: si la petición en curso se marcó para perfilar, ejecuta
+    el handler bajo el perfilador por muestreo y guarda el resultado.
+
+    Se aplica al handler (y no al middleware) porque los endpoints síncronos corren en
+    un hilo del threadpool, y el perfilador solo muestrea el hilo donde se inicia.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        info = _profile_request.get()
+        if info is None or info["id"] is not None:
+            return func(*args, **kwargs)
+
+        profiler = Profiler(interval=PROFILE_INTERVAL)
+        profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.stop()
+            try:
+                info["id"] = save_profile(profiler, info)
+            except OSError as e:
+                print(f"Error guardando el perfil: {e}")
+
+    return wrapper
+
+
+def read_profile(profile_id: str, extension: str):
+    """
+    Lee un perfil guardado.
+
+    Args:
+        profile_id (str): El identificador del perfil.
+        extension (str): 'html', 'txt' o 'json'.
+
+    Returns:
+        str: El contenido del archivo, o None si no existe o el identificador no es válido.
+    """
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    try:
+        with open(
+            os.path.join(PROFILE_DIR, f"{profile_id}.{extension}"), encoding="utf-8"
+        ) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
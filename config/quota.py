@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config.metrics import QUOTA_TIMEOUTS, QUOTA_WAIT
+from config.shared_cache import SHARED_CACHE_DIR, cache_dir_ready
+
+try:
+    import fcntl
+except ImportError:  # Windows: el cupo se comparte solo entre hilos del mismo worker
+    fcntl = None
+
+# Regulador de cuota de los servicios externos: un token bucket por servicio, guardado
+# en un archivo con bloqueo (fcntl) para que lo compartan todos los hilos y workers de
+# la máquina. Cada llamada toma un token antes de salir.
+#
+# Prioridades: las peticiones de la API son interactivas; los trabajos programados,
+# el vigilante y el precálculo corren en segundo plano. El segundo plano deja libre una
+# reserva del bucket y cede mientras haya peticiones interactivas esperando.
+QUOTA_ENABLED = os.getenv("QUOTA_ENABLED", "1") == "1"
+QUOTA_DIR = os.getenv("QUOTA_DIR", os.path.join(SHARED_CACHE_DIR, "quota"))
+# Google Sheets: lecturas por minuto por usuario, y cuántas pueden salir de golpe
+SHEETS_QUOTA_PER_MINUTE = int(os.getenv("SHEETS_QUOTA_PER_MINUTE", "60"))
+SHEETS_QUOTA_BURST = int(os.getenv("SHEETS_QUOTA_BURST", "10"))
+# Notion: promedio de peticiones por segundo
+NOTION_QUOTA_PER_SECOND = float(os.getenv("NOTION_QUOTA_PER_SECOND", "3"))
+# Fracción del bucket que el segundo plano no puede usar
+QUOTA_BACKGROUND_RESERVE = float(os.getenv("QUOTA_BACKGROUND_RESERVE", "0.3"))
+# Espera máxima por un token; después la llamada no sale y falla con `QuotaExhausted`
+# (503 en la API, o el último dato bueno si lo hay). El segundo plano puede esperar más.
+QUOTA_MAX_WAIT = float(os.getenv("QUOTA_MAX_WAIT", "30"))
+QUOTA_BACKGROUND_MAX_WAIT = float(os.getenv("QUOTA_BACKGROUND_MAX_WAIT", "300"))
+# Tokens que cada worker toma juntos del bucket compartido, para no abrir y bloquear el
+# archivo en cada llamada. Los que no use en QUOTA_BATCH_TTL segundos se devuelven.
+QUOTA_BATCH = int(os.getenv("QUOTA_BATCH", "4"))
+QUOTA_BATCH_TTL = float(os.getenv("QUOTA_BATCH_TTL", "1"))
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Servicio -> (tokens por segundo, capacidad). Para Sheets la recarga descuenta la
+# ráfaga, así en cualquier minuto no salen más de SHEETS_QUOTA_PER_MINUTE lecturas.
+QUOTAS = {
+    "sheets": (
+        max(SHEETS_QUOTA_PER_MINUTE - SHEETS_QUOTA_BURST, 1) / 60,
+        SHEETS_QUOTA_BURST,
+    ),
+    "notion": (NOTION_QUOTA_PER_SECOND, NOTION_QUOTA_PER_SECOND),
+}
+
+_priority = ContextVar("upstream_priority", default=INTERACTIVE)
+_thread_locks = {upstream: threading.Lock() for upstream in QUOTAS}
+# Tokens ya tomados por este worker: (servicio, prioridad) -> [tokens, vencimiento]
+_local_tokens = {}
+_local_lock = threading.Lock()
+
+
+@contextmanager
+def background_priority():
+    """
+    Marca las llamadas externas del bloque (y de los hilos que hereden el contexto)
+    como trabajo en segundo plano.
+    """
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    """
+    Devuelve la prioridad del contexto actual: 'interactive' o 'background'.
+    """
+    return _priority.get()
+
+
+@contextmanager
+def _bucket_state(upstream: str):
+    """
+    Abre el estado del bucket de un servicio con bloqueo exclusivo y lo guarda al salir.
+    """
+    with _thread_locks[upstream]:
+        # Crear antes el directorio de la caché, privado, si la cuota vive dentro de él
+        cache_dir_ready()
+        os.makedirs(QUOTA_DIR, mode=0o700, exist_ok=True)
+        with open(os.path.join(QUOTA_DIR, f"{upstream}.json"), "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except json.JSONDecodeError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _take_local(upstream: str, priority: str):
+    """
+    Toma un token de los que este worker ya sacó del bucket, si le quedan vigentes.
+    """
+    with _local_lock:
+        reserve = _local_tokens.get((upstream, priority))
+        if reserve and reserve[0] >= 1 and reserve[1] > time.monotonic():
+            reserve[0] -= 1
+            return True
+        return False
+
+
+def _try_take(upstream: str, priority: str):
+    """
+    Intenta tomar un token del bucket, y hasta `QUOTA_BATCH` - 1 más para las próximas
+    llamadas de este worker si sobran.
+
+    Returns:
+        float: 0 si se tomó el token; si no, los segundos sugeridos antes de reintentar.
+    """
+    rate, capacity = QUOTAS[upstream]
+    # Los tokens locales vencidos vuelven al bucket
+    with _local_lock:
+        reserve = _local_tokens.pop((upstream, priority), None)
+    leftover = reserve[0] if reserve else 0
+
+    with _bucket_state(upstream) as state:
+        now = time.time()
+        tokens = state.get("tokens", capacity) + leftover
+        elapsed = max(now - state.get("updated", now), 0)
+        tokens = min(capacity, tokens + elapsed * rate)
+        state["updated"] = now
+
+        if priority == INTERACTIVE:
+            needed = 1
+        else:
+            # El segundo plano cede mientras haya interactivas esperando
+            if state.get("interactive_waiting_until", 0) > now:
+                state["tokens"] = tokens
+                return max(1 / rate, 0.05)
+            needed = 1 + capacity * QUOTA_BACKGROUND_RESERVE
+
+        if tokens >= needed:
+            taken = 1 + max(min(QUOTA_BATCH - 1, int(tokens - needed)), 0)
+            state["tokens"] = tokens - taken
+            if taken > 1:
+                with _local_lock:
+                    reserve = _local_tokens.setdefault((upstream, priority), [0, 0])
+                    reserve[0] += taken - 1
+                    reserve[1] = time.monotonic() + QUOTA_BATCH_TTL
+            return 0
+
+        state["tokens"] = tokens
+        if priority == INTERACTIVE:
+            state["interactive_waiting_until"] = now + max(2 / rate, 1)
+        return (needed - tokens) / rate
+
+
+def acquire(upstream: str, priority: str = None):
+    """
+    Espera hasta que haya cupo para una llamada al servicio. Los servicios sin cuota
+    configurada no esperan.
+
+    Args:
+        upstream (str): El servicio externo ('sheets', 'notion', ...).
+        priority (str, opcional): 'interactive' o 'background'. Por defecto, la del contexto.
+
+    Returns:
+        float: Los segundos que se esperó.
+
+    Raises:
+        QuotaExhausted: Si no hubo cupo en `QUOTA_MAX_WAIT` segundos
+            (`QUOTA_BACKGROUND_MAX_WAIT` en segundo plano).
+    """
+    if not QUOTA_ENABLED or upstream not in QUOTAS:
+        return 0.0
+    priority = priority or _priority.get()
+    max_wait = QUOTA_MAX_WAIT if priority == INTERACTIVE else QUOTA_BACKGROUND_MAX_WAIT
+    start = time.perf_counter()
+    while not _take_local(upstream, priority):
+        try:
+            wait = _try_take(upstream, priority)
+        except OSError as e:
+            # Sin estado compartido no se regula, pero la llamada no falla
+            print(f"Error leyendo la cuota de {upstream}: {e}")
+            break
+        if wait == 0:
+            break
+        waited = time.perf_counter() - start
+        if waited >= max_wait:
+            QUOTA_TIMEOUTS.labels(upstream, priority).inc()
+            QUOTA_WAIT.labels(upstream, priority).observe(waited)
+            # Importación diferida: config.resilience importa este módulo
+            from config.resilience import QuotaExhausted
+
+            raise QuotaExhausted(upstream, max(wait, 1))
+        time.sleep(min(wait, 0.5, max_wait - waited))
+
+    waited = time.perf_counter() - start
+    QUOTA_WAIT.labels(upstream, priority).observe(waited)
+    return waited
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config.data import analyze_general_video_performance
+from config.metrics import record_cache
+from config.resilience import track_stale
+from config.shared_cache import get_generation
+
+# Criterios de orden aceptados por /data/general/video-performance
+SORT_OPTIONS = (
+    "leads",
+    "appointments",
+    "closes",
+    "appointment_rate",
+    "close_rate",
+)
+
+# Segundos que un índice de ranking se considera vigente si no hubo cambios en los datos.
+# Los cambios se detectan con la generación del espacio 'sheets' de la caché compartida,
+# que el vigilante cambia en todos los workers al invalidar las hojas.
+RANKING_TTL = int(os.getenv("RANKING_TTL", "300"))
+# Rangos de fechas distintos que se mantienen en memoria; se descartan los menos usados
+RANKING_MAX_RANGES = int(os.getenv("RANKING_MAX_RANGES", "32"))
+
+# Índices por rango de fechas (del menos al más usado): resultado agrupado + órdenes
+# parciales por criterio
+_ranking_index = OrderedDict()
+_build_locks = {}
+_locks_guard = threading.Lock()
+_data_version = {"value": 0}
+
+
+def mark_data_changed():
+    """
+    Invalida los índices de ranking de este worker. Se llama cuando se detectan cambios
+    en las hojas; los demás workers los invalidan al cambiar la generación de 'sheets'.
+    """
+    _data_version["value"] += 1
+
+
+def sort_values(df, sort_by: str, suffix: str = ""):
+    """
+    Devuelve el arreglo numérico por el que se ordena el ranking.
+
+    Args:
+        df (pd.DataFrame): El rendimiento con 'Leads_Totales', 'Citas_Totales' y 'Cierres_Totales'.
+        sort_by (str): Criterio de orden, uno de `SORT_OPTIONS`.
+        suffix (str): Sufijo de las columnas (por ejemplo '_7d' en las tablas por ventana).
+    """
+    leads = df[f"Leads_Totales{suffix}"].to_numpy(dtype=float)
+    if sort_by == "leads":
+        return leads
+    if sort_by == "appointments":
+        return df[f"Citas_Totales{suffix}"].to_numpy(dtype=float)
+    if sort_by == "closes":
+        return df[f"Cierres_Totales{suffix}"].to_numpy(dtype=float)
+
+    column = "Citas_Totales" if sort_by == "appointment_rate" else "Cierres_Totales"
+    values = df[f"{column}{suffix}"].to_numpy(dtype=float)
+    return np.divide(values, leads, out=np.zeros_like(values), where=leads > 0)
+
+
+def top_k_order(values, k: int = None):
+    """
+    Calcula las posiciones de los `k` valores más altos, de mayor a menor.
+    Usa selección parcial (argpartition) en lugar de ordenar todo el arreglo.
+
+    Args:
+        values (np.ndarray): Los valores a ordenar.
+        k (int, opcional): Cuántas posiciones devolver. Por defecto, todas.
+
+    Returns:
+        np.ndarray: Las posiciones ordenadas; los empates conservan el orden original.
+    """
+    n = len(values)
+    if k is None or k >= n:
+        candidates = np.arange(n)
+    elif k <= 0:
+        return np.array([], dtype=int)
+    else:
+        candidates = np.argpartition(-values, k - 1)[:k]
+        # Incluir los empates con el k-ésimo valor para que el desempate sea estable
+        threshold = values[candidates].min()
+        candidates = np.flatnonzero(values >= threshold)
+    order = candidates[np.lexsort((candidates, -values[candidates]))]
+    return order if k is None else order[:k]
+
+
+def _normalize_date(value):
+    """
+    Normaliza una fecha de la consulta a YYYY-MM-DD, para que '2024-8-1' y '2024-08-01'
+    compartan índice. Los valores que no son fechas se devuelven sin cambios.
+    """
+    if not value:
+        return None
+    try:
+        return pd.Timestamp(value).strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        return value
+
+
+def _get_index(start_date, end_date):
+    """
+    Devuelve el índice de ranking vigente para el rango, construyéndolo si hace falta.
+    Una sola construcción por rango a la vez; las demás peticiones esperan su resultado.
+    """
+    key = (_normalize_date(start_date), _normalize_date(end_date))
+    version = _current_version()
+    with _locks_guard:
+        index = _ranking_index.get(key)
+        if _is_fresh(index, version):
+            _ranking_index.move_to_end(key)
+            record_cache("ranking_index", True)
+            return index
+        lock = _build_locks.setdefault(key, threading.Lock())
+
+    with lock:
+        index = _ranking_index.get(key)
+        if _is_fresh(index, _current_version()):
+            record_cache("ranking_index", True)
+            return index
+        record_cache("ranking_index", False)
+
+        version = _current_version()
+        with track_stale() as stale:
+            df = analyze_general_video_performance(*key)
+        index = {
+            "df": df.reset_index(drop=True),
+            "version": version,
+            "built_at": time.monotonic(),
+            "orders": {},
+        }
+        # Construido con hojas vencidas (mientras se refrescan): no se guarda, para
+        # reconstruirlo con los datos nuevos en cuanto lleguen
+        if stale:
+            return index
+        with _locks_guard:
+            _ranking_index[key] = index
+            _evict()
+        return index
+
+
+def _evict():
+    """
+    Descarta los índices vencidos y los menos usados por encima de `RANKING_MAX_RANGES`,
+    junto con sus bloqueos. Se llama con `_locks_guard` tomado.
+    """
+    version = _current_version()
+    stale = [
+        key for key, index in _ranking_index.items() if not _is_fresh(index, version)
+    ]
+    for key in stale:
+        del _ranking_index[key]
+    while len(_ranking_index) > RANKING_MAX_RANGES:
+        _ranking_index.popitem(last=False)
+    for key in [key for key in _build_locks if key not in _ranking_index]:
+        if not _build_locks[key].locked():
+            del _build_locks[key]
+
+
+def _current_version():
+    return (_data_version["value"], get_generation("sheets"))
+
+
+def _is_fresh(index, version):
+    return (
+        index is not None
+        and index["version"] == version
+        and time.monotonic() - index["built_at"] < RANKING_TTL
+    )
+
+
+def get_video_performance_page(
+    start_date=None, end_date=None, sort_by="leads", limit=None, offset=0
+):
+    """
+    Devuelve una página del ranking de rendimiento general de los videos.
+
+    Args:
+        start_date (str, opcional): Fecha de inicio en formato YYYY-MM-DD.
+        end_date (str, opcional): Fecha de fin en formato YYYY-MM-DD.
+        sort_by (str): Criterio de orden, uno de `SORT_OPTIONS`.
+        limit (int, opcional): Cantidad máxima de videos. Por defecto, todos.
+        offset (int): Cantidad de videos a saltar desde el primero del ranking.
+
+    Returns:
+        tuple: El DataFrame de la página y la cantidad total de videos del ranking.
+    """
+    index = _get_index(start_date, end_date)
+    df = index["df"]
+    k = None if limit is None else offset + limit
+
+    # Reusar un orden parcial ya calculado si alcanza para la página pedida
+    cached = index["orders"].get(sort_by)
+    if cached is not None and (cached[0] is None or (k is not None and cached[0] >= k)):
+        order = cached[1]
+    else:
+        order = top_k_order(sort_values(df, sort_by), k)
+        index["orders"][sort_by] = (k, order)
+
+    end = None if limit is None else offset + limit
+    return df.iloc[order[offset:end]], len(df)
@@ -0,0 +1,61 @@
+import json
+import os
+
+# Registro de clientes: en qué documento (spreadsheet) y en qué hoja están los leads
+# de cada cliente. Permite repartir los clientes en varios documentos para no llegar
+# al límite de celdas de Google ni compartir la cuota de lectura de un solo documento.
+#
+# Formato de CLIENT_REGISTRY_FILE:
+#
+#     {
+#         "spreadsheets": ["<id documento 1>", "<id documento 2>"],
+#         "clients": {
+#             "Cliente Grande": {"spreadsheet_id": "<id documento 3>", "tab": "Leads"}
+#         }
+#     }
+#
+# Las hojas visibles de cada documento de "spreadsheets" se registran con su propio
+# nombre como cliente. "clients" agrega o reemplaza clientes puntuales, por ejemplo
+# uno que tiene un documento propio con otro nombre de hoja.
+CLIENT_REGISTRY_FILE = os.getenv("CLIENT_REGISTRY_FILE", "clients.json")
+
+# Registro ya leído, junto con la fecha de modificación del archivo
+_registry_cache = {"key": None, "registry": None}
+
+
+def load_client_registry(default_spreadsheet_id: str):
+    """
+    Carga el registro de clientes. Sin archivo, todo vive en el documento por defecto.
+
+    Args:
+        default_spreadsheet_id (str): El documento a usar si el registro no define ninguno.
+
+    Returns:
+        dict: El registro con las claves 'spreadsheets' (list) y 'clients' (dict).
+    """
+    try:
+        mtime = os.stat(CLIENT_REGISTRY_FILE).st_mtime
+    except FileNotFoundError:
+        mtime = None
+    key = (CLIENT_REGISTRY_FILE, mtime, default_spreadsheet_id)
+    if _registry_cache["key"] == key:
+        return _registry_cache["registry"]
+
+    registry = {}
+    if mtime is not None:
+        with open(CLIENT_REGISTRY_FILE, encoding="utf-8") as f:
+            registry = json.load(f)
+
+    clients = {}
+    for name, location in registry.get("clients", {}).items():
+        clients[name] = {
+            "spreadsheet_id": location.get("spreadsheet_id", default_spreadsheet_id),
+            "tab": location.get("tab", name),
+        }
+    registry = {
+        "spreadsheets": registry.get("spreadsheets") or [default_spreadsheet_id],
+        "clients": clients,
+    }
+    _registry_cache["key"] = key
+    _registry_cache["registry"] = registry
+    return registry
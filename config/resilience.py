@@ -0,0 +1,292 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from config.metrics import CIRCUIT_STATE, STALE_SERVED
+from config.quota import INTERACTIVE, background_priority, current_priority
+from config.shared_cache import SHARED_CACHE_KEEP, get, get_or_compute, read_stale
+from config.timing import record_stale_data
+
+# Tolerancia a caídas de los servicios externos:
+#   - Un circuit breaker por servicio: tras CIRCUIT_FAILURES errores seguidos deja de
+#     llamarlo durante CIRCUIT_RESET_TIMEOUT segundos y luego lo prueba con una sola
+#     llamada (half-open) antes de volver a abrir el paso.
+#   - Stale-while-revalidate sobre la caché compartida: si el dato venció (o se
+#     invalidó), las peticiones interactivas reciben el último dato bueno al instante
+#     y se refresca en segundo plano. Si el servicio falla, se sirve el último dato
+#     bueno mientras tenga menos de SHARED_CACHE_KEEP segundos.
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+SWR_ENABLED = os.getenv("SWR_ENABLED", "1") == "1"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamUnavailable(Exception):
+    """
+    El servicio externo está marcado como caído (circuito abierto) y no se llamó.
+
+    Args:
+        upstream (str): El servicio externo.
+        retry_after (float): Segundos hasta la próxima prueba del servicio.
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(
+            f"{upstream} no está disponible; se reintentará en {retry_after:.0f} s"
+        )
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class QuotaExhausted(UpstreamUnavailable):
+    """
+    No hubo cupo del regulador de cuota (ver `config.quota`) a tiempo: la llamada no
+    sale, para no provocar errores 429 del servicio.
+
+    Args:
+        upstream (str): El servicio externo.
+        retry_after (float): Segundos sugeridos antes de reintentar.
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        Exception.__init__(
+            self,
+            f"Cuota de {upstream} agotada; se reintentará en {retry_after:.0f} s",
+        )
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(error: Exception):
+    """
+    Indica si un error cuenta como falla del servicio (5xx, 429, red o tiempo de
+    espera) y no como un error de la petición (4xx, por ejemplo un rango inválido).
+    """
+    status = getattr(getattr(error, "resp", None), "status", None)
+    if status is None:
+        # Slack: SlackApiError trae la respuesta HTTP en `response`
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(error, "status", None)
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        return True
+    return status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de un servicio externo, compartido por los hilos del worker.
+
+    Args:
+        upstream (str): El servicio externo.
+        failures (int): Errores seguidos que abren el circuito.
+        reset_timeout (float): Segundos con el circuito abierto antes de probar el servicio.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        failures: int = CIRCUIT_FAILURES,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.upstream = upstream
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str):
+        self.state = state
+        CIRCUIT_STATE.labels(self.upstream).set(_STATE_VALUES[state])
+
+    def before_call(self):
+        """
+        Autoriza una llamada o lanza `UpstreamUnavailable` si el circuito está abierto.
+        Con el circuito semiabierto solo pasa una llamada de prueba a la vez.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and retry_after <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise UpstreamUnavailable(self.upstream, max(retry_after, 1))
+
+    def on_success(self):
+        with self._lock:
+            self._probing = False
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                print(f"Circuito de {self.upstream} cerrado: el servicio respondió")
+                self._set_state(CLOSED)
+
+    def on_skipped(self):
+        """
+        La llamada no salió (por ejemplo, sin cupo): no cuenta como éxito ni como error.
+        """
+        with self._lock:
+            self._probing = False
+
+    def on_failure(self):
+        with self._lock:
+            self._probing = False
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failures:
+                if self.state != OPEN:
+                    print(f"Circuito de {self.upstream} abierto tras errores seguidos")
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(upstream: str):
+    """
+    Devuelve el circuit breaker de un servicio, creándolo la primera vez.
+    """
+    with _breakers_lock:
+        if upstream not in _breakers:
+            _breakers[upstream] = CircuitBreaker(upstream)
+        return _breakers[upstream]
+
+
+@contextmanager
+def guarded(upstream: str):
+    """
+    Envuelve una llamada a un servicio externo con su circuit breaker.
+
+    Args:
+        upstream (str): El servicio externo ('sheets', 'drive', 'notion' o 'slack').
+
+    Raises:
+        UpstreamUnavailable: Si el circuito está abierto (o `QuotaExhausted`, sin cupo).
+    """
+    breaker = get_breaker(upstream)
+    breaker.before_call()
+    try:
+        yield
+    except UpstreamUnavailable:
+        breaker.on_skipped()
+        raise
+    except Exception as e:
+        if is_upstream_failure(e):
+            breaker.on_failure()
+        else:
+            breaker.on_success()
+        raise
+    else:
+        breaker.on_success()
+
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+# Momentos de cálculo de los valores vencidos servidos dentro de `track_stale`
+_stale_served = ContextVar("stale_served", default=None)
+
+
+@contextmanager
+def track_stale():
+    """
+    Registra los valores vencidos que se sirvan dentro del bloque (también desde los
+    hilos de `run_parallel`), para no guardar resultados derivados de ellos.
+
+    Yields:
+        list: Los momentos de cálculo de los valores vencidos servidos.
+    """
+    served = []
+    token = _stale_served.set(served)
+    try:
+        yield served
+    finally:
+        _stale_served.reset(token)
+
+
+def refresh_in_background(namespace: str, key: str, compute, ttl: int):
+    """
+    Recalcula un valor de la caché compartida en un hilo aparte, una sola vez por
+    llave aunque lo pidan varias peticiones a la vez.
+    """
+    with _refreshing_lock:
+        if (namespace, key) in _refreshing:
+            return
+        _refreshing.add((namespace, key))
+
+    def run():
+        try:
+            # Contexto nuevo: el refresco no pertenece a la petición que lo disparó
+            with background_priority():
+                get_or_compute(namespace, key, compute, ttl)
+        except Exception as e:
+            print(f"Error refrescando {namespace} en segundo plano: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard((namespace, key))
+
+    threading.Thread(
+        target=Context().run, args=(run,), name=f"refresh-{namespace}", daemon=True
+    ).start()
+
+
+def get_or_compute_stale(namespace: str, key: str, compute, ttl: int):
+    """
+    Como `get_or_compute`, pero con stale-while-revalidate y respaldo ante fallas:
+
+      - Si hay un valor vigente, se devuelve.
+      - Si solo hay uno vencido y la petición es interactiva, se devuelve ese y se
+        refresca en segundo plano. El trabajo en segundo plano espera el dato nuevo.
+      - Si el cálculo falla y hay un valor vencido, se devuelve el vencido.
+
+    Los valores vencidos que se sirven quedan registrados en la petición (header `Age`).
+
+    Args:
+        namespace (str): El espacio de la caché.
+        key (str): La llave del valor dentro del espacio.
+        compute (callable): Función sin argumentos que calcula el valor.
+        ttl (int): Segundos que el valor se considera vigente.
+
+    Returns:
+        tuple: El valor y su momento de cálculo (epoch en segundos).
+    """
+    if not SWR_ENABLED:
+        return get_or_compute(namespace, key, compute, ttl)
+
+    cached = get(namespace, key, ttl)
+    if cached is not None:
+        return cached
+
+    stale = read_stale(namespace, key, SHARED_CACHE_KEEP)
+    if stale is not None and current_priority() == INTERACTIVE:
+        refresh_in_background(namespace, key, compute, ttl)
+        return _serve_stale(namespace, stale, "revalidate")
+
+    try:
+        return get_or_compute(namespace, key, compute, ttl)
+    except Exception as e:
+        if stale is None or not is_upstream_failure(e):
+            raise
+        print(f"Sirviendo {namespace} vencido por falla del servicio: {e}")
+        return _serve_stale(namespace, stale, "fallback")
+
+
+def _serve_stale(namespace: str, stale: tuple, reason: str):
+    STALE_SERVED.labels(namespace, reason).inc()
+    record_stale_data(stale[1])
+    served = _stale_served.get()
+    if served is not None:
+        served.append(stale[1])
+    return stale
@@ -0,0 +1,133 @@
+import json
+import os
+from bisect import bisect_left
+import pandas as pd
+from config.shared_cache import exclusive
+
+# Índice de filas por día de cada hoja: para cada fecha de 'Created at (fecha)', la
+# primera y la última fila donde aparece. Se actualiza al sincronizar las marcas de
+# agua y permite pedir solo la cola de la hoja (por ejemplo A5000:Z) en consultas
+# de días recientes.
+#
+# Formato de ROW_INDEX_FILE:
+#
+#     {"Cliente": {"days": {"2024-08-01": [5000, 5042]}, "last_row": 5100, "ordered": true}}
+ROW_INDEX_FILE = os.getenv("ROW_INDEX_FILE", "row_index.json")
+# Filas de margen antes de la fila calculada, por si se borraron filas desde la última sincronización
+ROW_INDEX_MARGIN = int(os.getenv("ROW_INDEX_MARGIN", "200"))
+
+# Índice ya leído, junto con la fecha de modificación del archivo
+_index_cache = {"mtime": None, "index": {}}
+
+
+def load_row_index():
+    """
+    Carga el índice de filas de todas las hojas.
+
+    Returns:
+        dict: Un diccionario con el nombre del cliente como clave y su índice como valor.
+              Retorna un diccionario vacío si el archivo no existe o está corrupto.
+    """
+    try:
+        mtime = os.stat(ROW_INDEX_FILE).st_mtime
+    except FileNotFoundError:
+        return {}
+    if _index_cache["mtime"] == mtime:
+        return _index_cache["index"]
+
+    try:
+        with open(ROW_INDEX_FILE, encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = {}
+    _index_cache["mtime"] = mtime
+    _index_cache["index"] = index
+    return index
+
+
+def is_chronological(days: dict):
+    """
+    Indica si las filas de la hoja están ordenadas por fecha: los rangos de filas de
+    cada día no se solapan y avanzan junto con la fecha.
+
+    Args:
+        days (dict): Día (YYYY-MM-DD) -> [primera fila, última fila].
+
+    Returns:
+        bool: True si la hoja está en orden cronológico.
+    """
+    previous_last = 0
+    for day in sorted(days):
+        first, last = days[day]
+        if first <= previous_last:
+            return False
+        previous_last = last
+    return True
+
+
+def update_row_index(client: str, df, full: bool = False):
+    """
+    Agrega al índice las filas leídas en una sincronización.
+
+    Args:
+        client (str): El nombre del cliente (hoja).
+        df (pd.DataFrame): Las filas leídas, con el número de fila como índice.
+        full (bool): Si es True, las filas cubren toda la hoja y reemplazan el índice anterior.
+    """
+    days = pd.to_datetime(df["Created at (fecha)"], errors="coerce").dt.strftime(
+        "%Y-%m-%d"
+    )
+    bounds = (
+        pd.Series(df.index.to_numpy(), index=df.index)
+        .groupby(days.to_numpy())
+        .agg(["min", "max"])
+    )
+
+    # Leer, modificar y guardar sin que otro worker reescriba el archivo en medio
+    with exclusive("row-index"):
+        index = dict(load_row_index())
+        entry = {} if full else index.get(client, {})
+        days_map = dict(entry.get("days", {}))
+        for day, first, last in bounds.itertuples():
+            if day in days_map:
+                first = min(first, days_map[day][0])
+                last = max(last, days_map[day][1])
+            days_map[day] = [int(first), int(last)]
+
+        index[client] = {
+            "days": days_map,
+            "last_row": int(df.index[-1]) if not df.empty else entry.get("last_row", 1),
+            "ordered": is_chronological(days_map),
+        }
+        tmp_path = f"{ROW_INDEX_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, ROW_INDEX_FILE)
+
+
+def tail_start_row(client: str, since):
+    """
+    Calcula desde qué fila hay que leer una hoja para obtener los leads desde una fecha.
+
+    Args:
+        client (str): El nombre del cliente (hoja).
+        since (str): La fecha más antigua que se necesita (formato YYYY-MM-DD).
+
+    Returns:
+        int: La primera fila a leer, o None si hay que leer la hoja completa (sin índice,
+             hoja fuera de orden cronológico o fecha anterior a todos los datos).
+    """
+    entry = load_row_index().get(client)
+    since = pd.to_datetime(since, errors="coerce") if since else None
+    if not entry or not entry["ordered"] or since is None or pd.isna(since):
+        return None
+
+    days = sorted(entry["days"])
+    position = bisect_left(days, since.strftime("%Y-%m-%d"))
+    if position < len(days):
+        start_row = entry["days"][days[position]][0]
+    else:
+        start_row = entry["last_row"] + 1
+
+    start_row -= ROW_INDEX_MARGIN
+    return start_row if start_row > 2 else None
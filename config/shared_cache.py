@@ -0,0 +1,428 @@
+import hashlib
+import mmap
+import os
+import pickle
+import stat
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from config.metrics import record_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos, solo entre hilos
+    fcntl = None
+
+
+def _default_cache_dir():
+    if not hasattr(os, "getuid"):
+        # Windows: el directorio temporal ya es propio del usuario
+        return os.path.join(tempfile.gettempdir(), "sunboost-cache")
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"sunboost-cache-{os.getuid()}")
+
+
+# Caché compartida entre los workers de uvicorn de una misma máquina, sin servicios
+# externos: cada valor es un archivo en SHARED_CACHE_DIR (por defecto en /dev/shm, en
+# memoria, en un directorio por usuario). Se publica de forma atómica (archivo
+# temporal + os.replace) y se lee con mmap. Solo los buffers binarios (columnas
+# numéricas de numpy) se cargan sin copiarse; las columnas de texto, como casi todas
+# las de las hojas, se deserializan completas en cada lectura.
+#
+# Los valores se leen con pickle, así que el directorio debe ser privado: si no es del
+# usuario del proceso o otros usuarios pueden escribir en él, la caché no se usa.
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR", _default_cache_dir())
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "1") == "1"
+# Segundos que un valor se considera vigente si no se invalidó antes
+SHARED_CACHE_TTL = int(os.getenv("SHARED_CACHE_TTL", "120"))
+# Segundos que se conservan los valores vencidos o invalidados, para servirlos si el
+# servicio externo falla (ver `config.resilience`)
+SHARED_CACHE_KEEP = int(os.getenv("SHARED_CACHE_KEEP", "86400"))
+
+MAGIC = b"SBC1"
+ALIGNMENT = 64
+_HEADER_SIZE = struct.Struct("<Q")
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+# Resultado de la revisión de cada directorio (ver `cache_dir_ready`)
+_checked_dirs = {}
+
+
+def _check_private_dir(directory: str):
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.lstat(directory)
+    except OSError as e:
+        print(f"Caché compartida desactivada: no se pudo crear {directory}: {e}")
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        print(
+            f"Caché compartida desactivada: {directory} debe ser un directorio del "
+            "usuario del proceso, sin permisos para otros usuarios (chmod 700)"
+        )
+        return False
+    return True
+
+
+def cache_dir_ready():
+    """
+    Crea SHARED_CACHE_DIR (con permisos 700) la primera vez y comprueba que sea un
+    directorio privado del usuario del proceso. Si no lo es, la caché no se usa.
+
+    Returns:
+        bool: True si la caché puede leer y escribir en el directorio.
+    """
+    directory = SHARED_CACHE_DIR
+    ready = _checked_dirs.get(directory)
+    if ready is None:
+        ready = _checked_dirs[directory] = _check_private_dir(directory)
+    return ready
+
+
+def _path(namespace: str, key: str):
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(SHARED_CACHE_DIR, namespace, f"{digest}.bin")
+
+
+def get_generation(namespace: str):
+    """
+    Devuelve la generación actual de un espacio de la caché. Invalidar el espacio
+    cambia la generación, y los valores publicados con la anterior dejan de estar
+    vigentes (solo se leen como respaldo, con `read_stale`).
+    """
+    try:
+        with open(os.path.join(SHARED_CACHE_DIR, namespace, "generation")) as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+
+def invalidate(namespace: str):
+    """
+    Invalida todos los valores de un espacio de la caché, en todos los workers.
+
+    Args:
+        namespace (str): El espacio, por ejemplo 'sheets'.
+    """
+    if not cache_dir_ready():
+        return
+    directory = os.path.join(SHARED_CACHE_DIR, namespace)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    tmp_path = os.path.join(directory, f"generation.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(f"{time.time_ns()}")
+    os.replace(tmp_path, os.path.join(directory, "generation"))
+
+    # Borrar los archivos viejos; los lectores que los tengan abiertos no se ven afectados
+    cutoff = time.time() - max(SHARED_CACHE_TTL, SHARED_CACHE_KEEP)
+    for entry in os.scandir(directory):
+        if entry.name.endswith((".bin", ".lock")) and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def publish(namespace: str, key: str, value, generation: str = None):
+    """
+    Guarda un valor en la caché compartida de forma atómica.
+
+    Args:
+        namespace (str): El espacio de la caché.
+        key (str): La llave del valor dentro del espacio.
+        value: El valor; debe poder serializarse con pickle.
+        generation (str, opcional): La generación del espacio con la que se calculó el
+            valor. Por defecto, la actual.
+
+    Returns:
+        float: El momento de publicación (epoch en segundos).
+
+    Raises:
+        PermissionError: Si SHARED_CACHE_DIR no es un directorio privado.
+    """
+    if not cache_dir_ready():
+        raise PermissionError(f"{SHARED_CACHE_DIR} no es un directorio privado")
+    buffers = []
+    payload = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    created_at = time.time()
+    header = pickle.dumps(
+        {
+            "key": key,
+            "generation": generation or get_generation(namespace),
+            "created_at": created_at,
+            "payload": len(payload),
+            "buffers": [len(raw) for raw in raw_buffers],
+        }
+    )
+
+    path = _path(namespace, key)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_SIZE.pack(len(header)))
+        f.write(header)
+        f.write(payload)
+        for raw in raw_buffers:
+            f.write(b"\0" * (-f.tell() % ALIGNMENT))
+            f.write(raw)
+    os.replace(tmp_path, path)
+    return created_at
+
+
+def read(namespace: str, key: str, ttl: int = SHARED_CACHE_TTL, generation=None):
+    """
+    Lee un valor de la caché compartida.
+
+    Args:
+        namespace (str): El espacio de la caché.
+        key (str): La llave del valor dentro del espacio.
+        ttl (int): Antigüedad máxima aceptada, en segundos.
+        generation (str, opcional): Si se indica, solo se acepta un valor de esa generación.
+
+    Returns:
+        tuple: El valor y su momento de publicación, o None si no está, venció, es de
+               otra generación o el directorio no es privado.
+    """
+    if not cache_dir_ready():
+        return None
+    try:
+        with open(_path(namespace, key), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+    with memoryview(mapped) as view:
+        entry = _decode(view, key, ttl, generation)
+    # Solo los buffers binarios (columnas numéricas) se leen sin copiarse, y mantienen
+    # el mapeo abierto mientras existan. Lo demás (como el texto de las hojas) se copia
+    # al deserializar, así que sin buffers el mapeo se cierra en seguida.
+    if entry is None or not entry[2]:
+        mapped.close()
+    return entry[:2] if entry else None
+
+
+def _decode(view, key: str, ttl: int, generation):
+    """
+    Deserializa un archivo de la caché mapeado en memoria.
+
+    Returns:
+        tuple: El valor, su momento de publicación y si usa buffers del mapeo; o None
+               si no es válido, venció o es de otra generación.
+    """
+    if bytes(view[: len(MAGIC)]) != MAGIC:
+        return None
+    offset = len(MAGIC) + _HEADER_SIZE.size
+    (header_size,) = _HEADER_SIZE.unpack(view[len(MAGIC) : offset])
+    header = pickle.loads(view[offset : offset + header_size])
+    if header["key"] != key or time.time() - header["created_at"] > ttl:
+        return None
+    if generation is not None and header.get("generation") != generation:
+        return None
+
+    offset += header_size
+    payload = view[offset : offset + header["payload"]]
+    offset += header["payload"]
+    buffers = []
+    for size in header["buffers"]:
+        offset += -offset % ALIGNMENT
+        buffers.append(view[offset : offset + size])
+        offset += size
+    value = pickle.loads(payload, buffers=buffers)
+    payload.release()
+    return value, header["created_at"], bool(buffers)
+
+
+def remove(namespace: str, key: str):
+    """
+    Borra un valor de la caché compartida. Los lectores que ya lo tengan abierto no se
+    ven afectados.
+    """
+    try:
+        os.remove(_path(namespace, key))
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def _exclusive(path: str):
+    """
+    Bloqueo exclusivo sobre una llave, entre hilos y (con fcntl) entre procesos.
+    """
+    with _thread_locks_guard:
+        lock = _thread_locks.setdefault(path, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        with open(f"{path}.lock", "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def try_exclusive(name: str):
+    """
+    Intenta tomar un bloqueo sin esperar, para tareas que basta con que haga un solo worker.
+
+    Args:
+        name (str): El nombre del bloqueo.
+
+    Yields:
+        bool: True si se obtuvo el bloqueo; False si otro hilo o worker ya lo tiene.
+    """
+    path = os.path.join(SHARED_CACHE_DIR, f"{name}.lock")
+    with _thread_locks_guard:
+        lock = _thread_locks.setdefault(path, threading.Lock())
+    if not lock.acquire(blocking=False):
+        yield False
+        return
+    try:
+        # Sin bloqueo entre procesos, cada worker hace la tarea
+        if fcntl is None or not cache_dir_ready():
+            yield True
+            return
+        with open(path, "a") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    finally:
+        lock.release()
+
+
+@contextmanager
+def exclusive(name: str):
+    """
+    Toma un bloqueo entre hilos y workers, esperando si otro lo tiene. Para secciones
+    que leen, modifican y vuelven a guardar un archivo compartido entre workers.
+
+    Args:
+        name (str): El nombre del bloqueo.
+    """
+    path = os.path.join(SHARED_CACHE_DIR, f"{name}.lock")
+    with _thread_locks_guard:
+        lock = _thread_locks.setdefault(path, threading.Lock())
+    with lock:
+        # Sin bloqueo entre procesos, solo se excluyen los hilos del worker
+        if fcntl is None or not cache_dir_ready():
+            yield
+            return
+        with open(path, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def get(namespace: str, key: str, ttl: int = SHARED_CACHE_TTL):
+    """
+    Lee un valor vigente de la caché compartida, registrando el acierto o fallo.
+
+    Args:
+        namespace (str): El espacio de la caché; también es el nombre en las métricas.
+        key (str): La llave del valor dentro del espacio.
+        ttl (int): Antigüedad máxima aceptada, en segundos.
+
+    Returns:
+        tuple: El valor y su momento de publicación, o None si no está, venció o se invalidó.
+    """
+    if not SHARED_CACHE_ENABLED or not cache_dir_ready():
+        return None
+    cached = read(namespace, key, ttl, get_generation(namespace))
+    record_cache(namespace, cached is not None)
+    return cached
+
+
+def read_stale(namespace: str, key: str, max_age: int = SHARED_CACHE_KEEP):
+    """
+    Lee el último valor publicado de una llave, aunque esté vencido o invalidado.
+
+    Args:
+        namespace (str): El espacio de la caché.
+        key (str): La llave del valor dentro del espacio.
+        max_age (int): Antigüedad máxima aceptada, en segundos.
+
+    Returns:
+        tuple: El valor y su momento de publicación, o None si no hay ninguno.
+    """
+    if not SHARED_CACHE_ENABLED or not cache_dir_ready():
+        return None
+    return read(namespace, key, max_age)
+
+
+def put(namespace: str, key: str, value):
+    """
+    Publica un valor en la caché compartida, en la generación actual del espacio.
+
+    Args:
+        namespace (str): El espacio de la caché.
+        key (str): La llave del valor dentro del espacio.
+        value: El valor; debe poder serializarse con pickle.
+
+    Returns:
+        float: El momento de publicación (epoch en segundos).
+    """
+    if not SHARED_CACHE_ENABLED or not cache_dir_ready():
+        return time.time()
+    return publish(namespace, key, value)
+
+
+def get_or_compute(namespace: str, key: str, compute, ttl: int = SHARED_CACHE_TTL):
+    """
+    Devuelve un valor de la caché compartida o lo calcula y lo publica. Si varios
+    workers lo piden a la vez, solo uno lo calcula y los demás leen su resultado.
+
+    Args:
+        namespace (str): El espacio de la caché; también es el nombre en las métricas.
+        key (str): La llave del valor dentro del espacio.
+        compute (callable): Función sin argumentos que calcula el valor.
+        ttl (int): Antigüedad máxima aceptada, en segundos.
+
+    Returns:
+        tuple: El valor y su momento de cálculo (epoch en segundos).
+    """
+    if not SHARED_CACHE_ENABLED or not cache_dir_ready():
+        return compute(), time.time()
+
+    # Lo calculado antes de una invalidación (otra generación) no se considera vigente
+    generation = get_generation(namespace)
+    cached = read(namespace, key, ttl, generation)
+    if cached is not None:
+        record_cache(namespace, True)
+        return cached
+
+    with _exclusive(_path(namespace, key)):
+        cached = read(namespace, key, ttl, generation)
+        if cached is not None:
+            record_cache(namespace, True)
+            return cached
+        record_cache(namespace, False)
+        value = compute()
+        try:
+            created_at = publish(namespace, key, value, generation)
+        except OSError as e:
+            print(f"Error publicando en la caché compartida: {e}")
+            created_at = time.time()
+        return value, created_at
@@ -0,0 +1,224 @@
+import os
+import threading
+import duckdb
+import pandas as pd
+from config.data import get_clients_data, get_sheet_names
+from config.timing import timed_phase
+from config.video_links import get_video_links
+
+# Motor SQL embebido (DuckDB) para consultas ad hoc sobre los leads, sin escribir una
+# función de pandas nueva por cada pregunta. Cada consulta ve:
+#   - una tabla por cliente, con el nombre de su hoja (por ejemplo "Cliente 1");
+#   - la vista `leads`, la unión de todas las hojas con la columna `client`;
+#   - la tabla `video_links` (video_id, link), con el mapa de enlaces de Notion y los CSV.
+# Todas las columnas de las hojas son texto, tal como vienen de Google Sheets.
+#
+# Las consultas son de solo lectura: una sola sentencia SELECT, sin acceso a archivos
+# ni a la red, con tiempo máximo y cantidad máxima de filas.
+SQL_TIMEOUT = float(os.getenv("SQL_TIMEOUT", "10"))
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "10000"))
+SQL_MEMORY_LIMIT = os.getenv("SQL_MEMORY_LIMIT", "1GB")
+SQL_THREADS = int(os.getenv("SQL_THREADS", "4"))
+
+UNION_VIEW = "leads"
+LINKS_TABLE = "video_links"
+
+# Conteo de leads y cierres por video, equivalente a los totales de `analyze_closed_data`
+CLOSED_COUNTS_SQL = """
+WITH normalized AS (
+    SELECT
+        upper(trim(coalesce("UTM Content", ''))) AS utm,
+        upper(trim(coalesce("Stage", ''))) AS stage
+    FROM leads_frame
+)
+SELECT
+    coalesce(nullif(regexp_extract(utm, '^[A-Z0-9.-]+'), ''), 'Sin Matricula') AS "Video ID",
+    count(*) AS "Leads",
+    count(*) FILTER (WHERE stage IN ('CLOSED', 'INSTALLED')) AS "Cierres"
+FROM normalized
+GROUP BY 1
+ORDER BY "Cierres" DESC, "Video ID"
+"""
+
+
+class SqlQueryError(Exception):
+    """
+    La consulta no es válida o no está permitida (no es un único SELECT, error de sintaxis, etc.).
+    """
+
+
+class SqlTimeoutError(Exception):
+    """
+    La consulta superó el tiempo máximo `SQL_TIMEOUT`.
+    """
+
+
+def quote_identifier(name: str):
+    """
+    Escapa un nombre de tabla o columna para usarlo en SQL.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _connect():
+    conn = duckdb.connect(":memory:")
+    conn.execute(f"SET threads = {SQL_THREADS}")
+    conn.execute(f"SET memory_limit = '{SQL_MEMORY_LIMIT}'")
+    return conn
+
+
+def _lock_down(conn):
+    """
+    Deja la conexión sin acceso a archivos ni a la red, y sin poder cambiar la configuración.
+    """
+    conn.execute("SET enable_external_access = false")
+    conn.execute("SET lock_configuration = true")
+
+
+def parse_select(conn, query: str):
+    """
+    Verifica que la consulta sea una única sentencia SELECT y devuelve las tablas que usa.
+
+    Args:
+        conn (DuckDBPyConnection): Una conexión, solo para analizar la consulta.
+        query (str): La consulta SQL.
+
+    Returns:
+        set: Los nombres de las tablas y vistas referenciadas, o None si no se pueden
+             determinar (se registran todas).
+
+    Raises:
+        SqlQueryError: Si la consulta no se puede analizar o no es un único SELECT.
+    """
+    try:
+        statements = conn.extract_statements(query)
+    except duckdb.Error as e:
+        raise SqlQueryError(str(e)) from e
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise SqlQueryError("Solo se permite una única sentencia SELECT")
+    try:
+        return conn.get_table_names(query)
+    except duckdb.Error:
+        # Con parámetros ($nombre) DuckDB no puede listar las tablas: se registran todas
+        return None
+
+
+@timed_phase("sql_load")
+def register_lead_tables(conn, tables: set, clients: list = None):
+    """
+    Registra como tablas las hojas de los clientes que usa la consulta, la vista
+    `leads` (si se usa) y la tabla de enlaces (si se usa).
+
+    Args:
+        conn (DuckDBPyConnection): La conexión donde registrar las tablas.
+        tables (set): Las tablas que referencia la consulta; None para registrar todas.
+        clients (list, opcional): Los clientes que puede ver la consulta. Por defecto, todos.
+    """
+    clients = clients if clients is not None else get_sheet_names()
+    if tables is None:
+        tables = {UNION_VIEW, LINKS_TABLE, *clients}
+    # La vista `leads` necesita todas las hojas; si no, solo las nombradas en la consulta
+    needed = clients if UNION_VIEW in tables else [c for c in clients if c in tables]
+
+    selects = []
+    for client, df in get_clients_data(needed).items():
+        # Una hoja vacía no tiene columnas que registrar
+        if df.columns.empty:
+            continue
+        conn.register(client, df)
+        selects.append(
+            f"SELECT '{client.replace(chr(39), chr(39) * 2)}' AS client, * "
+            f"FROM {quote_identifier(client)}"
+        )
+    if UNION_VIEW in tables:
+        # BY NAME: las hojas pueden tener columnas distintas o en otro orden
+        union = " UNION ALL BY NAME ".join(selects) or "SELECT NULL AS client LIMIT 0"
+        conn.execute(f"CREATE VIEW {UNION_VIEW} AS {union}")
+
+    if LINKS_TABLE in tables:
+        links = get_video_links()
+        conn.register(
+            LINKS_TABLE,
+            pd.DataFrame(
+                {"video_id": list(links.keys()), "link": list(links.values())},
+                dtype="string",
+            ),
+        )
+
+
+def run_query(conn, query: str, params=None, max_rows: int = SQL_MAX_ROWS):
+    """
+    Ejecuta una consulta con tiempo máximo y devuelve a lo sumo `max_rows` filas.
+
+    Raises:
+        SqlQueryError: Si la consulta falla.
+        SqlTimeoutError: Si la consulta supera `SQL_TIMEOUT`.
+    """
+    timer = threading.Timer(SQL_TIMEOUT, conn.interrupt)
+    timer.start()
+    try:
+        cursor = conn.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchmany(max_rows + 1)
+    except duckdb.InterruptException as e:
+        raise SqlTimeoutError(
+            f"La consulta superó el tiempo máximo de {SQL_TIMEOUT} segundos"
+        ) from e
+    except duckdb.Error as e:
+        raise SqlQueryError(str(e)) from e
+    finally:
+        timer.cancel()
+    return columns, rows
+
+
+@timed_phase("sql_query")
+def execute_sql(query: str, params=None, clients: list = None, max_rows: int = None):
+    """
+    Ejecuta una consulta SQL de solo lectura sobre los leads.
+
+    Args:
+        query (str): Una única sentencia SELECT. Los parámetros se escriben como $nombre.
+        params (dict, opcional): Los valores de los parámetros de la consulta.
+        clients (list, opcional): Los clientes que puede ver la consulta. Por defecto, todos.
+        max_rows (int, opcional): Máximo de filas a devolver; nunca más que `SQL_MAX_ROWS`.
+
+    Returns:
+        dict: {'columns': nombres, 'rows': filas como listas, 'truncated': si había más filas}.
+
+    Raises:
+        SqlQueryError: Si la consulta no es un único SELECT o falla.
+        SqlTimeoutError: Si la consulta supera `SQL_TIMEOUT`.
+    """
+    max_rows = min(max_rows or SQL_MAX_ROWS, SQL_MAX_ROWS)
+    conn = _connect()
+    try:
+        tables = parse_select(conn, query)
+        register_lead_tables(conn, tables, clients)
+        _lock_down(conn)
+        columns, rows = run_query(conn, query, params, max_rows)
+    finally:
+        conn.close()
+    return {
+        "columns": columns,
+        "rows": [list(row) for row in rows[:max_rows]],
+        "truncated": len(rows) > max_rows,
+    }
+
+
+def closed_counts_sql(df):
+    """
+    Cuenta leads y cierres por video con DuckDB (multihilo y vectorizado), sobre un
+    DataFrame con las columnas 'UTM Content' y 'Stage'.
+
+    Args:
+        df (pd.DataFrame): Los leads de uno o varios clientes.
+
+    Returns:
+        pd.DataFrame: 'Video ID', 'Leads' y 'Cierres', ordenado por cierres.
+    """
+    conn = _connect()
+    try:
+        conn.register("leads_frame", df)
+        return conn.execute(CLOSED_COUNTS_SQL).df()
+    finally:
+        conn.close()
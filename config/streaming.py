@@ -0,0 +1,222 @@
+import json
+import os
+import pandas as pd
+from config.data import (
+    APPOINTMENT_STAGES,
+    CLOSED_STAGES,
+    filter_by_date,
+    get_sheet_chunk,
+    get_sheet_headers,
+    preprocess_data,
+    required_columns,
+    summarize_appointments,
+    summarize_closed,
+    summarize_quality,
+    window_start,
+)
+from config.resilience import get_or_compute_stale
+from config.row_index import load_row_index, tail_start_row
+from config.shared_cache import SHARED_CACHE_TTL
+from config.timing import record_fetched_data
+
+# Ingesta por bloques para hojas muy grandes: la hoja se lee de a SHEET_CHUNK_ROWS filas
+# y cada bloque se suma a conteos incrementales (leads, citas, cierres y etapas), sin
+# armar nunca el DataFrame completo. La memoria por petición queda acotada por el
+# tamaño del bloque y la cantidad de videos, no por el tamaño de la hoja.
+# Con 0 (por defecto) las rutas de análisis descargan la hoja completa como siempre.
+SHEET_CHUNK_ROWS = int(os.getenv("SHEET_CHUNK_ROWS", "0"))
+# Filas a leer (según el índice de filas) desde las que una hoja se lee por bloques.
+# Las hojas más chicas siguen usando `get_google_sheets_data`, con caché y columnas
+# proyectadas, que cuesta menos lecturas de la cuota de Sheets.
+SHEET_CHUNK_MIN_ROWS = int(os.getenv("SHEET_CHUNK_MIN_ROWS", "100000"))
+DEFAULT_CHUNK_ROWS = 5000
+
+GROUP_KEYS = ["Video ID", "Leyenda", "Link"]
+STAGE_KEYS = ["Video ID", "Stage"]
+
+
+def iter_sheet_chunks(
+    sheet_name: str, columns: list = None, chunk_rows: int = None, start_row: int = 2
+):
+    """
+    Recorre una hoja en bloques de filas consecutivas, sin cargarla entera en memoria.
+    La lectura termina en el primer bloque vacío.
+
+    Args:
+        sheet_name (str): El nombre de la hoja (cliente).
+        columns (list, opcional): Descargar solo estas columnas. Por defecto, todas.
+        chunk_rows (int, opcional): Filas por bloque. Por defecto, `SHEET_CHUNK_ROWS`.
+        start_row (int): Primera fila de datos a leer (la fila 1 es el encabezado).
+
+    Yields:
+        pd.DataFrame: Cada bloque, con el número de fila en la hoja como índice.
+    """
+    chunk_rows = chunk_rows or SHEET_CHUNK_ROWS or DEFAULT_CHUNK_ROWS
+
+    # Encabezado actualizado: las posiciones de las columnas no pueden cambiar entre bloques
+    header = get_sheet_headers([sheet_name], refresh=True)[sheet_name]
+    names = [name for name in columns if name in header] if columns else header
+    if not names:
+        return
+
+    first_row = start_row
+    while True:
+        last_row = first_row + chunk_rows - 1
+        chunk = get_sheet_chunk(sheet_name, header, names, first_row, last_row)
+        if chunk.empty:
+            return
+        yield chunk
+        first_row = last_row + 1
+
+
+def _empty_counts(keys: list):
+    return pd.Series([], dtype="int64", index=pd.MultiIndex.from_tuples([], names=keys))
+
+
+class StreamingAggregator:
+    """
+    Conteos incrementales de leads, citas, cierres y etapas por video. Cada bloque se
+    filtra por fecha, se procesa y se suma; el resultado es el mismo que el de los
+    análisis sobre la hoja completa.
+
+    Args:
+        start_date (str, opcional): Fecha de inicio del filtro (formato YYYY-MM-DD).
+        end_date (str, opcional): Fecha de fin del filtro (formato YYYY-MM-DD).
+        video_links (dict, opcional): Enlaces de video; por defecto se buscan en el índice.
+    """
+
+    def __init__(self, start_date=None, end_date=None, video_links=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.video_links = video_links
+        self.rows = 0
+        self.counts = {
+            "leads": _empty_counts(GROUP_KEYS),
+            "closes": _empty_counts(GROUP_KEYS),
+            "appointments": _empty_counts(GROUP_KEYS),
+            "stages": _empty_counts(STAGE_KEYS),
+        }
+
+    def _accumulate(self, name: str, counts):
+        total = self.counts[name]
+        levels = list(range(total.index.nlevels))
+        self.counts[name] = pd.concat([total, counts]).groupby(level=levels).sum()
+
+    def add(self, chunk):
+        """
+        Suma un bloque de filas a los conteos.
+
+        Args:
+            chunk (pd.DataFrame): Un bloque con 'UTM Content', 'Stage' y 'Created at (fecha)'.
+        """
+        if self.start_date or self.end_date:
+            chunk = filter_by_date(chunk, self.start_date, self.end_date)
+        if chunk.empty:
+            return
+        df = preprocess_data(chunk, self.video_links)
+        self.rows += len(df)
+
+        self._accumulate("leads", df.groupby(GROUP_KEYS).size())
+        for name, stages in (
+            ("closes", CLOSED_STAGES),
+            ("appointments", APPOINTMENT_STAGES),
+        ):
+            self._accumulate(
+                name, df[df["Stage"].isin(stages)].groupby(GROUP_KEYS).size()
+            )
+        self._accumulate("stages", df.groupby(STAGE_KEYS).size())
+
+    def _frame(self, name: str, column: str):
+        return self.counts[name].reset_index(name=column)
+
+    def closed(self):
+        """
+        Returns:
+            pd.DataFrame: El mismo resultado que `analyze_closed_data`.
+        """
+        return summarize_closed(
+            self._frame("leads", "Leads"), self._frame("closes", "Cierres")
+        )
+
+    def appointments(self):
+        """
+        Returns:
+            pd.DataFrame: El mismo resultado que `analyze_appointments_data`.
+        """
+        return summarize_appointments(
+            self._frame("leads", "Leads"), self._frame("appointments", "Citas")
+        )
+
+    def quality(self):
+        """
+        Returns:
+            pd.DataFrame: El mismo resultado que `analyze_quality_distribution`.
+        """
+        return summarize_quality(self._frame("stages", "Numero de Leads"))
+
+
+def use_chunked_reads(client: str, start_date=None, end_date=None):
+    """
+    Indica si una consulta debe leer la hoja por bloques: la ingesta por bloques está
+    activada y el índice de filas muestra que hay que leer al menos
+    `SHEET_CHUNK_MIN_ROWS` filas. Sin índice, la hoja se lee completa con caché.
+
+    Args:
+        client (str): El nombre del cliente.
+        start_date (str, opcional): Fecha de inicio del filtro (formato YYYY-MM-DD).
+        end_date (str, opcional): Fecha de fin del filtro (formato YYYY-MM-DD).
+
+    Returns:
+        bool: True si conviene usar `aggregate_sheet`.
+    """
+    if not SHEET_CHUNK_ROWS:
+        return False
+    entry = load_row_index().get(client)
+    if not entry:
+        return False
+    since = window_start(start_date, end_date)
+    start_row = (tail_start_row(client, since) if since else None) or 2
+    return entry["last_row"] - start_row + 1 >= SHEET_CHUNK_MIN_ROWS
+
+
+def aggregate_sheet(
+    client: str, start_date=None, end_date=None, chunk_rows: int = None
+):
+    """
+    Calcula los conteos de un cliente leyendo su hoja por bloques. Si el índice de
+    filas lo permite, empieza por la cola de la hoja.
+
+    Los conteos se guardan en el espacio 'sheets' de la caché compartida, como las
+    hojas descargadas: valen hasta que el vigilante detecta una nueva versión del
+    documento (o vence SHARED_CACHE_TTL), y si Sheets falla se sirven los anteriores.
+
+    Args:
+        client (str): El nombre del cliente.
+        start_date (str, opcional): Fecha de inicio del filtro (formato YYYY-MM-DD).
+        end_date (str, opcional): Fecha de fin del filtro (formato YYYY-MM-DD).
+        chunk_rows (int, opcional): Filas por bloque. Por defecto, `SHEET_CHUNK_ROWS`.
+
+    Returns:
+        StreamingAggregator: Los conteos; sus métodos `closed`, `appointments` y
+        `quality` devuelven los análisis.
+    """
+    key = json.dumps(["chunked", client, start_date, end_date, chunk_rows or 0])
+    aggregator, created_at = get_or_compute_stale(
+        "sheets",
+        key,
+        lambda: _aggregate(client, start_date, end_date, chunk_rows),
+        SHARED_CACHE_TTL,
+    )
+    record_fetched_data(created_at)
+    return aggregator
+
+
+def _aggregate(client: str, start_date, end_date, chunk_rows: int):
+    columns = required_columns(filter_by_date, preprocess_data)
+    since = window_start(start_date, end_date)
+    start_row = (tail_start_row(client, since) if since else None) or 2
+
+    aggregator = StreamingAggregator(start_date, end_date)
+    for chunk in iter_sheet_chunks(client, columns, chunk_rows, start_row):
+        aggregator.add(chunk)
+    return aggregator
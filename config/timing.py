@@ -0,0 +1,231 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+# Si está activo, cada fase medida se imprime también como una línea JSON
+SERVER_TIMING_LOG = os.getenv("SERVER_TIMING_LOG", "0") == "1"
+
+_current_timings = ContextVar("server_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Acumula la duración de cada fase de una petición para el header `Server-Timing`.
+
+    Las fases anidadas se descuentan de la fase que las contiene, de modo que cada
+    valor es el tiempo propio de la fase (por ejemplo, 'aggregation' no incluye el
+    'preprocess' que se llama dentro del análisis).
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.durations = {}
+        # Momento de cálculo del dato vencido más viejo que se usó, si hubo alguno
+        self.stale_since = None
+        # Momento de descarga de la hoja más vieja que se usó (puede venir de la caché)
+        self.fetched_at = None
+        self._lock = threading.Lock()
+        self._stacks = {}
+
+    def _stack(self):
+        return self._stacks.setdefault(threading.get_ident(), [])
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def header(self):
+        """
+        Arma el valor del header `Server-Timing`, con las duraciones en milisegundos.
+
+        Returns:
+            str: Por ejemplo "sheet_fetch;dur=812.4, preprocess;dur=95.0".
+        """
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}"
+            for name, seconds in self.durations.items()
+        )
+
+
+def start_request_timing(path: str = ""):
+    """
+    Empieza a medir las fases de la petición actual.
+
+    Args:
+        path (str): La ruta de la petición, usada en los logs estructurados.
+
+    Returns:
+        RequestTimings: El acumulador de la petición.
+    """
+    timings = RequestTimings(path)
+    _current_timings.set(timings)
+    return timings
+
+
+def record_stale_data(created_at: float):
+    """
+    Registra que la petición en curso usó un dato vencido, para informar su antigüedad.
+
+    Args:
+        created_at (float): El momento en que se calculó el dato (epoch en segundos).
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return
+    with timings._lock:
+        if timings.stale_since is None or created_at < timings.stale_since:
+            timings.stale_since = created_at
+
+
+def record_fetched_data(created_at: float):
+    """
+    Registra cuándo se descargaron los datos que usó la petición en curso, para
+    informar su antigüedad (header `Age`) cuando vienen de la caché compartida.
+
+    Args:
+        created_at (float): El momento de la descarga (epoch en segundos).
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return
+    with timings._lock:
+        if timings.fetched_at is None or created_at < timings.fetched_at:
+            timings.fetched_at = created_at
+
+
+def current_timings():
+    """
+    Devuelve el acumulador de la petición en curso, o None fuera de una petición medida.
+    """
+    return _current_timings.get()
+
+
+class _FanOut:
+    """
+    Fases medidas en las tareas de un reparto en paralelo. Cada tarea corre en otro
+    hilo, así que sus fases se acumulan aparte y al terminar se suman a la petición
+    escaladas al tiempo real del reparto: si cuatro lecturas de 1 s corren a la vez,
+    'sheet_fetch' suma 1 s y no 4, y ese segundo se descuenta de la fase que contiene
+    el reparto.
+    """
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.tasks = RequestTimings(timings.path) if timings is not None else None
+        self.busy = 0.0
+
+    def run(self, func, *args):
+        """
+        Ejecuta una tarea del reparto midiendo sus fases. Debe llamarse dentro de una
+        copia del contexto (`copy_context().run`), para no cambiar el del hilo.
+        """
+        if self.tasks is None:
+            return func(*args)
+        _current_timings.set(self.tasks)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.tasks._lock:
+                self.busy += elapsed
+
+    def merge(self, wall: float):
+        timings, tasks = self.timings, self.tasks
+        with tasks._lock:
+            durations = dict(tasks.durations)
+            busy = self.busy
+        if tasks.stale_since is not None:
+            record_stale_data(tasks.stale_since)
+        if tasks.fetched_at is not None:
+            record_fetched_data(tasks.fetched_at)
+        if busy <= 0:
+            return
+        # La espera por hilos libres del pool queda en la fase que contiene el reparto
+        scale = min(wall / busy, 1.0)
+        attributed = 0.0
+        for name, seconds in durations.items():
+            timings.add(name, seconds * scale)
+            attributed += seconds * scale
+        stack = timings._stack()
+        if stack:
+            stack[-1] += attributed
+
+
+@contextmanager
+def fan_out():
+    """
+    Mide un reparto de tareas en paralelo dentro de la petición en curso. Las tareas
+    deben ejecutarse con `run` del objeto devuelto.
+
+    Yields:
+        _FanOut: El reparto, cuyo método `run(func, *args)` ejecuta cada tarea.
+    """
+    tasks = _FanOut(_current_timings.get())
+    start = time.perf_counter()
+    try:
+        yield tasks
+    finally:
+        if tasks.timings is not None:
+            tasks.merge(time.perf_counter() - start)
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Mide una fase de la petición en curso. Fuera de una petición medida no hace nada.
+
+    Args:
+        name (str): El nombre de la fase, por ejemplo 'sheet_fetch'.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    stack = timings._stack()
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        timings.add(name, elapsed - children)
+        if stack:
+            stack[-1] += elapsed
+        if SERVER_TIMING_LOG:
+            print(
+                json.dumps(
+                    {
+                        "event": "phase",
+                        "path": timings.path,
+                        "phase": name,
+                        "dur_ms": round(elapsed * 1000, 1),
+                        "self_ms": round((elapsed - children) * 1000, 1),
+                    }
+                )
+            )
+
+
+def timed_phase(name: str):
+    """
+    Decorador que mide toda la función como una fase de la petición en curso.
+
+    Args:
+        name (str): El nombre de la fase.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,163 @@
+import pandas as pd
+from config.data import (
+    APPOINTMENT_STAGES,
+    CLOSED_STAGES,
+    get_clients_data,
+    get_google_sheets_data,
+    get_sheet_names,
+    preprocess_data,
+    uses_columns,
+)
+from functools import partial
+from config.timing import timed_phase
+
+# Frecuencias de las tendencias y su regla de remuestreo en pandas.
+# Las semanas empiezan el lunes y se etiquetan con ese día; los meses, con el día 1.
+TREND_FREQUENCIES = {"daily": "D", "weekly": "W-MON", "monthly": "MS"}
+
+# Métricas contadas por video y día
+TREND_METRICS = ["Leads", "Citas", "Cierres"]
+
+
+@uses_columns("UTM Content", "Stage", "Created at (fecha)")
+@timed_phase("aggregation")
+def daily_counts(df, keys=("Video ID",)):
+    """
+    Agrupa los leads de un cliente en conteos diarios por video. Es la base de las
+    tendencias y de las ventanas: se calcula una vez y luego se remuestrea o se suma
+    por rango, sin volver a filtrar los leads.
+
+    Args:
+        df (pd.DataFrame): Los leads con 'UTM Content', 'Stage' y 'Created at (fecha)'.
+        keys (tuple): Columnas de `preprocess_data` por las que se agrupa, además del día.
+
+    Returns:
+        pd.DataFrame: Conteos de 'Leads', 'Citas' y 'Cierres' indexados por (*keys, 'Fecha').
+    """
+    # Los enlaces solo se buscan si se agrupa por ellos: se evita la consulta a Notion
+    df = preprocess_data(df, video_links=None if "Link" in keys else {})
+    counts = pd.DataFrame(
+        {
+            **{key: df[key] for key in keys},
+            "Fecha": pd.to_datetime(
+                df["Created at (fecha)"], errors="coerce"
+            ).dt.normalize(),
+            "Leads": 1,
+            "Citas": df["Stage"].isin(APPOINTMENT_STAGES).astype(int),
+            "Cierres": df["Stage"].isin(CLOSED_STAGES).astype(int),
+        }
+    )
+    counts = counts.dropna(subset=["Fecha"])
+    return counts.groupby([*keys, "Fecha"])[TREND_METRICS].sum()
+
+
+def merge_daily_counts(counts_list: list, keys=("Video ID",)):
+    """
+    Suma los conteos diarios de varios clientes.
+
+    Args:
+        counts_list (list): DataFrames devueltos por `daily_counts`.
+        keys (tuple): Las columnas por las que se agruparon los conteos, además del día.
+
+    Returns:
+        pd.DataFrame: Los conteos combinados, con el mismo índice (*keys, 'Fecha').
+    """
+    levels = [*keys, "Fecha"]
+    counts_list = [counts for counts in counts_list if not counts.empty]
+    if not counts_list:
+        index = pd.MultiIndex.from_arrays(
+            [[] for _ in keys] + [pd.DatetimeIndex([])], names=levels
+        )
+        return pd.DataFrame(columns=TREND_METRICS, index=index, dtype=int)
+    return pd.concat(counts_list).groupby(level=levels).sum()
+
+
+def get_general_daily_counts(since=None, keys=("Video ID",)):
+    """
+    Calcula los conteos diarios por video de todos los clientes.
+
+    Args:
+        since (str, opcional): Fecha (YYYY-MM-DD) más antigua que se necesita; permite
+                               descargar solo la cola de cada hoja.
+        keys (tuple): Columnas por las que se agrupa, además del día.
+
+    Returns:
+        pd.DataFrame: Los conteos combinados de todos los clientes.
+    """
+    fetch = partial(
+        get_google_sheets_data, columns=daily_counts.required_columns, since=since
+    )
+    clients_data = get_clients_data(get_sheet_names(), fetch)
+    return merge_daily_counts(
+        [daily_counts(df, keys) for df in clients_data.values() if not df.empty],
+        keys,
+    )
+
+
+@timed_phase("aggregation")
+def build_trends(
+    counts, freq="daily", rolling=None, start_date=None, end_date=None, video_ids=None
+):
+    """
+    Construye la serie de tiempo por video remuestreando los conteos diarios.
+
+    Args:
+        counts (pd.DataFrame): Conteos devueltos por `daily_counts` o `merge_daily_counts`.
+        freq (str): 'daily', 'weekly' o 'monthly'.
+        rolling (int, opcional): Si se indica, agrega columnas '<Métrica>_Ventana' con la
+            suma de los últimos `rolling` periodos.
+        start_date (str, opcional): Fecha de inicio en formato YYYY-MM-DD. Si se indica
+            una sola de las dos fechas, la serie cubre solo ese día (como `filter_by_date`).
+        end_date (str, opcional): Fecha de fin en formato YYYY-MM-DD.
+        video_ids (list, opcional): Limitar la serie a estos videos.
+
+    Returns:
+        pd.DataFrame: Una fila por video y periodo con actividad, con las columnas
+                      'Video ID', 'Periodo' y las métricas.
+    """
+    columns = ["Video ID", "Periodo"] + TREND_METRICS
+    if rolling:
+        columns += [f"{metric}_Ventana" for metric in TREND_METRICS]
+
+    if video_ids:
+        counts = counts[counts.index.get_level_values("Video ID").isin(video_ids)]
+
+    # Mismo criterio que `filter_by_date`: una fecha sola filtra solo ese día
+    start_date = pd.to_datetime(start_date) if start_date else None
+    end_date = pd.to_datetime(end_date) if end_date else None
+    if start_date is None:
+        start_date = end_date
+    elif end_date is None:
+        end_date = start_date
+    elif start_date > end_date:
+        start_date, end_date = end_date, start_date
+
+    if start_date is not None:
+        fechas = counts.index.get_level_values("Fecha")
+        counts = counts[(fechas >= start_date) & (fechas <= end_date)]
+    if counts.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Una columna por (métrica, video) y una fila por día, con ceros en los días sin leads
+    wide = counts.unstack("Video ID", fill_value=0)
+    # Acotada a los días con datos para que un rango amplio no infle la tabla
+    days = pd.date_range(wide.index.min(), wide.index.max(), freq="D")
+    wide = wide.reindex(days, fill_value=0)
+
+    rule = TREND_FREQUENCIES[freq]
+    if rule != "D":
+        wide = wide.resample(rule, label="left", closed="left").sum()
+
+    result = wide.stack("Video ID", future_stack=True)
+    if rolling:
+        window = wide.rolling(rolling, min_periods=1).sum().astype(int)
+        result = result.join(
+            window.stack("Video ID", future_stack=True).add_suffix("_Ventana")
+        )
+
+    # Omitir los periodos sin actividad ni acumulado
+    result = result[(result != 0).any(axis=1)]
+    result.index.names = ["Periodo", "Video ID"]
+    result = result.reset_index().sort_values(["Video ID", "Periodo"])
+    result["Periodo"] = result["Periodo"].dt.strftime("%Y-%m-%d")
+    return result[columns]
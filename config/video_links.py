@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+import time
+import pandas as pd
+from config.data_notion import get_notion_data
+from config.resilience import get_or_compute_stale
+from config.shared_cache import get_or_compute, invalidate
+from config.timing import timed_phase
+
+# Índice de enlaces de video: une las exportaciones CSV de Notion de VIDEO_LINKS_DIR y el
+# catálogo en línea de Notion. Precedencia:
+#   1. Exportaciones completas ("X_all.csv"), que pisan a las parciales ("X.csv").
+#   2. Exportaciones parciales.
+#   3. Notion, solo para los IDs que no están en ningún CSV.
+# Las filas sin enlace no cuentan como respuesta y dejan pasar a la siguiente fuente.
+VIDEO_LINKS_DIR = os.getenv("VIDEO_LINKS_DIR", "dataLinksVideos")
+# Índice de los CSV ya compilado (JSON), para no volver a leerlos en cada arranque. Por
+# defecto en la raíz del proyecto, sin depender del directorio de trabajo
+VIDEO_LINKS_CACHE = os.getenv(
+    "VIDEO_LINKS_CACHE",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "video_links.json"
+    ),
+)
+# Segundos que se reutiliza el catálogo de Notion antes de volver a consultarlo; se
+# comparte entre los workers a través de la caché compartida
+NOTION_LINKS_TTL = int(os.getenv("NOTION_LINKS_TTL", "600"))
+# Espera antes de volver a consultar Notion si el catálogo vino vencido o falló
+NOTION_LINKS_RETRY = int(os.getenv("NOTION_LINKS_RETRY", "30"))
+
+_csv_lock = threading.Lock()
+_notion_lock = threading.Lock()
+_csv_index = {"signature": None, "links": None}
+_notion_index = {"loaded_at": None, "links": None}
+
+
+def _csv_files():
+    """
+    Lista las exportaciones CSV, con las completas (_all) al final para que tengan prioridad.
+    """
+    try:
+        entries = [
+            entry
+            for entry in os.scandir(VIDEO_LINKS_DIR)
+            if entry.name.endswith(".csv")
+        ]
+    except FileNotFoundError:
+        return []
+    return sorted(
+        entries, key=lambda entry: (entry.name.endswith("_all.csv"), entry.name)
+    )
+
+
+def _normalize_links(ids, links):
+    """
+    Arma el índice ID -> enlace, descartando IDs o enlaces vacíos. Ante IDs repetidos
+    gana el último.
+    """
+    ids = pd.Series(ids, dtype="string").str.strip().str.upper()
+    links = pd.Series(links, dtype="string").str.strip()
+    valid = (ids.fillna("") != "") & (links.fillna("") != "")
+    index = pd.Series(
+        links[valid].to_numpy(dtype=object), index=ids[valid].to_numpy(dtype=object)
+    )
+    return index[~index.index.duplicated(keep="last")]
+
+
+def compile_csv_links(paths: list):
+    """
+    Lee las exportaciones CSV y las une en un solo índice.
+
+    Args:
+        paths (list): Las rutas de los CSV, de menor a mayor prioridad.
+
+    Returns:
+        pd.Series: Los enlaces, con el ID del video como índice.
+    """
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path, dtype=str, usecols=lambda c: c in ("ID", "Link"))
+        if "ID" in df.columns and "Link" in df.columns:
+            frames.append(df)
+    if not frames:
+        return _normalize_links([], [])
+    df = pd.concat(frames, ignore_index=True)
+    return _normalize_links(df["ID"], df["Link"])
+
+
+def _load_compiled(signature):
+    # Cualquier problema con el archivo (corrupto, de otra versión, ilegible) solo
+    # obliga a recompilar los CSV
+    try:
+        with open(VIDEO_LINKS_CACHE, encoding="utf-8") as f:
+            compiled = json.load(f)
+        if compiled["signature"] != [list(item) for item in signature]:
+            return None
+        links = compiled["links"]
+        return pd.Series(
+            list(links.values()),
+            index=pd.Index(list(links), dtype=object),
+            dtype=object,
+        )
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Índice de enlaces compilado no válido, se recompila: {e}")
+        return None
+
+
+def _save_compiled(signature, links):
+    tmp_path = f"{VIDEO_LINKS_CACHE}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "links": links.to_dict()}, f)
+        os.replace(tmp_path, VIDEO_LINKS_CACHE)
+    except OSError as e:
+        print(f"Error guardando el índice de enlaces: {e}")
+
+
+def get_csv_links():
+    """
+    Devuelve el índice de enlaces de los CSV. Se recompila solo si cambió algún archivo
+    (nombre, fecha de modificación o tamaño); si no, se usa la versión compilada.
+
+    Returns:
+        pd.Series: Los enlaces, con el ID del video como índice.
+    """
+    entries = _csv_files()
+    signature = [
+        (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+        for entry in entries
+    ]
+    if _csv_index["signature"] == signature:
+        return _csv_index["links"]
+
+    with _csv_lock:
+        if _csv_index["signature"] != signature:
+            links = _load_compiled(signature)
+            if links is None:
+                links = compile_csv_links([entry.path for entry in entries])
+                _save_compiled(signature, links)
+            _csv_index["links"] = links
+            _csv_index["signature"] = signature
+    return _csv_index["links"]
+
+
+@timed_phase("notion_links")
+def get_notion_links(refresh: bool = False):
+    """
+    Devuelve el catálogo de enlaces de Notion, reutilizándolo durante `NOTION_LINKS_TTL` segundos.
+    Si Notion no responde se sigue usando el último catálogo (o uno vacío) y se vuelve a
+    intentar a los `NOTION_LINKS_RETRY` segundos.
+
+    Args:
+        refresh (bool): Si es True, vuelve a consultar Notion aunque el catálogo esté vigente.
+
+    Returns:
+        pd.Series: Los enlaces, con el ID del video como índice.
+    """
+    with _notion_lock:
+        loaded_at = _notion_index["loaded_at"]
+        if (
+            refresh
+            or loaded_at is None
+            or time.monotonic() - loaded_at > NOTION_LINKS_TTL
+        ):
+            try:
+                if refresh:
+                    invalidate("notion_links")
+                    links, created_at = get_or_compute(
+                        "notion_links",
+                        "catalog",
+                        fetch_notion_links,
+                        ttl=NOTION_LINKS_TTL,
+                    )
+                else:
+                    links, created_at = get_or_compute_stale(
+                        "notion_links", "catalog", fetch_notion_links, NOTION_LINKS_TTL
+                    )
+                age = time.time() - created_at
+            except Exception as e:
+                print(f"Error consultando los enlaces de Notion: {e}")
+                if _notion_index["links"] is None:
+                    _notion_index["links"] = pd.Series([], dtype=object)
+                links, age = _notion_index["links"], NOTION_LINKS_TTL
+            _notion_index["links"] = links
+            # La vigencia cuenta desde que se consultó Notion, aunque lo haya hecho otro
+            # worker; un catálogo vencido o fallido se vuelve a pedir en poco tiempo
+            age = min(age, NOTION_LINKS_TTL - NOTION_LINKS_RETRY)
+            _notion_index["loaded_at"] = time.monotonic() - age
+        return _notion_index["links"]
+
+
+def fetch_notion_links():
+    """
+    Descarga el catálogo de enlaces de Notion.
+
+    Returns:
+        pd.Series: Los enlaces, con el ID del video como índice.
+    """
+    data = get_notion_data()
+    return _normalize_links(
+        [item["ID"] for item in data], [item["Link"] for item in data]
+    )
+
+
+def lookup_links(video_ids):
+    """
+    Busca en bloque los enlaces de una columna de IDs de video. Notion solo se consulta
+    si algún ID no está en las exportaciones CSV.
+
+    Args:
+        video_ids (pd.Series): Los IDs de video.
+
+    Returns:
+        pd.Series: Los enlaces, con el mismo índice que `video_ids`; NaN si no hay enlace.
+    """
+    ids = video_ids.to_numpy(dtype=object)
+    links = pd.Series(pd.NA, index=video_ids.index, dtype=object)
+
+    csv_links = get_csv_links()
+    positions = csv_links.index.get_indexer(ids)
+    found = positions >= 0
+    links[found] = csv_links.to_numpy()[positions[found]]
+
+    if not found.all():
+        notion_links = get_notion_links()
+        missing = ~found
+        positions = notion_links.index.get_indexer(ids[missing])
+        # reindex deja NaN en las posiciones -1 (IDs que tampoco están en Notion)
+        values = pd.Series(notion_links.to_numpy(), dtype=object).reindex(positions)
+        links[missing] = values.to_numpy()
+    return links
+
+
+def get_video_links():
+    """
+    Devuelve todos los enlaces conocidos como diccionario, con la misma precedencia
+    que `lookup_links` (los CSV pisan a Notion).
+
+    Returns:
+        dict: Un diccionario con el 'ID' del video como clave y el 'Link' como valor.
+    """
+    links = get_notion_links().to_dict()
+    links.update(get_csv_links().to_dict())
+    return links
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+import importlib
+import os
+import time
+from config.data import get_client_locations, get_sheet_headers
+from config.metrics import STARTUP_SECONDS
+from config.process_pool import warm_pool
+from config.video_links import get_csv_links, get_notion_links
+
+# Precalentamiento opcional al arrancar un worker, para que las primeras peticiones
+# no paguen la carga de librerías, la lista de hojas ni el catálogo de enlaces.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "0") == "1"
+# Hojas (clientes) más consultadas, separadas por coma: se lee su encabezado
+WARMUP_TABS = [
+    tab.strip() for tab in os.getenv("WARMUP_TABS", "").split(",") if tab.strip()
+]
+# Tiempo máximo que el arranque espera al precalentamiento, en segundos
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "30"))
+
+# Librerías que se importan de forma diferida en el código de la API
+LAZY_IMPORTS = [
+    "googleapiclient.discovery",
+    "google.oauth2.service_account",
+    "notion_client",
+    "slack",
+    "duckdb",
+]
+
+
+def warm_imports():
+    """
+    Importa las librerías pesadas que la API carga recién en su primer uso.
+    """
+    for module_name in LAZY_IMPORTS:
+        importlib.import_module(module_name)
+
+
+def warm_tabs(tabs: list):
+    """
+    Resuelve la ubicación de las hojas más consultadas y deja su encabezado en caché.
+    """
+    locations = get_client_locations()
+    known = [tab for tab in tabs if tab in locations]
+    if known:
+        get_sheet_headers(known)
+
+
+def run_warmup(tabs: list = None, timeout: float = WARMUP_TIMEOUT):
+    """
+    Ejecuta en paralelo las tareas de precalentamiento y registra cuánto tardó cada una.
+    Los errores no detienen el arranque: solo se informan.
+
+    Args:
+        tabs (list, opcional): Las hojas a precalentar. Por defecto, `WARMUP_TABS`.
+        timeout (float): Segundos máximos de espera; las tareas que no terminan siguen en segundo plano.
+
+    Returns:
+        dict: La duración en segundos de cada tarea terminada, más 'total'.
+    """
+    tabs = WARMUP_TABS if tabs is None else tabs
+    tasks = {
+        "imports": warm_imports,
+        "sheet_list": lambda: get_client_locations(refresh=True),
+        "video_links": lambda: (get_csv_links(), get_notion_links()),
+        "tabs": lambda: warm_tabs(tabs),
+        "process_pool": warm_pool,
+    }
+    timings = {}
+
+    def timed(name, func):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            print(f"Error en el precalentamiento '{name}': {e}")
+        timings[name] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warmup")
+    wait(
+        [executor.submit(timed, name, func) for name, func in tasks.items()],
+        timeout=timeout,
+    )
+    executor.shutdown(wait=False)
+    # Solo las tareas que terminaron dentro del tiempo máximo
+    finished = dict(timings, total=time.perf_counter() - start)
+
+    for name, seconds in finished.items():
+        STARTUP_SECONDS.labels(f"warmup_{name}").set(seconds)
+    return finished
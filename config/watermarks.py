@@ -0,0 +1,330 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+import pandas as pd
+from config.data import (
+    APPOINTMENT_STAGES,
+    CLOSED_STAGES,
+    get_google_sheets_data,
+    get_google_sheets_rows,
+    get_sheet_names,
+    preprocess_data,
+    run_parallel,
+    uses_columns,
+)
+from config.process_pool import run_in_pool, use_process_pool
+from config.row_index import update_row_index
+from config.shared_cache import exclusive
+from config.video_links import lookup_links
+
+# Archivo donde se guardan las marcas de agua (watermarks) de cada cliente
+WATERMARK_FILE = os.getenv("WATERMARK_FILE", "watermarks.json")
+# Días hacia atrás que se vuelven a revisar en cada corrida: se releen todas las filas
+# desde la primera creada en ese periodo, para detectar cambios de etapa y filas borradas.
+# Debe cubrir los rangos de los resúmenes semanales y mensuales.
+WATERMARK_TRACK_DAYS = int(os.getenv("WATERMARK_TRACK_DAYS", "62"))
+# Cada cuántos días se hace una resincronización completa de la hoja
+WATERMARK_FULL_RESYNC_DAYS = int(os.getenv("WATERMARK_FULL_RESYNC_DAYS", "30"))
+
+# Separador de la llave "Video ID" + "Leyenda" en los agregados diarios
+KEY_SEPARATOR = "\x1f"
+
+
+def load_watermarks():
+    """
+    Carga las marcas de agua de todos los clientes desde el archivo local.
+
+    Returns:
+        dict: Un diccionario con el nombre del cliente como clave y su estado como valor.
+              Retorna un diccionario vacío si el archivo no existe o está corrupto.
+    """
+    try:
+        with open(WATERMARK_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_watermarks(watermarks: dict):
+    """
+    Guarda las marcas de agua de forma atómica (archivo temporal + reemplazo).
+
+    Args:
+        watermarks (dict): El estado de todos los clientes.
+    """
+    tmp_path = f"{WATERMARK_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermarks, f)
+    os.replace(tmp_path, WATERMARK_FILE)
+
+
+@uses_columns("UTM Content", "Stage", "Created at (fecha)")
+def _contributions(df):
+    """
+    Calcula el aporte de cada fila a los agregados diarios.
+
+    Args:
+        df (pd.DataFrame): Filas crudas de la hoja, con el número de fila como índice.
+
+    Returns:
+        pd.DataFrame: Un DataFrame con las columnas 'day', 'key', 'cita' y 'cierre' por fila.
+    """
+    # Los links no son necesarios para los agregados, se resuelven al resumir
+    processed = preprocess_data(df, video_links={})
+    created = pd.to_datetime(df["Created at (fecha)"], errors="coerce").dt.floor("d")
+    return pd.DataFrame(
+        {
+            "day": created.dt.strftime("%Y-%m-%d"),
+            "key": processed["Video ID"] + KEY_SEPARATOR + processed["Leyenda"],
+            "cita": processed["Stage"].isin(APPOINTMENT_STAGES).astype(int),
+            "cierre": processed["Stage"].isin(CLOSED_STAGES).astype(int),
+        },
+        index=df.index,
+    )
+
+
+def _apply(daily: dict, day, key, leads, citas, cierres):
+    """
+    Suma (o resta, con valores negativos) un aporte a los agregados diarios.
+    """
+    if day is None:
+        # Leads sin fecha de creación no entran en los resúmenes por rango
+        return
+    counts = daily.setdefault(day, {}).setdefault(key, [0, 0, 0])
+    counts[0] += leads
+    counts[1] += citas
+    counts[2] += cierres
+    if counts == [0, 0, 0]:
+        del daily[day][key]
+        if not daily[day]:
+            del daily[day]
+
+
+def _tracked_window():
+    """
+    Devuelve el primer día (YYYY-MM-DD) cuyos leads se vuelven a revisar en cada corrida.
+    """
+    return (datetime.now() - timedelta(days=WATERMARK_TRACK_DAYS)).strftime("%Y-%m-%d")
+
+
+def _client_lock(client: str):
+    """
+    Bloqueo entre workers de la sincronización de un cliente.
+    """
+    digest = hashlib.sha1(client.encode("utf-8")).hexdigest()[:16]
+    return exclusive(f"watermarks-{digest}")
+
+
+def sync_client(client: str, full: bool = False):
+    """
+    Procesa solo las filas nuevas o modificadas de un cliente desde la última corrida,
+    actualizando su marca de agua y sus agregados diarios.
+
+    Se releen todas las filas desde la primera creada en los últimos
+    `WATERMARK_TRACK_DAYS` días ('first_tracked'), más la fila anterior como ancla: si
+    el ancla cambió, se insertaron o borraron filas antes del periodo y se resincroniza
+    la hoja completa. Los agregados de días anteriores al periodo ('tracked_since') se
+    consideran estables hasta la siguiente resincronización completa.
+
+    Args:
+        client (str): El nombre del cliente (hoja) a sincronizar.
+        full (bool): Si es True, se reprocesa toda la hoja desde cero.
+
+    Returns:
+        pd.DataFrame: Las filas revisadas en esta corrida, con el número de fila como
+                      índice. En `df.attrs` se incluyen 'full_sync' (bool), la primera
+                      fila revisada ('first_row'; las anteriores no se leyeron) y las
+                      filas que pasaron a cita ('new_appointments') o a cierre
+                      ('new_closes') en esta corrida.
+    """
+    # El estado se lee, se compara con la hoja y se guarda con el cliente bloqueado,
+    # para que dos workers no notifiquen las mismas filas ni pisen sus agregados
+    with _client_lock(client):
+        return _sync_client(client, full)
+
+
+def _sync_client(client: str, full: bool):
+    state = load_watermarks().get(client)
+
+    full_sync_at = state.get("full_sync_at") if state else None
+    if (
+        full_sync_at is None
+        or "first_tracked" not in state
+        or datetime.now() - datetime.fromisoformat(full_sync_at)
+        > timedelta(days=WATERMARK_FULL_RESYNC_DAYS)
+    ):
+        full = True
+
+    if full:
+        state = {
+            "last_row": 1,
+            "first_tracked": 2,
+            "anchor": None,
+            "rows": {},
+            "daily": {},
+        }
+    first_tracked = first_read = state["first_tracked"]
+    df = get_google_sheets_rows(client, max(2, first_tracked - 1))
+
+    if not full:
+        # Si la hoja tiene menos filas que la marca, se borraron filas: resincronizar
+        if df.empty or df.index[-1] < state["last_row"]:
+            return _sync_client(client, full=True)
+        # Si el ancla cambió, las filas se movieron antes del periodo revisado
+        if first_tracked > 2 and _row_hash(df, first_tracked - 1) != state["anchor"]:
+            return _sync_client(client, full=True)
+
+    rows = state["rows"]
+    daily = state["daily"]
+    new_appointments = []
+    new_closes = []
+
+    tracked = df.loc[df.index >= first_tracked]
+    if not tracked.empty:
+        hashes = pd.util.hash_pandas_object(tracked, index=False)
+        changed = [
+            row
+            for row, row_hash in zip(tracked.index, hashes)
+            if rows.get(str(row), [None])[0] != int(row_hash)
+        ]
+
+        if changed:
+            # Resincronizaciones completas de hojas grandes: en el pool de procesos
+            if use_process_pool(len(changed)):
+                contributions = run_in_pool(_contributions, tracked.loc[changed])
+            else:
+                contributions = _contributions(tracked.loc[changed])
+            for row, day, key, cita, cierre in contributions.itertuples():
+                day = day if isinstance(day, str) else None
+                cita, cierre = int(cita), int(cierre)
+                old = rows.get(str(row))
+                if cita and not (old and old[3]):
+                    new_appointments.append(row)
+                if cierre and not (old and old[4]):
+                    new_closes.append(row)
+                if old:
+                    _apply(daily, old[1], old[2], -1, -old[3], -old[4])
+                _apply(daily, day, key, 1, cita, cierre)
+                rows[str(row)] = [int(hashes[row]), day, key, cita, cierre]
+
+        state["last_row"] = int(tracked.index[-1])
+        update_row_index(client, df, full)
+        created = pd.to_datetime(tracked["Created at (fecha)"], errors="coerce").max()
+        if pd.notna(created) and str(created) > state.get("last_timestamp", ""):
+            state["last_timestamp"] = str(created)
+
+    # El periodo revisado avanza con la fecha: empieza en la primera fila creada desde
+    # `tracked_since`. Las filas anteriores ya no se vuelven a leer.
+    tracked_since = _tracked_window()
+    recent = [int(row) for row, v in rows.items() if v[1] and v[1] >= tracked_since]
+    first_tracked = min(recent, default=state["last_row"] + 1)
+    state["rows"] = {row: v for row, v in rows.items() if int(row) >= first_tracked}
+    state["first_tracked"] = first_tracked
+    state["anchor"] = _row_hash(df, first_tracked - 1) if first_tracked > 2 else None
+    state["tracked_since"] = tracked_since
+    state["updated_at"] = datetime.now().isoformat()
+    if full:
+        state["full_sync_at"] = state["updated_at"]
+
+    # El archivo guarda a todos los clientes: otros pueden estar guardando a la vez
+    with exclusive("watermarks"):
+        watermarks = load_watermarks()
+        watermarks[client] = state
+        save_watermarks(watermarks)
+
+    tracked.attrs["full_sync"] = full
+    tracked.attrs["first_row"] = first_read
+    tracked.attrs["new_appointments"] = new_appointments
+    tracked.attrs["new_closes"] = new_closes
+    return tracked
+
+
+def _row_hash(df, row: int):
+    """
+    Devuelve el hash de una fila leída, o None si no está en `df`.
+    """
+    if row not in df.index:
+        return None
+    return int(pd.util.hash_pandas_object(df.loc[[row]], index=False).iloc[0])
+
+
+def sync_clients(clients=None):
+    """
+    Sincroniza de forma incremental todos los clientes, en paralelo.
+
+    Args:
+        clients (list, opcional): Los clientes a sincronizar. Por defecto, todas las hojas visibles.
+
+    Returns:
+        dict: Un diccionario con el nombre del cliente como clave y las filas leídas como valor.
+    """
+    if clients is None:
+        clients = get_sheet_names()
+    return dict(zip(clients, run_parallel(sync_client, clients)))
+
+
+def summarize_range(client: str, start_date, end_date, video_links=None):
+    """
+    Arma el resumen de leads, citas y cierres de un cliente a partir de los agregados diarios.
+    Si el rango empieza antes del periodo que se revisa en cada sincronización (o el
+    cliente no se sincronizó), los agregados podrían no tener los últimos cambios de
+    etapa y el resumen se calcula con la hoja completa.
+
+    Args:
+        client (str): El nombre del cliente.
+        start_date (datetime): Fecha de inicio del rango (inclusive).
+        end_date (datetime): Fecha de fin del rango (inclusive).
+        video_links (dict, opcional): Un diccionario de enlaces de video con el 'ID' como clave y el 'Link' como valor.
+
+    Returns:
+        pd.DataFrame: Un DataFrame con 'Video ID', 'Leyenda', 'Link', 'Leads', 'Citas' y 'Cierres'.
+    """
+    state = load_watermarks().get(client) or {}
+    first_day = start_date.strftime("%Y-%m-%d")
+    last_day = end_date.strftime("%Y-%m-%d")
+
+    if first_day >= state.get("tracked_since", "9999-12-31"):
+        daily = state["daily"]
+    else:
+        daily = _daily_from_sheet(client)
+
+    totals = {}
+    for day, keys in daily.items():
+        if first_day <= day <= last_day:
+            for key, counts in keys.items():
+                acc = totals.setdefault(key, [0, 0, 0])
+                for i in range(3):
+                    acc[i] += counts[i]
+
+    columns = ["Video ID", "Leyenda", "Link", "Leads", "Citas", "Cierres"]
+    if not totals:
+        return pd.DataFrame(columns=columns)
+
+    records = []
+    for key, (leads, citas, cierres) in totals.items():
+        video_id, leyenda = key.split(KEY_SEPARATOR, 1)
+        records.append([video_id, leyenda, leads, citas, cierres])
+    summary = pd.DataFrame(records, columns=["Video ID", "Leyenda"] + columns[3:])
+
+    if video_links is None:
+        links = lookup_links(summary["Video ID"])
+    else:
+        links = summary["Video ID"].map(video_links)
+    summary.insert(2, "Link", links.fillna("Sin enlace"))
+    return summary[columns]
+
+
+def _daily_from_sheet(client: str):
+    """
+    Calcula los agregados diarios de un cliente leyendo su hoja completa, sin tocar su
+    marca de agua.
+    """
+    df = get_google_sheets_data(client, columns=_contributions.required_columns)
+    daily = {}
+    if df.empty:
+        return daily
+    for _, day, key, cita, cierre in _contributions(df).itertuples():
+        day = day if isinstance(day, str) else None
+        _apply(daily, day, key, 1, int(cita), int(cierre))
+    return daily
@@ -0,0 +1,240 @@
+import re
+from datetime import date
+import numpy as np
+import pandas as pd
+from config.data import get_google_sheets_data
+from config.ranking import sort_values, top_k_order
+from config.timing import timed_phase
+from config.trends import (
+    TREND_METRICS,
+    daily_counts,
+    get_general_daily_counts,
+    merge_daily_counts,
+)
+
+# Ventanas de fechas lado a lado (por ejemplo 1d, 7d, 30d y mtd) calculadas en una
+# sola pasada: la hoja se descarga una vez desde el inicio de la ventana más antigua,
+# se agrupa en conteos diarios por video y cada ventana es la suma de sus días.
+#
+# Ventanas aceptadas, todas terminando en la fecha de referencia (inclusive):
+#   - Nd: los últimos N días (1d es solo la fecha de referencia).
+#   - wtd / mtd: desde el lunes de la semana / el día 1 del mes.
+#   - prev_<ventana>: el periodo anterior de la misma duración (prev_7d son los 7 días
+#     previos a 7d; prev_wtd y prev_mtd, la semana y el mes anteriores hasta el mismo día).
+MAX_WINDOWS = 8
+WINDOW_PATTERN = re.compile(r"^(prev_)?(?:(\d+)d|(wtd|mtd))$")
+
+GROUP_KEYS = ("Video ID", "Leyenda", "Link")
+
+# Análisis por cliente: métrica, ratio (leads por evento) y tasa (% de leads)
+WINDOW_ANALYSES = {
+    "closed": ("Cierres", "Ratio Cierre", "Tasa de Cierre"),
+    "appointments": ("Citas", "Ratio Citas", "Tasa de Citas"),
+}
+
+
+def _window_range(days, period, reference):
+    """
+    Devuelve el rango (inicio, fin) de una ventana que termina en `reference`.
+    """
+    if days is not None:
+        return reference - pd.Timedelta(days=int(days) - 1), reference
+    if period == "wtd":
+        return reference - pd.Timedelta(days=reference.weekday()), reference
+    return reference.replace(day=1), reference
+
+
+def _previous_range(days, period, reference):
+    """
+    Devuelve el periodo anterior, de la misma duración, a la ventana que termina en `reference`.
+    """
+    if period == "mtd":
+        # El mes anterior hasta el mismo día (o su último día, si es más corto)
+        start = reference.replace(day=1) - pd.DateOffset(months=1)
+        month_end = reference.replace(day=1) - pd.Timedelta(days=1)
+        return start, min(start + pd.Timedelta(days=reference.day - 1), month_end)
+    start, end = _window_range(days, period, reference)
+    # La semana anterior hasta el mismo día; si no, los días justo antes de la ventana
+    shift = (
+        pd.Timedelta(days=7) if period == "wtd" else end - start + pd.Timedelta(days=1)
+    )
+    return start - shift, end - shift
+
+
+def parse_windows(spec: str, end_date=None):
+    """
+    Interpreta la lista de ventanas de una consulta.
+
+    Args:
+        spec (str): Ventanas separadas por coma, por ejemplo "1d,7d,30d,mtd,prev_7d".
+        end_date (str, opcional): Fecha de referencia (YYYY-MM-DD). Por defecto, hoy.
+
+    Returns:
+        dict: Nombre de la ventana -> (inicio, fin) como pd.Timestamp, en el orden pedido.
+
+    Raises:
+        ValueError: Si alguna ventana no es válida o son demasiadas.
+    """
+    reference = pd.Timestamp(end_date or date.today()).normalize()
+    labels = []
+    for label in spec.split(","):
+        label = label.strip().lower()
+        if label and label not in labels:
+            labels.append(label)
+    if not labels:
+        raise ValueError("windows debe incluir al menos una ventana")
+    if len(labels) > MAX_WINDOWS:
+        raise ValueError(f"windows admite como máximo {MAX_WINDOWS} ventanas")
+
+    windows = {}
+    for label in labels:
+        match = WINDOW_PATTERN.match(label)
+        if match is None or match.group(2) is not None and int(match.group(2)) < 1:
+            raise ValueError(
+                f"Ventana no válida: '{label}'. Use Nd, wtd, mtd o prev_<ventana>"
+            )
+        previous, days, period = match.groups()
+        if previous:
+            windows[label] = _previous_range(days, period, reference)
+        else:
+            windows[label] = _window_range(days, period, reference)
+    return windows
+
+
+def windows_since(windows: dict):
+    """
+    Devuelve la fecha (YYYY-MM-DD) de inicio de la ventana más antigua.
+    """
+    return min(start for start, _ in windows.values()).strftime("%Y-%m-%d")
+
+
+@timed_phase("aggregation")
+def window_totals(counts, windows: dict, keys=GROUP_KEYS):
+    """
+    Suma los conteos diarios de cada ventana.
+
+    Args:
+        counts (pd.DataFrame): Conteos devueltos por `daily_counts`, indexados por (*keys, 'Fecha').
+        windows (dict): Ventanas devueltas por `parse_windows`.
+        keys (tuple): Las columnas por las que se agruparon los conteos.
+
+    Returns:
+        pd.DataFrame: Una fila por video con actividad en alguna ventana y las columnas
+                      '<Métrica>_<ventana>' (por ejemplo 'Leads_7d').
+    """
+    keys = list(keys)
+    fechas = counts.index.get_level_values("Fecha")
+    totals = []
+    for label, (start, end) in windows.items():
+        in_window = counts[(fechas >= start) & (fechas <= end)]
+        totals.append(in_window.groupby(level=keys).sum().add_suffix(f"_{label}"))
+
+    table = pd.concat(totals, axis=1).fillna(0).astype(int)
+    # Conservar solo los videos con leads en alguna ventana, como los análisis por rango
+    leads = table[[f"Leads_{label}" for label in windows]]
+    return table[(leads > 0).any(axis=1)]
+
+
+def _ratio(numerator, denominator):
+    numerator = numerator.to_numpy(dtype=float)
+    denominator = denominator.to_numpy(dtype=float)
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros_like(numerator),
+        where=denominator > 0,
+    )
+
+
+def windows_table(counts, windows: dict, analysis: str):
+    """
+    Arma la tabla de un análisis por cliente con un grupo de columnas por ventana.
+
+    Args:
+        counts (pd.DataFrame): Conteos diarios agrupados por 'Video ID', 'Leyenda' y 'Link'.
+        windows (dict): Ventanas devueltas por `parse_windows`.
+        analysis (str): 'closed' o 'appointments'.
+
+    Returns:
+        pd.DataFrame: 'Video ID', 'Leyenda', 'Link' y, por cada ventana, 'Leads_<ventana>',
+                      la métrica, su ratio y su tasa (por ejemplo 'Cierres_7d',
+                      'Ratio Cierre_7d' y 'Tasa de Cierre_7d'). Ordenada por la métrica
+                      de la primera ventana.
+    """
+    metric, ratio, rate = WINDOW_ANALYSES[analysis]
+    totals = window_totals(counts, windows)
+
+    table = totals.reset_index()[list(GROUP_KEYS)]
+    for label in windows:
+        leads = totals[f"Leads_{label}"]
+        values = totals[f"{metric}_{label}"]
+        table[f"Leads_{label}"] = leads.to_numpy()
+        table[f"{metric}_{label}"] = values.to_numpy()
+        table[f"{ratio}_{label}"] = _ratio(leads, values)
+        table[f"{rate}_{label}"] = _ratio(values, leads) * 100
+
+    first = next(iter(windows))
+    return table.sort_values(by=f"{metric}_{first}", ascending=False, kind="stable")
+
+
+def client_windows(analysis: str, client: str, spec: str, end_date=None):
+    """
+    Calcula un análisis de un cliente en varias ventanas con una sola descarga.
+
+    Args:
+        analysis (str): 'closed' o 'appointments'.
+        client (str): El nombre del cliente.
+        spec (str): Las ventanas, por ejemplo "1d,7d,30d,mtd".
+        end_date (str, opcional): Fecha de referencia (YYYY-MM-DD). Por defecto, hoy.
+
+    Returns:
+        pd.DataFrame: La tabla de `windows_table`.
+
+    Raises:
+        ValueError: Si las ventanas no son válidas.
+    """
+    windows = parse_windows(spec, end_date)
+    df = get_google_sheets_data(
+        client, columns=daily_counts.required_columns, since=windows_since(windows)
+    )
+    if df.empty:
+        counts = merge_daily_counts([], GROUP_KEYS)
+    else:
+        counts = daily_counts(df, GROUP_KEYS)
+    return windows_table(counts, windows, analysis)
+
+
+def general_windows(spec: str, end_date=None, sort_by="leads", limit=None, offset=0):
+    """
+    Calcula el rendimiento general de los videos de todos los clientes en varias
+    ventanas, con una sola descarga por cliente.
+
+    Args:
+        spec (str): Las ventanas, por ejemplo "7d,prev_7d".
+        end_date (str, opcional): Fecha de referencia (YYYY-MM-DD). Por defecto, hoy.
+        sort_by (str): Criterio de orden (ver `SORT_OPTIONS`), sobre la primera ventana.
+        limit (int, opcional): Cantidad máxima de videos. Por defecto, todos.
+        offset (int): Cantidad de videos a saltar desde el primero del ranking.
+
+    Returns:
+        tuple: La página con 'Video ID', 'Leyenda', 'Link' y 'Leads_Totales_<ventana>',
+               'Citas_Totales_<ventana>' y 'Cierres_Totales_<ventana>' por ventana, y
+               la cantidad total de videos.
+
+    Raises:
+        ValueError: Si las ventanas no son válidas.
+    """
+    windows = parse_windows(spec, end_date)
+    counts = get_general_daily_counts(windows_since(windows), GROUP_KEYS)
+    totals = window_totals(counts, windows)
+
+    table = totals.reset_index()[list(GROUP_KEYS)]
+    for label in windows:
+        for metric in TREND_METRICS:
+            table[f"{metric}_Totales_{label}"] = totals[f"{metric}_{label}"].to_numpy()
+
+    first = next(iter(windows))
+    k = None if limit is None else offset + limit
+    order = top_k_order(sort_values(table, sort_by, f"_{first}"), k)
+    end = None if limit is None else offset + limit
+    return table.iloc[order[offset:end]], len(table)
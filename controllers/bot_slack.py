@@ -1,20 +1,139 @@
 from config.bot_slack import *
 from config.data import (
-    get_sheet_names,
     analyze_appointments_data,
     analyze_closed_data,
-    get_google_sheets_data,
+    get_sheet_chunk,
+    get_sheet_headers,
+    required_columns,
+    run_parallel,
 )
+from config.watermarks import summarize_range, sync_clients
 from datetime import datetime, timedelta
 import re
 import pandas as pd
 
 
-def send_daily_appointments_alert():
+def filter_daily_rows(df, date):
+    """
+    Filtra las filas creadas o con cita en la fecha indicada.
+
+    Args:
+        df (pd.DataFrame): Filas crudas de la hoja de un cliente.
+        date (datetime): El día a filtrar (sin hora).
+
+    Returns:
+        pd.DataFrame: Las filas cuyo 'Created at (fecha)' o 'Dia de cita' coincide con la fecha.
+    """
+    df = df.copy()
+
+    df["Created at (fecha)"] = pd.to_datetime(df["Created at (fecha)"], errors="coerce")
+    df["Dia de cita"] = parse_appointment_day(df["Dia de cita"])
+
+    # Que la fecha solo tenga día, mes y año (sin hora)
+    df["Created at (fecha)"] = df["Created at (fecha)"].dt.floor("d")
+
+    # Filtrar los datos para la fecha proporcionada
+    return df.loc[(df["Created at (fecha)"] == date) | (df["Dia de cita"] == date)]
+
+
+def parse_appointment_day(values):
+    """
+    Convierte la columna 'Dia de cita' (por ejemplo "August 01, 2024") a fechas sin hora.
+
+    Args:
+        values (pd.Series): Los valores crudos de la columna.
+
+    Returns:
+        pd.Series: Las fechas; NaT si el valor no es una fecha.
+    """
+    # Limpieza y conversión de 'Dia de cita'
+    values = values.astype(str).str.strip()
+    values = values.replace(r"[^\w\s,]", "", regex=True)
+    return pd.to_datetime(values, format="%B %d, %Y", errors="coerce").dt.floor("d")
+
+
+# Columnas que usan los resúmenes diarios
+DAILY_ALERT_COLUMNS = ["Created at (fecha)", "Dia de cita"] + required_columns(
+    analyze_appointments_data, analyze_closed_data
+)
+
+
+def fetch_daily_rows(synced: dict, date):
+    """
+    Arma las filas que usan los resúmenes diarios a partir de la sincronización de las
+    marcas de agua, sin volver a descargar las hojas.
+
+    Las filas del periodo revisado (`WATERMARK_TRACK_DAYS`, que incluye el día resumido)
+    ya vienen en `synced`. Un lead más viejo puede tener su cita en el día resumido: de
+    las filas anteriores se lee solo la columna 'Dia de cita', y el resto de las columnas
+    únicamente del tramo donde hay citas en esa fecha.
+
+    Args:
+        synced (dict): Las filas revisadas de cada cliente, como las devuelve `sync_clients`.
+        date (datetime): El día resumido (sin hora).
+
+    Returns:
+        dict: Un diccionario con el nombre del cliente como clave y su DataFrame como valor.
+    """
+
+    def daily_rows(client):
+        tracked = synced[client]
+        columns = [column for column in DAILY_ALERT_COLUMNS if column in tracked]
+        rows = tracked[columns]
+        first_row = tracked.attrs.get("first_row", 2)
+        if first_row <= 2:
+            return rows
+
+        header = get_sheet_headers([client])[client]
+        if "Dia de cita" not in header:
+            return rows
+        days = get_sheet_chunk(client, header, ["Dia de cita"], 2, first_row - 1)
+        if days.empty:
+            return rows
+        matches = days.index[parse_appointment_day(days["Dia de cita"]) == date]
+        if matches.empty:
+            return rows
+
+        columns = [column for column in DAILY_ALERT_COLUMNS if column in header]
+        old = get_sheet_chunk(
+            client, header, columns, int(matches.min()), int(matches.max())
+        )
+        return pd.concat([old.loc[old.index.isin(matches)], rows])
+
+    clients = list(synced)
+    return dict(zip(clients, run_parallel(daily_rows, clients)))
+
+
+def format_client_message(client, df, column):
+    """
+    Arma el bloque del mensaje de Slack de un cliente con una línea por video.
+
+    Args:
+        client (str): El nombre del cliente.
+        df (pd.DataFrame): Resultados por video con 'Video ID', 'Leyenda' y 'Link'.
+        column (str): La columna con el conteo a mostrar ('Citas' o 'Cierres').
+
+    Returns:
+        str: El bloque de texto del cliente.
+    """
+    message = f"*{client}:*\n"
+    for _, row in df.iterrows():
+        leyenda = f" ({row['Leyenda']})" if row["Leyenda"] else ""
+        link = row["Link"] if pd.notna(row["Link"]) else "Sin enlace"
+        video_text = f"<{link}|Ver video>" if link != "Sin enlace" else "Sin enlace"
+        message += f"  • {row['Video ID']}{leyenda}, {column}: *{row[column]}* - {video_text}\n"
+    return message
+
+
+def send_daily_appointments_alert(client_rows=None):
     """
     Envía un resumen diario de las citas a Slack, solo si hay citas relevantes.
     Si no hubo leads analizables para ningún cliente, envía una alerta.
 
+    Args:
+        client_rows (dict, opcional): Las filas de cada cliente armadas con
+            `fetch_daily_rows`. Si no se pasan, se sincronizan los clientes.
+
     Returns:
         None: Esta función no retorna valores, solo envía notificaciones a Slack.
     """
@@ -22,34 +141,16 @@ def send_daily_appointments_alert():
     date = (datetime.now() - timedelta(days=1)).replace(
         hour=0, minute=0, second=0, microsecond=0
     )
-    clients = get_sheet_names()
+    if client_rows is None:
+        client_rows = fetch_daily_rows(sync_clients(), date)
 
     final_message = f"*Resumen de citas diario {date.strftime('%m/%d/%Y')}:* <@U053520KZ4P> <@U07F0LZGA4F>\n"
     send_message = False
 
-    for client in clients:
-        df = get_google_sheets_data(client)
-        df = df.copy()
-
-        df["Created at (fecha)"] = pd.to_datetime(
-            df["Created at (fecha)"], errors="coerce"
-        )
-
-        # Limpieza y conversión de 'Dia de cita'
-        df["Dia de cita"] = df["Dia de cita"].str.strip()
-        df["Dia de cita"] = df["Dia de cita"].replace(r"[^\w\s,]", "", regex=True)
-        df["Dia de cita"] = pd.to_datetime(
-            df["Dia de cita"], format="%B %d, %Y", errors="coerce"
-        )
-
-        # Que la fecha solo tenga día, mes y año (sin hora)
-        df["Created at (fecha)"] = df["Created at (fecha)"].dt.floor("d")
-        df["Dia de cita"] = df["Dia de cita"].dt.floor("d")
-
-        # Filtrar los datos para la fecha proporcionada
-        df_filtered = df.loc[
-            (df["Created at (fecha)"] == date) | (df["Dia de cita"] == date)
-        ]
+    for client, df in client_rows.items():
+        if df.empty:
+            continue
+        df_filtered = filter_daily_rows(df, date)
 
         if not df_filtered.empty:
             appointments = analyze_appointments_data(df_filtered)
@@ -58,14 +159,7 @@ def send_daily_appointments_alert():
             if not appointments.empty:
                 # Si hay citas relevantes, añadirlas al mensaje
                 send_message = True
-                message = f"*{client}:*\n"
-                for _, row in appointments.iterrows():
-                    leyenda = f" ({row['Leyenda']})" if row["Leyenda"] else ""
-                    link = row["Link"] if pd.notna(row["Link"]) else "Sin enlace"
-                    video_text = (
-                        f"<{link}|Ver video>" if link != "Sin enlace" else "Sin enlace"
-                    )
-                    message += f"  • {row['Video ID']}{leyenda}, Citas: *{row['Citas']}* - {video_text}\n"
+                message = format_client_message(client, appointments, "Citas")
                 final_message += message + "\n"
 
     # Verificamos
@@ -77,11 +171,15 @@ def send_daily_appointments_alert():
         print(send_slack_notifications(["#creativos-citas"], alert_message))
 
 
-def send_daily_closed_alert():
+def send_daily_closed_alert(client_rows=None):
     """
     Envía un resumen diario de los cierres a Slack, solo si hay cierres relevantes.
     Si no hubo leads analizables para ningún cliente, envía una alerta.
 
+    Args:
+        client_rows (dict, opcional): Las filas de cada cliente armadas con
+            `fetch_daily_rows`. Si no se pasan, se sincronizan los clientes.
+
     Returns:
         None: Esta función no retorna valores, solo envía notificaciones a Slack.
     """
@@ -89,32 +187,16 @@ def send_daily_closed_alert():
     date = (datetime.now() - timedelta(days=1)).replace(
         hour=0, minute=0, second=0, microsecond=0
     )
-    clients = get_sheet_names()
+    if client_rows is None:
+        client_rows = fetch_daily_rows(sync_clients(), date)
 
     final_message = f"*Resumen de cierres diario {date.strftime('%m/%d/%Y')}:* <@U053520KZ4P> <@U07F0LZGA4F>\n"
     send_message = False
 
-    for client in clients:
-        df = get_google_sheets_data(client)
-        df = df.copy()
-
-        df["Created at (fecha)"] = pd.to_datetime(
-            df["Created at (fecha)"], errors="coerce"
-        )
-
-        # Limpieza y conversión de 'Dia de cita'
-        df["Dia de cita"] = df["Dia de cita"].str.strip()
-        df["Dia de cita"] = df["Dia de cita"].replace(r"[^\w\s,]", "", regex=True)
-        df["Dia de cita"] = pd.to_datetime(
-            df["Dia de cita"], format="%B %d, %Y", errors="coerce"
-        )
-
-        df["Created at (fecha)"] = df["Created at (fecha)"].dt.floor("d")
-        df["Dia de cita"] = df["Dia de cita"].dt.floor("d")
-
-        df_filtered = df.loc[
-            (df["Created at (fecha)"] == date) | (df["Dia de cita"] == date)
-        ]
+    for client, df in client_rows.items():
+        if df.empty:
+            continue
+        df_filtered = filter_daily_rows(df, date)
 
         if not df_filtered.empty:
             closed = analyze_closed_data(df_filtered)
@@ -123,14 +205,7 @@ def send_daily_closed_alert():
             if not closed.empty:
                 # Si hay cierres relevantes, añadirlos al mensaje
                 send_message = True
-                message = f"*{client}:*\n"
-                for _, row in closed.iterrows():
-                    leyenda = f" ({row['Leyenda']})" if row["Leyenda"] else ""
-                    link = row["Link"] if pd.notna(row["Link"]) else "Sin enlace"
-                    video_text = (
-                        f"<{link}|Ver video>" if link != "Sin enlace" else "Sin enlace"
-                    )
-                    message += f"  • {row['Video ID']}{leyenda}, Cierres: *{row['Cierres']}* - {video_text}\n"
+                message = format_client_message(client, closed, "Cierres")
                 final_message += message + "\n"
 
     if send_message:
@@ -142,144 +217,86 @@ def send_daily_closed_alert():
 
 
 def send_daily_alerts():
-    send_daily_appointments_alert()
-    send_daily_closed_alert()
+    """
+    Sincroniza las marcas de agua (solo se leen las filas del periodo revisado) y con
+    esas mismas filas envía los resúmenes diarios de citas y cierres. La sincronización
+    deja listos los agregados de los resúmenes semanales y mensuales.
+    """
+    date = (datetime.now() - timedelta(days=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    client_rows = fetch_daily_rows(sync_clients(), date)
+    send_daily_appointments_alert(client_rows)
+    send_daily_closed_alert(client_rows)
 
 
-def send_weekly_appointments_alert():
+def send_range_alert(start_date, end_date, column, channel, title, clients=None):
     """
-    Envía un resumen semanal de las citas a Slack, solo si hay citas relevantes.
+    Envía un resumen de citas o cierres de un rango de fechas armado desde los
+    agregados diarios incrementales, solo si hay resultados relevantes.
     Si no hubo leads analizables para ningún cliente, envía una alerta.
 
+    Args:
+        start_date (datetime): Fecha de inicio del rango.
+        end_date (datetime): Fecha de fin del rango.
+        column (str): La columna a resumir ('Citas' o 'Cierres').
+        channel (str): El canal de Slack al que se envía el resumen.
+        title (str): El título del resumen, por ejemplo "Resumen semanal de citas".
+        clients (list, opcional): Los clientes ya sincronizados. Si no se pasan,
+            se sincronizan todos los clientes antes de resumir.
+
     Returns:
         None: Esta función no retorna valores, solo envía notificaciones a Slack.
     """
-    end_date = datetime.now() - timedelta(days=1)
-    start_date = end_date - timedelta(days=6)
-
-    start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_date = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-
     start_date_str = start_date.strftime("%m/%d/%Y")
     end_date_str = end_date.strftime("%m/%d/%Y")
 
-    clients = get_sheet_names()
+    # Procesar solo lo nuevo desde la última corrida antes de resumir
+    if clients is None:
+        clients = list(sync_clients())
 
-    final_message = f"*Resumen semanal de citas ({start_date_str} - {end_date_str}):* <@U053520KZ4P> <@U07F0LZGA4F>\n"
-    send_message = False  # Variable para controlar si se envía el mensaje o no
+    final_message = f"*{title} ({start_date_str} - {end_date_str}):* <@U053520KZ4P> <@U07F0LZGA4F>\n"
+    send_message = False
 
     for client in clients:
-        df = get_google_sheets_data(client)
-        df = df.copy()
-
-        df["Created at (fecha)"] = pd.to_datetime(
-            df["Created at (fecha)"], errors="coerce"
+        summary = summarize_range(client, start_date, end_date)
+        summary = summary.loc[summary[column] != 0].sort_values(
+            by=column, ascending=False
         )
-        df["Created at (fecha)"] = df["Created at (fecha)"].dt.floor("d")
 
-        # Filtrar los datos para el rango de fechas
-        df_filtered = df.loc[
-            (df["Created at (fecha)"] >= start_date)
-            & (df["Created at (fecha)"] <= end_date)
-        ]
-
-        if not df_filtered.empty:
-            appointments = analyze_appointments_data(df_filtered)
-            appointments = appointments.loc[appointments["Citas"] != 0]
-
-            if not appointments.empty:
-                send_message = True
-                message = f"*{client}:*\n"
-                for _, row in appointments.iterrows():
-                    leyenda = f" ({row['Leyenda']})" if row["Leyenda"] else ""
-                    link = row["Link"] if pd.notna(row["Link"]) else "Sin enlace"
-                    video_text = (
-                        f"<{link}|Ver video>" if link != "Sin enlace" else "Sin enlace"
-                    )
-                    message += f"  • {row['Video ID']}{leyenda}, Citas: *{row['Citas']}* - {video_text}\n"
-                final_message += message + "\n"
+        if not summary.empty:
+            send_message = True
+            message = format_client_message(client, summary, column)
+            final_message += message + "\n"
 
     if send_message:
-        print(send_slack_notifications(["#creativos-citas"], final_message))
+        print(send_slack_notifications([channel], final_message))
     else:
         alert_message = f"*No hubo leads analizables entre el {start_date_str} y el {end_date_str} para ningún cliente.*"
-        print(send_slack_notifications(["#creativos-citas"], alert_message))
+        print(send_slack_notifications([channel], alert_message))
 
 
-def send_weekly_closed_alert():
+def get_weekly_range():
     """
-    Envía un resumen semanal de los cierres a Slack, solo si hay cierres relevantes.
-    Si no hubo leads analizables para ningún cliente, envía una alerta.
+    Calcula el rango de los últimos 7 días completos (hasta ayer).
 
     Returns:
-        None: Esta función no retorna valores, solo envía notificaciones a Slack.
+        tuple: Fecha de inicio y fecha de fin del rango.
     """
     end_date = datetime.now() - timedelta(days=1)
     start_date = end_date - timedelta(days=6)
 
     start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
     end_date = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return start_date, end_date
 
-    start_date_str = start_date.strftime("%m/%d/%Y")
-    end_date_str = end_date.strftime("%m/%d/%Y")
 
-    clients = get_sheet_names()
-
-    final_message = f"*Resumen semanal de cierres ({start_date_str} - {end_date_str}):* <@U053520KZ4P> <@U07F0LZGA4F>\n"
-    send_message = False
-
-    for client in clients:
-        df = get_google_sheets_data(client)
-        df = df.copy()
-
-        df["Created at (fecha)"] = pd.to_datetime(
-            df["Created at (fecha)"], errors="coerce"
-        )
-        df["Created at (fecha)"] = df["Created at (fecha)"].dt.floor("d")
-
-        df_filtered = df.loc[
-            (df["Created at (fecha)"] >= start_date)
-            & (df["Created at (fecha)"] <= end_date)
-        ]
-
-        if not df_filtered.empty:
-            closed = analyze_closed_data(df_filtered)
-            closed = closed.loc[closed["Cierres"] != 0]
-
-            if not closed.empty:
-                send_message = True
-                message = f"*{client}:*\n"
-                for _, row in closed.iterrows():
-                    leyenda = f" ({row['Leyenda']})" if row["Leyenda"] else ""
-                    link = row["Link"] if pd.notna(row["Link"]) else "Sin enlace"
-                    video_text = (
-                        f"<{link}|Ver video>" if link != "Sin enlace" else "Sin enlace"
-                    )
-                    message += f"  • {row['Video ID']}{leyenda}, Cierres: *{row['Cierres']}* - {video_text}\n"
-                final_message += message + "\n"
-
-    if send_message:
-        print(send_slack_notifications(["#creativos-cierres"], final_message))
-    else:
-        alert_message = f"*No hubo leads analizables entre el {start_date_str} y el {end_date_str} para ningún cliente.*"
-        print(send_slack_notifications(["#creativos-cierres"], alert_message))
-
-
-def send_weekly_alerts():
-    """
-    Envía los resúmenes semanales de citas y cierres a sus respectivos canales en Slack.
-    """
-    send_weekly_appointments_alert()
-    send_weekly_closed_alert()
-
-
-def send_monthly_appointments_alert():
+def get_monthly_range():
     """
-    Envía un resumen mensual de las citas a Slack, solo si hay citas relevantes.
-    Si no hubo leads analizables para ningún cliente, envía una alerta.
+    Calcula el rango del mes calendario anterior.
 
     Returns:
-        None: Esta función no retorna valores, solo envía notificaciones a Slack.
+        tuple: Fecha de inicio y fecha de fin del rango.
     """
     now = datetime.now()
     start_date = (now.replace(day=1) - timedelta(days=1)).replace(
@@ -288,112 +305,104 @@ def send_monthly_appointments_alert():
     end_date = now.replace(
         day=1, hour=23, minute=59, second=59, microsecond=999999
     ) - timedelta(days=1)
+    return start_date, end_date
 
-    start_date_str = start_date.strftime("%m/%d/%Y")
-    end_date_str = end_date.strftime("%m/%d/%Y")
-
-    clients = get_sheet_names()
 
-    final_message = f"*Resumen mensual de citas ({start_date_str} - {end_date_str}):* <@U053520KZ4P> <@U07F0LZGA4F>\n"
-    send_message = False
-
-    for client in clients:
-        df = get_google_sheets_data(client)
-        df = df.copy()
-
-        df["Created at (fecha)"] = pd.to_datetime(
-            df["Created at (fecha)"], errors="coerce"
-        )
-        df["Created at (fecha)"] = df["Created at (fecha)"].dt.floor("d")
-
-        df_filtered = df.loc[
-            (df["Created at (fecha)"] >= start_date)
-            & (df["Created at (fecha)"] <= end_date)
-        ]
-
-        if not df_filtered.empty:
-            appointments = analyze_appointments_data(df_filtered)
-            appointments = appointments.loc[appointments["Citas"] != 0]
+def send_weekly_appointments_alert(clients=None):
+    """
+    Envía un resumen semanal de las citas a Slack, solo si hay citas relevantes.
+    Si no hubo leads analizables para ningún cliente, envía una alerta.
 
-            if not appointments.empty:
-                send_message = True
-                message = f"*{client}:*\n"
-                for _, row in appointments.iterrows():
-                    leyenda = f" ({row['Leyenda']})" if row["Leyenda"] else ""
-                    link = row["Link"] if pd.notna(row["Link"]) else "Sin enlace"
-                    video_text = (
-                        f"<{link}|Ver video>" if link != "Sin enlace" else "Sin enlace"
-                    )
-                    message += f"  • {row['Video ID']}{leyenda}, Citas: *{row['Citas']}* - {video_text}\n"
-                final_message += message + "\n"
+    Args:
+        clients (list, opcional): Los clientes ya sincronizados en esta corrida.
 
-    if send_message:
-        print(send_slack_notifications(["#creativos-citas"], final_message))
-    else:
-        alert_message = f"*No hubo leads analizables entre el {start_date_str} y el {end_date_str} para ningún cliente.*"
-        print(send_slack_notifications(["#creativos-citas"], alert_message))
+    Returns:
+        None: Esta función no retorna valores, solo envía notificaciones a Slack.
+    """
+    start_date, end_date = get_weekly_range()
+    send_range_alert(
+        start_date,
+        end_date,
+        "Citas",
+        "#creativos-citas",
+        "Resumen semanal de citas",
+        clients,
+    )
 
 
-def send_monthly_closed_alert():
+def send_weekly_closed_alert(clients=None):
     """
-    Envía un resumen mensual de los cierres a Slack, solo si hay cierres relevantes.
+    Envía un resumen semanal de los cierres a Slack, solo si hay cierres relevantes.
     Si no hubo leads analizables para ningún cliente, envía una alerta.
 
+    Args:
+        clients (list, opcional): Los clientes ya sincronizados en esta corrida.
+
     Returns:
         None: Esta función no retorna valores, solo envía notificaciones a Slack.
     """
-    now = datetime.now()
-    start_date = (now.replace(day=1) - timedelta(days=1)).replace(
-        day=1, hour=0, minute=0, second=0, microsecond=0
+    start_date, end_date = get_weekly_range()
+    send_range_alert(
+        start_date,
+        end_date,
+        "Cierres",
+        "#creativos-cierres",
+        "Resumen semanal de cierres",
+        clients,
     )
-    end_date = now.replace(
-        day=1, hour=23, minute=59, second=59, microsecond=999999
-    ) - timedelta(days=1)
 
-    start_date_str = start_date.strftime("%m/%d/%Y")
-    end_date_str = end_date.strftime("%m/%d/%Y")
 
-    clients = get_sheet_names()
+def send_weekly_alerts():
+    """
+    Envía los resúmenes semanales de citas y cierres a sus respectivos canales en Slack.
+    """
+    clients = list(sync_clients())
+    send_weekly_appointments_alert(clients)
+    send_weekly_closed_alert(clients)
 
-    final_message = f"*Resumen mensual de cierres ({start_date_str} - {end_date_str}):* <@U053520KZ4P> <@U07F0LZGA4F>\n"
-    send_message = False
 
-    for client in clients:
-        df = get_google_sheets_data(client)
-        df = df.copy()
+def send_monthly_appointments_alert(clients=None):
+    """
+    Envía un resumen mensual de las citas a Slack, solo si hay citas relevantes.
+    Si no hubo leads analizables para ningún cliente, envía una alerta.
 
-        df["Created at (fecha)"] = pd.to_datetime(
-            df["Created at (fecha)"], errors="coerce"
-        )
-        df["Created at (fecha)"] = df["Created at (fecha)"].dt.floor("d")
+    Args:
+        clients (list, opcional): Los clientes ya sincronizados en esta corrida.
 
-        df_filtered = df.loc[
-            (df["Created at (fecha)"] >= start_date)
-            & (df["Created at (fecha)"] <= end_date)
-        ]
+    Returns:
+        None: Esta función no retorna valores, solo envía notificaciones a Slack.
+    """
+    start_date, end_date = get_monthly_range()
+    send_range_alert(
+        start_date,
+        end_date,
+        "Citas",
+        "#creativos-citas",
+        "Resumen mensual de citas",
+        clients,
+    )
 
-        if not df_filtered.empty:
-            closed = analyze_closed_data(df_filtered)
-            closed = closed.loc[closed["Cierres"] != 0]
 
-            if not closed.empty:
-                send_message = True
-                message = f"*{client}:*\n"
-                for _, row in closed.iterrows():
-                    leyenda = f" ({row['Leyenda']})" if row["Leyenda"] else ""
-                    link = row["Link"] if pd.notna(row["Link"]) else "Sin enlace"
-                    video_text = (
-                        f"<{link}|Ver video>" if link != "Sin enlace" else "Sin enlace"
-                    )
-                    message += f"  • {row['Video ID']}{leyenda}, Cierres: *{row['Cierres']}* - {video_text}\n"
-                final_message += message + "\n"
+def send_monthly_closed_alert(clients=None):
+    """
+    Envía un resumen mensual de los cierres a Slack, solo si hay cierres relevantes.
+    Si no hubo leads analizables para ningún cliente, envía una alerta.
 
-    if send_message:
-        print(send_slack_notifications(["#creativos-cierres"], final_message))
-    else:
-        # Enviar alerta si no hubo leads analizables
-        alert_message = f"*No hubo leads analizables entre el {start_date_str} y el {end_date_str} para ningún cliente.*"
-        print(send_slack_notifications(["#creativos-cierres"], alert_message))
+    Args:
+        clients (list, opcional): Los clientes ya sincronizados en esta corrida.
+
+    Returns:
+        None: Esta función no retorna valores, solo envía notificaciones a Slack.
+    """
+    start_date, end_date = get_monthly_range()
+    send_range_alert(
+        start_date,
+        end_date,
+        "Cierres",
+        "#creativos-cierres",
+        "Resumen mensual de cierres",
+        clients,
+    )
 
 
 def send_monthly_alerts():
@@ -401,5 +410,6 @@ def send_monthly_alerts():
     Envía los resúmenes mensuales de citas y cierres a sus respectivos canales en Slack,
     solo si hay citas o cierres relevantes.
     """
-    send_monthly_appointments_alert()
-    send_monthly_closed_alert()
+    clients = list(sync_clients())
+    send_monthly_appointments_alert(clients)
+    send_monthly_closed_alert(clients)
@@ -0,0 +1,182 @@
+from config.bot_slack import send_slack_notifications
+from config.data import (
+    analyze_appointments_data,
+    analyze_closed_data,
+    get_client_locations,
+    get_column_fingerprints,
+    get_spreadsheet_versions,
+)
+from config.watermarks import sync_client
+from config.ranking import mark_data_changed
+from config.precompute import PRECOMPUTE_ENABLED, precompute_clients
+from config.shared_cache import invalidate, try_exclusive
+from config.metrics import timed_job
+from config.quota import background_priority
+from controllers.bot_slack import format_client_message
+from googleapiclient.errors import HttpError
+from os import getenv
+import threading
+import time
+
+# Intervalo de sondeo en segundos: se acorta al detectar cambios y se alarga en reposo
+WATCHER_MIN_INTERVAL = float(getenv("WATCHER_MIN_INTERVAL", "60"))
+WATCHER_MAX_INTERVAL = float(getenv("WATCHER_MAX_INTERVAL", "900"))
+WATCHER_BACKOFF = float(getenv("WATCHER_BACKOFF", "1.5"))
+
+
+class SheetWatcher:
+    """
+    Vigila el documento de Google Sheets y envía a Slack las citas y cierres nuevos
+    pocos minutos después de que se registran.
+
+    En cada sondeo solo se consulta la versión de cada documento del registro en Drive.
+    Si alguno cambió, se calcula una huella de la columna 'Stage' de sus hojas (una
+    lectura por documento) y únicamente las hojas que cambiaron se sincronizan de
+    forma incremental.
+
+    Con varios workers solo uno sondea: el que toma el bloqueo 'sheet-watcher'. Los
+    demás reintentan cada `WATCHER_MIN_INTERVAL` segundos y toman el relevo si ese
+    worker se detiene.
+    """
+
+    def __init__(self):
+        self.poll = timed_job("sheet_watcher", self.poll_once)
+        self.interval = WATCHER_MIN_INTERVAL
+        self._versions = {}
+        self._fingerprints = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self):
+        """
+        Ejecuta un sondeo: detecta las hojas que cambiaron y notifica sus citas y cierres nuevos.
+
+        Returns:
+            list: Los nombres de las hojas que cambiaron desde el sondeo anterior.
+        """
+        versions = get_spreadsheet_versions()
+        changed_spreadsheets = {
+            spreadsheet_id
+            for spreadsheet_id, version in versions.items()
+            if self._versions.get(spreadsheet_id) != version
+        }
+        if not changed_spreadsheets:
+            return []
+
+        clients = [
+            name
+            for name, location in get_client_locations(refresh=True).items()
+            if location["spreadsheet_id"] in changed_spreadsheets
+        ]
+        fingerprints = get_column_fingerprints(clients)
+        changed = [
+            name
+            for name, fingerprint in fingerprints.items()
+            if self._fingerprints.get(name) != fingerprint
+        ]
+        first_poll = not self._versions
+        self._versions = versions
+        self._fingerprints.update(fingerprints)
+
+        # En el primer sondeo solo se toma la línea base, sin notificar
+        if first_poll:
+            return []
+
+        # Cualquier cambio en el documento (no solo en 'Stage') altera los rankings
+        # y deja viejas las hojas guardadas en la caché compartida
+        mark_data_changed()
+        invalidate("sheets")
+
+        for client in changed:
+            df = sync_client(client)
+            # Una resincronización completa marcaría todo el historial como nuevo
+            if df.attrs.get("full_sync"):
+                continue
+            if df.attrs["new_appointments"] or df.attrs["new_closes"]:
+                notify_changes(client, df)
+
+        # Recalcular las consultas precalculadas de los clientes que cambiaron
+        if PRECOMPUTE_ENABLED and changed:
+            precompute_clients(changed)
+        return changed
+
+    def run(self):
+        """
+        Espera a ser el único worker que sondea y entonces ejecuta el bucle de sondeo,
+        hasta que se llame a `stop`.
+        """
+        while not self._stop.is_set():
+            with try_exclusive("sheet-watcher") as acquired:
+                if acquired:
+                    self._poll_loop()
+            self._stop.wait(WATCHER_MIN_INTERVAL)
+
+    def _poll_loop(self):
+        """
+        Bucle de sondeo con intervalo adaptativo, hasta que se llame a `stop`.
+        """
+        while not self._stop.is_set():
+            try:
+                # El sondeo usa la cuota externa con prioridad baja
+                with background_priority():
+                    changed = self.poll()
+                if changed:
+                    self.interval = WATCHER_MIN_INTERVAL
+                else:
+                    self.interval = min(
+                        self.interval * WATCHER_BACKOFF, WATCHER_MAX_INTERVAL
+                    )
+            except HttpError as e:
+                # Cuota agotada o error del servidor: esperar más antes de reintentar
+                print(f"Error sondeando el documento: {e}")
+                self.interval = min(self.interval * 2, WATCHER_MAX_INTERVAL)
+            except Exception as e:
+                print(f"Error en el vigilante de hojas: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """
+        Inicia el bucle de sondeo en un hilo en segundo plano.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, name="sheet-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Detiene el bucle de sondeo.
+        """
+        self._stop.set()
+
+
+def notify_changes(client, df, video_links=None):
+    """
+    Envía a Slack las citas y cierres nuevos de un cliente detectados en la última sincronización.
+
+    Args:
+        client (str): El nombre del cliente.
+        df (pd.DataFrame): Las filas leídas por `sync_client`, con las filas nuevas en `df.attrs`.
+        video_links (dict, opcional): Un diccionario de enlaces de video con el 'ID' como clave y el 'Link' como valor.
+                                      Por defecto se buscan en el índice de enlaces.
+    """
+    now = time.strftime("%m/%d/%Y %H:%M")
+
+    if df.attrs["new_appointments"]:
+        appointments = analyze_appointments_data(
+            df.loc[df.attrs["new_appointments"]], video_links
+        )
+        appointments = appointments.loc[appointments["Citas"] != 0]
+        message = f"*Nuevas citas ({now}):*\n" + format_client_message(
+            client, appointments, "Citas"
+        )
+        print(send_slack_notifications(["#creativos-citas"], message))
+
+    if df.attrs["new_closes"]:
+        closed = analyze_closed_data(df.loc[df.attrs["new_closes"]], video_links)
+        closed = closed.loc[closed["Cierres"] != 0]
+        message = f"*Nuevos cierres ({now}):*\n" + format_client_message(
+            client, closed, "Cierres"
+        )
+        print(send_slack_notifications(["#creativos-cierres"], message))
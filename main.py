@@ -1,15 +1,37 @@
-from controllers.bot_slack import *
-from fastapi import FastAPI, Request
-from dotenv import load_dotenv
-from routes import analisis, bot_slack
-from fastapi.middleware.cors import CORSMiddleware
 import time
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
 
-# Cargamos las variables de entorno
+# Inicio de la importación de la API, para reportar cuánto tarda el arranque
+IMPORT_STARTED = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Cargamos las variables de entorno antes de importar los módulos de config, que
+# leen su configuración (tokens, TTLs, directorios) al importarse
 load_dotenv()
 
+from config.metrics import (
+    REQUEST_LATENCY,
+    REQUESTS_IN_FLIGHT,
+    STARTUP_SECONDS,
+    render_metrics,
+    timed_job,
+)
+from config.warmup import WARMUP_ENABLED, run_warmup
+from config.timing import start_request_timing
+from config.resilience import UpstreamUnavailable
+from config.profiling import start_profile_request
+from config.process_pool import shutdown_pool
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from routes import analisis, bot_slack, profiling
+from fastapi.middleware.cors import CORSMiddleware
+import json
+import math
+import os
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime
 
 description = """
 # ¡Bienvenido a la api para análisis de datos de **SunBoostCRM**!
@@ -51,6 +73,7 @@ app.add_middleware(
 
 app.include_router(analisis.router)
 app.include_router(bot_slack.router)
+app.include_router(profiling.router)
 
 
 # Ruta principal
@@ -59,12 +82,65 @@ async def root():
     return {"message": "API for SunBoostCRM, go to docs"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Expone las métricas de la API en el formato de texto de Prometheus.
+    """
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    """
+    Un servicio externo caído (circuito abierto) o sin cupo de cuota, y sin datos de
+    respaldo: 503 con Retry-After.
+    """
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+    start_time = time.perf_counter()
+    # Desglose por fases (Server-Timing) solo para los endpoints de análisis
+    timings = None
+    profile = None
+    if request.url.path.startswith("/data/"):
+        timings = start_request_timing(request.url.path)
+        profile = start_profile_request(request)
+    REQUESTS_IN_FLIGHT.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        process_time = time.perf_counter() - start_time
+        # Se usa la plantilla de la ruta (p. ej. /data/closed/{client_name}) para no
+        # crear una serie por cada cliente
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method, route.path if route else "unmatched", str(status)
+        ).observe(process_time)
     response.headers["X-Process-Time"] = str(process_time)
+    if timings is not None and timings.durations:
+        response.headers["Server-Timing"] = timings.header()
+    # Antigüedad de los datos más viejos usados (caché compartida o datos vencidos
+    # servidos mientras se refrescan o mientras el servicio está caído)
+    if timings is not None:
+        if timings.stale_since is not None:
+            response.headers["X-Data-Stale"] = "true"
+        since = [t for t in (timings.stale_since, timings.fetched_at) if t is not None]
+        if since and "Age" not in response.headers:
+            response.headers["Age"] = str(max(0, int(time.time() - min(since))))
+    if profile is not None and profile["id"]:
+        response.headers["X-Profile-Id"] = profile["id"]
+        response.headers["X-Profile-Url"] = f"/profiles/{profile['id']}"
     return response
 
 
@@ -73,23 +149,70 @@ def my_scheduled_job():
     print(f"Job ejecutado a las {time.strftime('%X')}")
 
 
-# Configuración del BackgroundScheduler
+# Configuración del BackgroundScheduler. Los trabajos se referencian por nombre
+# ("modulo:funcion") para no importar las alertas hasta su primera ejecución, y el
+# scheduler se inicia en el evento de arranque, no al importar este módulo.
 scheduler = BackgroundScheduler()
 
 
 # Configurar alerta diaria a las 01:00 AM todos los días
-scheduler.add_job(send_daily_alerts, CronTrigger(hour=1, minute=0))
+scheduler.add_job(
+    timed_job("daily_alerts", "controllers.bot_slack:send_daily_alerts"),
+    CronTrigger(hour=1, minute=0),
+)
 
 
 # Configurar alerta semanal a las 01:00 AM todos los lunes
-scheduler.add_job(send_weekly_alerts, CronTrigger(day_of_week="mon", hour=1, minute=2))
+scheduler.add_job(
+    timed_job("weekly_alerts", "controllers.bot_slack:send_weekly_alerts"),
+    CronTrigger(day_of_week="mon", hour=1, minute=2),
+)
 
 
 # Programar la tarea mensual (por ejemplo, el primer día de cada mes a las 01:00 AM)
-scheduler.add_job(send_monthly_alerts, CronTrigger(day=1, hour=1, minute=3))
-scheduler.start()
+scheduler.add_job(
+    timed_job("monthly_alerts", "controllers.bot_slack:send_monthly_alerts"),
+    CronTrigger(day=1, hour=1, minute=3),
+)
+
+# Precálculo de las consultas más comunes del dashboard, también al arrancar
+if os.getenv("PRECOMPUTE_ENABLED", "0") == "1":
+    scheduler.add_job(
+        timed_job("precompute", "config.precompute:precompute_all"),
+        IntervalTrigger(minutes=int(os.getenv("PRECOMPUTE_INTERVAL_MINUTES", "15"))),
+        next_run_time=datetime.now(),
+    )
+
+# Alertas casi en tiempo real: sondeo adaptativo de cambios en el documento
+watcher = None
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+STARTUP_SECONDS.labels("import").set(IMPORT_SECONDS)
+
+
+@app.on_event("startup")
+def startup_event():
+    global watcher
+    scheduler.start()
+
+    if os.getenv("SHEET_WATCHER_ENABLED", "0") == "1":
+        from controllers.watcher import SheetWatcher
+
+        watcher = SheetWatcher()
+        watcher.start()
+
+    report = {"event": "startup", "import_s": IMPORT_SECONDS}
+    if WARMUP_ENABLED:
+        report["warmup_s"] = run_warmup()
+    # Desde que se empezó a importar la API hasta que queda lista para recibir peticiones
+    report["ready_s"] = time.perf_counter() - IMPORT_STARTED
+    print(json.dumps(report))
 
 
 @app.on_event("shutdown")
 def shutdown_event():
-    scheduler.shutdown()
+    if watcher is not None:
+        watcher.stop()
+    if scheduler.running:
+        scheduler.shutdown()
+    shutdown_pool()
@@ -1,12 +1,57 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from config.data import *
-from fastapi.responses import JSONResponse
+from config.ranking import SORT_OPTIONS, get_video_performance_page
+from config.precompute import freshness_headers, get_precomputed
+from config.batch import iter_batch, run_batch
+from config.streaming import aggregate_sheet, use_chunked_reads
+from config.windows import client_windows, general_windows
+from schemas.analisis import BatchRequest, SqlQuery
+from config.trends import (
+    TREND_FREQUENCIES,
+    build_trends,
+    daily_counts,
+    get_general_daily_counts,
+)
+from config.timing import phase
+from config.profiling import profiled
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import json
 
 # Rutas relacionadas con analisis
 router = APIRouter(tags=["Data Analysis"], prefix="/data")
 
 
+def _precomputed_response(analysis, client_name, start_date, end_date):
+    """
+    Devuelve el resultado precalculado de la consulta, si lo hay, con los headers de frescura.
+    """
+    stored = get_precomputed(analysis, client_name, start_date, end_date)
+    if stored is None:
+        return None
+    result, computed_at = stored
+    headers = freshness_headers(computed_at)
+    headers["X-Total-Count"] = str(result["rows"])
+    return Response(
+        content=result["body"], media_type="application/json", headers=headers
+    )
+
+
+def _windows_response(analysis, client_name, windows, end_date):
+    """
+    Responde un análisis por cliente con un grupo de columnas por ventana de fechas.
+    """
+    try:
+        analysis_df = client_windows(analysis, client_name, windows, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    with phase("serialization"):
+        result = analysis_df.to_dict(orient="records")
+        return JSONResponse(content=result)
+
+
 @router.get("/clients/")
+@profiled
 def all_clients():
     """
     Recupera una lista de todos los nombres de clientes disponibles.
@@ -18,6 +63,7 @@ def all_clients():
 
 
 @router.get("/{client_name}")
+@profiled
 def info_clients(client_name: str):
     """
     Recupera los datos de un cliente específico desde Google Sheets.
@@ -32,8 +78,9 @@ def info_clients(client_name: str):
 
 
 @router.get("/closed/{client_name}")
+@profiled
 def closed_videos_client(
-    client_name: str, start_date: str = None, end_date: str = None
+    client_name: str, start_date: str = None, end_date: str = None, windows: str = None
 ):
     """
     Recupera y analiza los cierres de un cliente específico en un rango de fechas.
@@ -42,24 +89,43 @@ def closed_videos_client(
         client_name (str): El nombre del cliente cuyas estadísticas de cierre se desean obtener.
         start_date (str, opcional): Fecha de inicio del filtro (formato YYYY-MM-DD).
         end_date (str, opcional): Fecha de fin del filtro (formato YYYY-MM-DD).
+        windows (str, opcional): Ventanas lado a lado, por ejemplo "1d,7d,30d,mtd,prev_7d",
+            que terminan en `end_date` (por defecto, hoy). Se ignora `start_date`.
 
     Returns:
         JSONResponse: Un objeto JSON con los resultados del análisis de cierres.
     """
-    df = get_google_sheets_data(client_name)
-
-    # Filtrado por fecha si se proporciona start_date o end_date
-    df = filter_by_date(df, start_date, end_date)
-
-    analysis_df = analyze_closed_data(df)
-    result = analysis_df.to_dict(orient="records")
+    if windows:
+        return _windows_response("closed", client_name, windows, end_date)
+
+    precomputed = _precomputed_response("closed", client_name, start_date, end_date)
+    if precomputed is not None:
+        return precomputed
+
+    # Hojas muy grandes (según el índice de filas): conteos por bloques, sin cargar
+    # la hoja entera
+    if use_chunked_reads(client_name, start_date, end_date):
+        analysis_df = aggregate_sheet(client_name, start_date, end_date).closed()
+    else:
+        df = get_google_sheets_data(
+            client_name,
+            columns=required_columns(filter_by_date, analyze_closed_data),
+            since=window_start(start_date, end_date),
+        )
+
+        # Filtrado por fecha si se proporciona start_date o end_date
+        df = filter_by_date(df, start_date, end_date)
 
-    return JSONResponse(content=result)
+        analysis_df = analyze_closed_data(df)
+    with phase("serialization"):
+        result = analysis_df.to_dict(orient="records")
+        return JSONResponse(content=result)
 
 
 @router.get("/appointments/{client_name}")
+@profiled
 def appointments_videos_client(
-    client_name: str, start_date: str = None, end_date: str = None
+    client_name: str, start_date: str = None, end_date: str = None, windows: str = None
 ):
     """
     Recupera y analiza las citas de un cliente específico en un rango de fechas.
@@ -68,22 +134,43 @@ def appointments_videos_client(
         client_name (str): El nombre del cliente cuyas estadísticas de citas se desean obtener.
         start_date (str, opcional): Fecha de inicio del filtro (formato YYYY-MM-DD).
         end_date (str, opcional): Fecha de fin del filtro (formato YYYY-MM-DD).
+        windows (str, opcional): Ventanas lado a lado, por ejemplo "1d,7d,30d,mtd,prev_7d",
+            que terminan en `end_date` (por defecto, hoy). Se ignora `start_date`.
 
     Returns:
         JSONResponse: Un objeto JSON con los resultados del análisis de citas.
     """
-    df = get_google_sheets_data(client_name)
-
-    # Filtrado por fecha si se proporciona start_date o end_date
-    df = filter_by_date(df, start_date, end_date)
-
-    analysis_df = analyze_appointments_data(df)
-    result = analysis_df.to_dict(orient="records")
+    if windows:
+        return _windows_response("appointments", client_name, windows, end_date)
+
+    precomputed = _precomputed_response(
+        "appointments", client_name, start_date, end_date
+    )
+    if precomputed is not None:
+        return precomputed
+
+    # Hojas muy grandes (según el índice de filas): conteos por bloques, sin cargar
+    # la hoja entera
+    if use_chunked_reads(client_name, start_date, end_date):
+        analysis_df = aggregate_sheet(client_name, start_date, end_date).appointments()
+    else:
+        df = get_google_sheets_data(
+            client_name,
+            columns=required_columns(filter_by_date, analyze_appointments_data),
+            since=window_start(start_date, end_date),
+        )
+
+        # Filtrado por fecha si se proporciona start_date o end_date
+        df = filter_by_date(df, start_date, end_date)
 
-    return JSONResponse(content=result)
+        analysis_df = analyze_appointments_data(df)
+    with phase("serialization"):
+        result = analysis_df.to_dict(orient="records")
+        return JSONResponse(content=result)
 
 
 @router.get("/quality/{client_name}")
+@profiled
 def analyze_quality(client_name: str, start_date: str = None, end_date: str = None):
     """
     Analiza la calidad de los leads por etapa para todos los videos de un cliente,
@@ -97,38 +184,233 @@ def analyze_quality(client_name: str, start_date: str = None, end_date: str = No
     Returns:
         JSONResponse: Un objeto JSON con la distribución de calidad por etapas para cada video.
     """
-    df = get_google_sheets_data(client_name)
+    precomputed = _precomputed_response("quality", client_name, start_date, end_date)
+    if precomputed is not None:
+        return precomputed
+
+    # Hojas muy grandes (según el índice de filas): conteos por bloques, sin cargar
+    # la hoja entera
+    if use_chunked_reads(client_name, start_date, end_date):
+        analysis_df = aggregate_sheet(client_name, start_date, end_date).quality()
+    else:
+        df = get_google_sheets_data(
+            client_name,
+            columns=required_columns(filter_by_date, analyze_quality_distribution),
+            since=window_start(start_date, end_date),
+        )
+
+        # Aplicar el filtro de fechas al DataFrame si se proporcionan
+        if start_date or end_date:
+            df = filter_by_date(df, start_date, end_date)
+
+        # Realizar el análisis de calidad con el DataFrame filtrado
+        analysis_df = analyze_quality_distribution(df)
 
-    # Aplicar el filtro de fechas al DataFrame si se proporcionan
-    if start_date or end_date:
-        df = filter_by_date(df, start_date, end_date)
+    # Convertir el DataFrame en una lista de diccionarios
+    with phase("serialization"):
+        result = analysis_df.to_dict(orient="records")
+        return JSONResponse(content=result)
 
-    # Realizar el análisis de calidad con el DataFrame filtrado
-    analysis_df = analyze_quality_distribution(df)
 
-    # Convertir el DataFrame en una lista de diccionarios
-    result = analysis_df.to_dict(orient="records")
+@router.post("/batch")
+@profiled
+def batch_analysis(request: BatchRequest):
+    """
+    Calcula varios análisis para varios clientes y rangos de fechas en una sola petición.
+    Cada hoja se descarga y se procesa una sola vez.
+
+    Args:
+        request (BatchRequest): Los clientes, los análisis ('closed', 'appointments',
+            'quality'), los rangos de fechas y si se quiere la respuesta por partes.
+
+    Returns:
+        JSONResponse: Una lista con un objeto por cliente: {'client', 'results'}, donde
+        'results' tiene un elemento por rango con las fechas y los registros de cada
+        análisis, o {'client', 'error'} si ese cliente falló.
+        Con `stream` en True, se envía un objeto por línea (NDJSON) a medida que cada
+        cliente termina.
+    """
+    analyses = list(dict.fromkeys(request.analyses))
+    ranges = [(r.start_date, r.end_date) for r in request.ranges]
+
+    if request.stream:
+        lines = (
+            json.dumps(item, ensure_ascii=False) + "\n"
+            for item in iter_batch(request.clients, analyses, ranges)
+        )
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    result = run_batch(request.clients, analyses, ranges)
+    with phase("serialization"):
+        return JSONResponse(content=result)
+
+
+@router.post("/sql")
+@profiled
+def sql_query(request: SqlQuery):
+    """
+    Ejecuta una consulta SQL de solo lectura sobre los leads (DuckDB). Hay una tabla
+    por cliente con el nombre de su hoja, la vista `leads` con todas las hojas y la
+    columna `client`, y la tabla `video_links` (video_id, link).
+
+    Args:
+        request (SqlQuery): Una única sentencia SELECT, sus parámetros ($nombre), los
+            clientes que puede ver (por defecto, todos) y el máximo de filas.
+
+    Returns:
+        JSONResponse: {'columns', 'rows', 'truncated'}; 'truncated' indica que había más
+        filas que el máximo.
+    """
+    # Importación diferida: DuckDB solo se carga si se usa este endpoint
+    from config.sql_engine import SqlQueryError, SqlTimeoutError, execute_sql
 
-    return JSONResponse(content=result)
+    try:
+        result = execute_sql(
+            request.query, request.params, request.clients, request.max_rows
+        )
+    except SqlQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SqlTimeoutError as e:
+        raise HTTPException(status_code=408, detail=str(e))
+
+    with phase("serialization"):
+        return JSONResponse(content=jsonable_encoder(result))
 
 
 @router.get("/general/video-performance")
-def general_video_performance(start_date: str = None, end_date: str = None):
+@profiled
+def general_video_performance(
+    start_date: str = None,
+    end_date: str = None,
+    sort_by: str = "leads",
+    limit: int = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    windows: str = None,
+):
     """
     Analiza el rendimiento general de los videos en un rango de fechas.
 
     Args:
         start_date (str, opcional): Fecha de inicio del filtro (formato YYYY-MM-DD).
         end_date (str, opcional): Fecha de fin del filtro (formato YYYY-MM-DD).
+        sort_by (str): Criterio de orden: 'leads', 'appointments', 'closes',
+            'appointment_rate' o 'close_rate'.
+        limit (int, opcional): Cantidad máxima de videos a devolver (top-K).
+        offset (int): Cantidad de videos a saltar, para paginar el ranking.
+        windows (str, opcional): Ventanas lado a lado, por ejemplo "7d,prev_7d", que
+            terminan en `end_date` (por defecto, hoy). Se ignora `start_date` y el
+            ranking se ordena por la primera ventana.
 
     Returns:
         JSONResponse: Un objeto JSON con el rendimiento de los videos dentro del rango de fechas especificado.
+        El header X-Total-Count indica la cantidad total de videos del ranking.
     """
-    analysis_df = analyze_general_video_performance(
-        start_date, end_date
-    )  # Pasar las fechas a la función
+    if sort_by not in SORT_OPTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sort_by debe ser uno de: {', '.join(SORT_OPTIONS)}",
+        )
+
+    if windows:
+        try:
+            analysis_df, total = general_windows(
+                windows, end_date, sort_by=sort_by, limit=limit, offset=offset
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        with phase("serialization"):
+            result = analysis_df.to_dict(orient="records")
+            return JSONResponse(content=result, headers={"X-Total-Count": str(total)})
+
+    # El precálculo guarda el ranking completo con el orden por defecto
+    if sort_by == "leads" and limit is None and offset == 0:
+        precomputed = _precomputed_response("general", "*", start_date, end_date)
+        if precomputed is not None:
+            return precomputed
+
+    analysis_df, total = get_video_performance_page(
+        start_date, end_date, sort_by=sort_by, limit=limit, offset=offset
+    )
 
     # Convertir el DataFrame en una lista de diccionarios
-    result = analysis_df.to_dict(orient="records")
+    with phase("serialization"):
+        result = analysis_df.to_dict(orient="records")
+        return JSONResponse(content=result, headers={"X-Total-Count": str(total)})
+
 
-    return JSONResponse(content=result)
+def _trends_response(counts, freq, rolling, start_date, end_date, video_id):
+    """
+    Valida los parámetros comunes de las tendencias y serializa el resultado.
+    """
+    if freq not in TREND_FREQUENCIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"freq debe ser uno de: {', '.join(TREND_FREQUENCIES)}",
+        )
+    video_ids = [v.strip().upper() for v in video_id.split(",")] if video_id else None
+
+    trends_df = build_trends(counts, freq, rolling, start_date, end_date, video_ids)
+    with phase("serialization"):
+        result = trends_df.to_dict(orient="records")
+        return JSONResponse(content=result)
+
+
+@router.get("/trends/{client_name}")
+@profiled
+def client_trends(
+    client_name: str,
+    freq: str = "daily",
+    rolling: int = Query(None, ge=1),
+    start_date: str = None,
+    end_date: str = None,
+    video_id: str = None,
+):
+    """
+    Serie de tiempo de leads, citas y cierres por video de un cliente.
+
+    Args:
+        client_name (str): El nombre del cliente.
+        freq (str): Agrupación de la serie: 'daily', 'weekly' o 'monthly'.
+        rolling (int, opcional): Agrega la suma de los últimos N periodos ('<Métrica>_Ventana').
+        start_date (str, opcional): Fecha de inicio del filtro (formato YYYY-MM-DD).
+            Con una sola de las dos fechas, la serie cubre solo ese día.
+        end_date (str, opcional): Fecha de fin del filtro (formato YYYY-MM-DD).
+        video_id (str, opcional): Uno o varios Video ID separados por coma.
+
+    Returns:
+        JSONResponse: Una lista con una fila por video y periodo.
+    """
+    since = window_start(start_date, end_date)
+    df = get_google_sheets_data(
+        client_name, columns=daily_counts.required_columns, since=since
+    )
+    counts = daily_counts(df)
+    return _trends_response(counts, freq, rolling, start_date, end_date, video_id)
+
+
+@router.get("/general/trends")
+@profiled
+def general_trends(
+    freq: str = "daily",
+    rolling: int = Query(None, ge=1),
+    start_date: str = None,
+    end_date: str = None,
+    video_id: str = None,
+):
+    """
+    Serie de tiempo de leads, citas y cierres por video, sumando todos los clientes.
+
+    Args:
+        freq (str): Agrupación de la serie: 'daily', 'weekly' o 'monthly'.
+        rolling (int, opcional): Agrega la suma de los últimos N periodos ('<Métrica>_Ventana').
+        start_date (str, opcional): Fecha de inicio del filtro (formato YYYY-MM-DD).
+            Con una sola de las dos fechas, la serie cubre solo ese día.
+        end_date (str, opcional): Fecha de fin del filtro (formato YYYY-MM-DD).
+        video_id (str, opcional): Uno o varios Video ID separados por coma.
+
+    Returns:
+        JSONResponse: Una lista con una fila por video y periodo.
+    """
+    since = window_start(start_date, end_date)
+    counts = get_general_daily_counts(since)
+    return _trends_response(counts, freq, rolling, start_date, end_date, video_id)
@@ -19,4 +19,4 @@ def send_alert(channels: ChannelList, message: str):
     Returns:
         list: Una lista de respuestas de Slack, indicando el estado del envío a cada canal.
     """
-    return send_slack_notifications(channels, message)
+    return send_slack_notifications(channels.channels, message)
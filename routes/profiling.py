@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from config.profiling import is_profiling_authorized, read_profile
+import json
+
+# Rutas para consultar los perfiles de las peticiones de análisis
+router = APIRouter(tags=["Profiling"], prefix="/profiles")
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, request: Request, format: str = "html"):
+    """
+    Devuelve un perfil guardado por `?profile=1` o por el muestreo periódico.
+
+    Args:
+        profile_id (str): El identificador del perfil (header X-Profile-Id de la respuesta perfilada).
+        format (str): 'html' (gráfica interactiva), 'text' (árbol de llamadas) o 'json' (metadatos).
+
+    Returns:
+        Response: El perfil en el formato pedido.
+    """
+    if not is_profiling_authorized(request.headers):
+        raise HTTPException(status_code=403, detail="Perfilado no autorizado")
+
+    extension = {"html": "html", "text": "txt", "json": "json"}.get(format)
+    if extension is None:
+        raise HTTPException(status_code=400, detail="Formato no soportado")
+
+    content = read_profile(profile_id, extension)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+
+    if extension == "html":
+        return HTMLResponse(content)
+    if extension == "json":
+        return JSONResponse(json.loads(content))
+    return PlainTextResponse(content)
@@ -0,0 +1,24 @@
+from typing import Any, Literal, Optional
+from pydantic import BaseModel, Field
+
+# Modelos Pydantic para la consulta en bloque de análisis
+BatchAnalysis = Literal["closed", "appointments", "quality"]
+
+
+class DateRange(BaseModel):
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    clients: list[str] = Field(min_length=1)
+    analyses: list[BatchAnalysis] = ["closed", "appointments", "quality"]
+    ranges: list[DateRange] = [DateRange()]
+    stream: bool = False
+
+
+class SqlQuery(BaseModel):
+    query: str
+    params: Optional[dict[str, Any]] = None
+    clients: Optional[list[str]] = None
+    max_rows: Optional[int] = Field(None, ge=1)
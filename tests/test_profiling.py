@@ -0,0 +1,36 @@
+import os
+from types import SimpleNamespace
+import config.profiling as profiling
+
+
+class FakeProfiler:
+    """
+    Perfilador ya detenido, con las salidas que usa `save_profile`.
+    """
+
+    last_session = SimpleNamespace(duration=0.1, sample_count=10)
+
+    def output_html(self):
+        return "<html></html>"
+
+    def output_text(self, **kwargs):
+        return "0.1 handler"
+
+
+def test_profile_dir_stays_bounded(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 3)
+    # Un archivo ajeno al perfilado no se toca
+    (tmp_path / "notas.txt").write_text("")
+
+    ids = [
+        profiling.save_profile(FakeProfiler(), {"mode": "sampled", "path": "/data"})
+        for _ in range(8)
+    ]
+
+    kept = sorted(ids)[-3:]
+    expected = {
+        f"{profile_id}.{ext}" for profile_id in kept for ext in ("html", "txt", "json")
+    }
+    assert set(os.listdir(tmp_path)) == expected | {"notas.txt"}
+    assert profiling.read_profile(kept[-1], "json") is not None
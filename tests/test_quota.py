@@ -0,0 +1,46 @@
+import pytest
+import config.quota as quota
+import config.resilience as resilience
+
+
+@pytest.fixture
+def bucket(monkeypatch, tmp_path):
+    """
+    Bucket de Sheets en un directorio propio del test, contando las lecturas del archivo.
+    """
+    monkeypatch.setattr(quota, "QUOTA_DIR", str(tmp_path))
+    monkeypatch.setattr(quota, "QUOTA_ENABLED", True)
+    monkeypatch.setattr(quota, "_local_tokens", {})
+    opened = []
+    bucket_state = quota._bucket_state
+
+    def counting(upstream):
+        opened.append(upstream)
+        return bucket_state(upstream)
+
+    monkeypatch.setattr(quota, "_bucket_state", counting)
+    return opened
+
+
+def test_tokens_are_taken_in_batches(bucket, monkeypatch):
+    monkeypatch.setattr(quota, "QUOTA_BATCH", 4)
+    _, capacity = quota.QUOTAS["sheets"]
+    for _ in range(capacity):
+        quota.acquire("sheets", quota.INTERACTIVE)
+    assert len(bucket) == -(-capacity // 4)
+
+
+def test_exhausted_quota_raises_without_tripping_the_breaker(bucket, monkeypatch):
+    monkeypatch.setattr(quota, "QUOTA_MAX_WAIT", 0.2)
+    breaker = resilience.CircuitBreaker("sheets", failures=1)
+    monkeypatch.setattr(resilience, "get_breaker", lambda upstream: breaker)
+    _, capacity = quota.QUOTAS["sheets"]
+    for _ in range(capacity):
+        quota.acquire("sheets", quota.INTERACTIVE)
+
+    with pytest.raises(resilience.QuotaExhausted) as error:
+        with resilience.guarded("sheets"):
+            quota.acquire("sheets", quota.INTERACTIVE)
+    # Se mapea como servicio no disponible (503), pero no abre el circuito
+    assert isinstance(error.value, resilience.UpstreamUnavailable)
+    assert breaker.state == resilience.CLOSED
@@ -0,0 +1,197 @@
+import threading
+import time
+import pytest
+import config.resilience as resilience
+import config.shared_cache as shared_cache
+from config.quota import background_priority
+
+
+class FakeHttpError(Exception):
+    """
+    Error con código HTTP, como los de googleapiclient (`resp.status`).
+    """
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    """
+    Caché compartida en un directorio propio del test.
+    """
+    monkeypatch.setattr(shared_cache, "SHARED_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(shared_cache, "SHARED_CACHE_ENABLED", True)
+    monkeypatch.setattr(resilience, "SWR_ENABLED", True)
+
+
+def fail(breaker, times=1):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.on_failure()
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = resilience.CircuitBreaker("test", failures=3, reset_timeout=10)
+    fail(breaker, 2)
+    breaker.before_call()
+    breaker.on_success()
+    # Un éxito reinicia la cuenta de errores seguidos
+    fail(breaker, 2)
+    assert breaker.state == resilience.CLOSED
+
+    fail(breaker)
+    assert breaker.state == resilience.OPEN
+    with pytest.raises(resilience.UpstreamUnavailable) as error:
+        breaker.before_call()
+    assert error.value.retry_after == pytest.approx(10)
+
+
+def test_half_open_lets_one_probe_and_closes_on_success(clock):
+    breaker = resilience.CircuitBreaker("test", failures=1, reset_timeout=10)
+    fail(breaker)
+    clock.now += 10
+
+    breaker.before_call()
+    assert breaker.state == resilience.HALF_OPEN
+    # Mientras la prueba está en curso, las demás llamadas no pasan
+    with pytest.raises(resilience.UpstreamUnavailable):
+        breaker.before_call()
+
+    breaker.on_success()
+    assert breaker.state == resilience.CLOSED
+    breaker.before_call()
+
+
+def test_half_open_reopens_on_failure(clock):
+    breaker = resilience.CircuitBreaker("test", failures=3, reset_timeout=10)
+    fail(breaker, 3)
+    clock.now += 11
+
+    # Con el circuito semiabierto basta un error para volver a abrirlo
+    fail(breaker)
+    assert breaker.state == resilience.OPEN
+    assert breaker.opened_at == clock.now
+    with pytest.raises(resilience.UpstreamUnavailable):
+        breaker.before_call()
+
+
+def test_guarded_counts_only_upstream_failures(monkeypatch, clock):
+    breaker = resilience.CircuitBreaker("test", failures=2, reset_timeout=10)
+    monkeypatch.setattr(resilience, "get_breaker", lambda upstream: breaker)
+
+    for status in (503, 404, 503):
+        with pytest.raises(FakeHttpError):
+            with resilience.guarded("test"):
+                raise FakeHttpError(status)
+    # El 404 es un error de la petición: no cuenta y reinicia los errores seguidos
+    assert breaker.state == resilience.CLOSED
+
+    with pytest.raises(FakeHttpError):
+        with resilience.guarded("test"):
+            raise FakeHttpError(429)
+    assert breaker.state == resilience.OPEN
+    with pytest.raises(resilience.UpstreamUnavailable):
+        with resilience.guarded("test"):
+            pass
+
+
+def test_stale_value_is_refreshed_once(cache):
+    shared_cache.put("swr", "key", "old")
+    shared_cache.invalidate("swr")
+
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "new"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                resilience.get_or_compute_stale("swr", "key", compute, 60)[0]
+            )
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    # Todas las peticiones reciben el dato vencido sin esperar el refresco
+    assert results == ["old"] * 5
+    # Un solo hilo de refresco para la llave
+    refreshing = [t for t in threading.enumerate() if t.name == "refresh-swr"]
+    assert len(refreshing) == 1
+    release.set()
+    deadline = time.monotonic() + 5
+    while resilience._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 1
+    assert shared_cache.get("swr", "key", 60)[0] == "new"
+
+
+def test_stale_fallback_on_upstream_failure(cache):
+    shared_cache.put("swr", "key", "old")
+    shared_cache.invalidate("swr")
+
+    def compute():
+        raise FakeHttpError(503)
+
+    # En segundo plano no se sirve el vencido de inmediato: se intenta recalcular
+    with background_priority():
+        value, _ = resilience.get_or_compute_stale("swr", "key", compute, 60)
+    assert value == "old"
+
+
+def test_no_stale_fallback_on_request_error(cache):
+    shared_cache.put("swr", "key", "old")
+    shared_cache.invalidate("swr")
+
+    def compute():
+        raise FakeHttpError(400)
+
+    with background_priority():
+        with pytest.raises(FakeHttpError):
+            resilience.get_or_compute_stale("swr", "key", compute, 60)
+
+
+def test_slack_calls_go_through_the_breaker(monkeypatch, clock):
+    import config.bot_slack as bot_slack
+
+    breaker = resilience.CircuitBreaker("slack", failures=2, reset_timeout=10)
+    monkeypatch.setattr(resilience, "get_breaker", lambda upstream: breaker)
+    calls = []
+
+    class DownSlack:
+        def chat_postMessage(self, channel, text):
+            calls.append(channel)
+            raise FakeHttpError(503)
+
+    monkeypatch.setattr(bot_slack, "client", DownSlack())
+    responses = bot_slack.send_slack_notifications(["#a", "#b", "#c", "#d"], "hola")
+
+    # Tras dos errores seguidos los demás canales fallan sin llamar a Slack
+    assert calls == ["#a", "#b"]
+    assert [response.success for response in responses] == [False] * 4
+    assert breaker.state == resilience.OPEN
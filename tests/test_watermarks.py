@@ -0,0 +1,236 @@
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+import config.data
+import config.row_index
+import config.watermarks as watermarks
+import controllers.bot_slack as bot_slack
+
+CLIENT = "Cliente 1"
+DAYS = 100
+ROWS_PER_DAY = 30
+STAGES = [
+    "NEW LEAD",
+    "APPOINTMENT BOOKED",
+    "CONTACTED",
+    "CLOSED",
+    "SHOWED (NOT CLOSED)",
+]
+
+
+def make_sheet(days=DAYS, rows_per_day=ROWS_PER_DAY):
+    """
+    Hoja en orden cronológico con el número de fila como índice (la fila 1 es el encabezado).
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    records = []
+    for day in range(days, -1, -1):
+        created = today - timedelta(days=day)
+        for i in range(rows_per_day):
+            records.append(
+                {
+                    "Name": f"Lead {day}-{i}",
+                    "UTM Content": f"CS0{i % 4}-{i % 3} | Florida Solar",
+                    "Stage": STAGES[(day + i) % len(STAGES)],
+                    "Created at (fecha)": created.strftime("%Y-%m-%d"),
+                    "Dia de cita": "",
+                }
+            )
+    return reindex(pd.DataFrame(records))
+
+
+def reindex(sheet):
+    sheet = sheet.reset_index(drop=True)
+    sheet.index = pd.RangeIndex(2, 2 + len(sheet))
+    return sheet
+
+
+def row_of(sheet, days_ago, position=0):
+    """
+    Número de fila del lead `position` creado hace `days_ago` días.
+    """
+    day = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+    return sheet.index[sheet["Created at (fecha)"] == day][position]
+
+
+@pytest.fixture
+def sheet(monkeypatch, tmp_path):
+    """
+    Reemplaza la lectura de Google Sheets por una hoja en memoria que el test puede modificar.
+    """
+    state = {"sheet": make_sheet(), "reads": []}
+
+    def get_rows(client, start_row=2):
+        state["reads"].append(start_row)
+        return state["sheet"].loc[start_row:].copy()
+
+    def get_data(client, columns=None, since=None):
+        df = state["sheet"].reset_index(drop=True)
+        return df[columns] if columns else df
+
+    monkeypatch.setattr(watermarks, "get_google_sheets_rows", get_rows)
+    monkeypatch.setattr(watermarks, "get_google_sheets_data", get_data)
+    monkeypatch.setattr(watermarks, "WATERMARK_FILE", str(tmp_path / "wm.json"))
+    monkeypatch.setattr(config.row_index, "ROW_INDEX_FILE", str(tmp_path / "ri.json"))
+    return state
+
+
+def full_recompute(sheet, monkeypatch, tmp_path):
+    """
+    Agregados diarios calculados desde cero sobre la hoja actual, en otro archivo de marcas.
+    """
+    with monkeypatch.context() as m:
+        m.setattr(watermarks, "WATERMARK_FILE", str(tmp_path / "full.json"))
+        watermarks.sync_client(CLIENT, full=True)
+        return watermarks.load_watermarks()[CLIENT]["daily"]
+
+
+def daily():
+    return watermarks.load_watermarks()[CLIENT]["daily"]
+
+
+def test_new_rows_are_read_from_the_tracked_window(sheet, monkeypatch, tmp_path):
+    watermarks.sync_client(CLIENT)
+    first_tracked = watermarks.load_watermarks()[CLIENT]["first_tracked"]
+    assert first_tracked == row_of(sheet["sheet"], watermarks.WATERMARK_TRACK_DAYS)
+
+    new = sheet["sheet"].iloc[-2:].copy()
+    new["Stage"] = ["APPOINTMENT BOOKED", "CLOSED"]
+    sheet["sheet"] = reindex(pd.concat([sheet["sheet"], new]))
+    df = watermarks.sync_client(CLIENT)
+
+    # Se relee desde la fila ancla, no la hoja completa
+    assert sheet["reads"][-1] == first_tracked - 1
+    assert not df.attrs["full_sync"]
+    last = sheet["sheet"].index[-1]
+    # CLOSED también cuenta como cita
+    assert df.attrs["new_appointments"] == [last - 1, last]
+    assert df.attrs["new_closes"] == [last]
+    assert daily() == full_recompute(sheet["sheet"], monkeypatch, tmp_path)
+
+
+def test_stage_change_on_an_old_tracked_row(sheet, monkeypatch, tmp_path):
+    watermarks.sync_client(CLIENT)
+    # Más de mil filas antes del final, pero dentro del periodo revisado
+    row = row_of(sheet["sheet"], 40)
+    assert sheet["sheet"].index[-1] - row > 1000
+    sheet["sheet"].loc[row, "Stage"] = "INSTALLED"
+
+    df = watermarks.sync_client(CLIENT)
+    assert not df.attrs["full_sync"]
+    assert df.attrs["new_closes"] == [row]
+    assert daily() == full_recompute(sheet["sheet"], monkeypatch, tmp_path)
+
+
+def test_update_of_a_tracked_row(sheet, monkeypatch, tmp_path):
+    watermarks.sync_client(CLIENT)
+    row = row_of(sheet["sheet"], 10, 3)
+    sheet["sheet"].loc[row, "UTM Content"] = "PA01-7 Techos"
+    sheet["sheet"].loc[row, "Created at (fecha)"] = sheet["sheet"].loc[
+        row_of(sheet["sheet"], 12), "Created at (fecha)"
+    ]
+
+    df = watermarks.sync_client(CLIENT)
+    assert not df.attrs["full_sync"]
+    assert daily() == full_recompute(sheet["sheet"], monkeypatch, tmp_path)
+
+
+def test_deletion_inside_the_window_with_new_rows(sheet, monkeypatch, tmp_path):
+    watermarks.sync_client(CLIENT)
+    deleted = row_of(sheet["sheet"], 20, 5)
+    new = sheet["sheet"].iloc[-1:].copy()
+    sheet["sheet"] = reindex(pd.concat([sheet["sheet"].drop(index=deleted), new]))
+
+    # La hoja tiene las mismas filas: se resuelve con el diff, sin resincronizar
+    df = watermarks.sync_client(CLIENT)
+    assert not df.attrs["full_sync"]
+    assert daily() == full_recompute(sheet["sheet"], monkeypatch, tmp_path)
+
+
+def test_deletion_before_the_window_resyncs(sheet, monkeypatch, tmp_path):
+    watermarks.sync_client(CLIENT)
+    deleted = row_of(sheet["sheet"], 90)
+    new = sheet["sheet"].iloc[-1:].copy()
+    sheet["sheet"] = reindex(pd.concat([sheet["sheet"].drop(index=deleted), new]))
+
+    # El ancla cambió: las filas se movieron antes del periodo revisado
+    df = watermarks.sync_client(CLIENT)
+    assert df.attrs["full_sync"]
+    assert daily() == full_recompute(sheet["sheet"], monkeypatch, tmp_path)
+
+
+def test_deletion_at_the_end_resyncs(sheet, monkeypatch, tmp_path):
+    watermarks.sync_client(CLIENT)
+    sheet["sheet"] = sheet["sheet"].iloc[:-3]
+
+    df = watermarks.sync_client(CLIENT)
+    assert df.attrs["full_sync"]
+    assert daily() == full_recompute(sheet["sheet"], monkeypatch, tmp_path)
+
+
+def test_summarize_range_before_the_window_reads_the_sheet(sheet, monkeypatch):
+    watermarks.sync_client(CLIENT)
+    now = datetime.now()
+    row = row_of(sheet["sheet"], 80)
+    sheet["sheet"].loc[row, "Stage"] = "CLOSED"
+
+    # Dentro del periodo revisado: desde los agregados, sin leer la hoja
+    reads = len(sheet["reads"])
+    recent = watermarks.summarize_range(
+        CLIENT, now - timedelta(days=7), now, video_links={}
+    )
+    assert len(sheet["reads"]) == reads
+    assert recent["Leads"].sum() == 8 * ROWS_PER_DAY
+
+    # Antes del periodo: con la hoja completa, incluido el cambio de etapa
+    old = watermarks.summarize_range(
+        CLIENT, now - timedelta(days=80), now - timedelta(days=80), video_links={}
+    )
+    day = sheet["sheet"].loc[row, "Created at (fecha)"]
+    expected = sheet["sheet"][sheet["sheet"]["Created at (fecha)"] == day]
+    assert old["Leads"].sum() == len(expected)
+    assert old["Cierres"].sum() == expected["Stage"].isin(["CLOSED"]).sum()
+
+
+def test_daily_alert_includes_old_leads_with_an_appointment_yesterday(
+    sheet, monkeypatch
+):
+    sheet["sheet"] = make_sheet(days=120, rows_per_day=2)
+    watermarks.sync_client(CLIENT)
+
+    # Un lead creado antes del periodo revisado, con la cita ayer
+    yesterday = datetime.now() - timedelta(days=1)
+    row = row_of(sheet["sheet"], 100)
+    sheet["sheet"].loc[row, "UTM Content"] = "AC09-1 | Agua Pura"
+    sheet["sheet"].loc[row, "Stage"] = "APPOINTMENT BOOKED"
+    sheet["sheet"].loc[row, "Dia de cita"] = yesterday.strftime("%B %d, %Y")
+
+    chunks = []
+
+    def get_chunk(client, header, columns, first_row, last_row):
+        chunks.append((columns, first_row, last_row))
+        return sheet["sheet"].loc[first_row:last_row, columns]
+
+    sent = []
+    monkeypatch.setattr(watermarks, "get_sheet_names", lambda: [CLIENT])
+    monkeypatch.setattr(
+        bot_slack,
+        "get_sheet_headers",
+        lambda names: {name: list(sheet["sheet"].columns) for name in names},
+    )
+    monkeypatch.setattr(bot_slack, "get_sheet_chunk", get_chunk)
+    monkeypatch.setattr(
+        bot_slack, "send_slack_notifications", lambda channels, text: sent.append(text)
+    )
+    monkeypatch.setattr(
+        config.data, "lookup_links", lambda ids: pd.Series(None, index=ids.index)
+    )
+
+    bot_slack.send_daily_appointments_alert()
+    assert "AC09-1" in sent[0]
+    # La sincronización leyó solo el periodo revisado; de lo anterior, solo la
+    # columna 'Dia de cita' y la fila con la cita
+    assert sheet["reads"][-1] > row
+    first_tracked = watermarks.load_watermarks()[CLIENT]["first_tracked"]
+    assert chunks[0] == (["Dia de cita"], 2, first_tracked - 1)
+    assert chunks[1][1:] == (row, row)